@@ -1,40 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal # Ajusta según tu setup de DB //REVISAR EN PRODUCCION
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
 from app.models.user import User
 from app.core import security
-from app.core.security import get_current_user
+from app.core.security import get_current_user, UsuarioAutenticado
 from app.schemas.auth_schema import UserPublic
 
 router = APIRouter()
 
-# Función para obtener DB 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @router.post("/token")
 async def login_for_access_token(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # 1. Buscar usuario
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
     
-    # 2. Validar
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    # 2. Validar (bcrypt corre en su propio pool, no en el event loop)
+    valida, hash_nuevo = (False, None)
+    if user:
+        valida, hash_nuevo = await security.verify_password_async(form_data.password, user.hashed_password)
+    if not valida:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # El hash tenía otro costo (BCRYPT_ROUNDS cambió): se guarda con el costo actual
+    if hash_nuevo:
+        user.hashed_password = hash_nuevo
+        await db.commit()
+
     # 3. Crear Token
     access_token = security.create_access_token(data={"sub": user.username})
 
@@ -52,15 +53,26 @@ async def login_for_access_token(
 
 
 @router.post("/logout")
-def logout(response: Response):
+def logout(request: Request, response: Response):
+    # Además de borrar la cookie, el token deja de valer aunque alguien lo haya copiado
+    token = request.cookies.get("access_token")
+    payload = security.decode_token_payload(token) if token else None
+    if payload:
+        security.cache_usuarios.revocar(security.token_id(token, payload), payload.get("exp"))
     response.delete_cookie("access_token")
     return {"message": "Sesión cerrada"}
 
 
 @router.get("/me", response_model=UserPublic)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: UsuarioAutenticado = Depends(get_current_user)):
     """
     Endpoint para verificar si la sesión (cookie) es válida.
     El frontend lo llama al cargar la app para saber si está autenticado.
     """
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+@router.get("/metricas-hash")
+def metricas_hash(current_user: UsuarioAutenticado = Depends(get_current_user)):
+    """Espera en cola y duración de bcrypt (p50/p95/max) para vigilar el SLO de login."""
+    return security.metricas_hash.resumen()
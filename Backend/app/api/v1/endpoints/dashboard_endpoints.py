@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
 from typing import Literal
-from app.db.session import get_db
-from app.services.dashboard_service import DashboardService
+from app.db.session import get_async_db
+from app.services.dashboard_service import DashboardServiceAsync
 from app.schemas.dashboard_schema import DashboardResponse, TendenciaHistoricaResponse
 
 router = APIRouter()
 
 @router.get("/resumen", response_model=DashboardResponse)
-def obtener_dashboard(
+async def obtener_dashboard(
     locacion: str = Query(None, description="Filtrar por locación específica"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint principal del dashboard con todas las métricas:
@@ -25,13 +26,13 @@ def obtener_dashboard(
     - `/api/v1/dashboard/resumen` - Dashboard completo (todas las locaciones)
     - `/api/v1/dashboard/resumen?locacion=Molino` - Solo locación "Molino"
     """
-    service = DashboardService(db)
-    return service.generar_dashboard_completo(locacion=locacion)
+    service = DashboardServiceAsync(db)
+    return await service.generar_dashboard_completo(locacion=locacion)
 
 @router.get("/metricas/basicas")
-def obtener_metricas_basicas(
+async def obtener_metricas_basicas(
     locacion: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint simplificado con solo los totales básicos:
@@ -39,8 +40,8 @@ def obtener_metricas_basicas(
     - Pizzas correctas/incorrectas
     - Calificación promedio
     """
-    service = DashboardService(db)
-    resumen = service.calcular_resumen_general(locacion=locacion)
+    service = DashboardServiceAsync(db)
+    resumen = await service.calcular_resumen_general(locacion=locacion)
     
     return {
         "total_muestras": resumen.total_muestras,
@@ -51,9 +52,9 @@ def obtener_metricas_basicas(
     }
 
 @router.get("/comparacion/semanal")
-def obtener_comparacion_semanal(
+async def obtener_comparacion_semanal(
     locacion: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Compara semana actual vs anterior con diferenciales de:
@@ -62,58 +63,95 @@ def obtener_comparacion_semanal(
     - % Pizzas con burbujas
     - % Distribución deficiente/mala
     """
-    service = DashboardService(db)
-    return service.calcular_comparacion_semanal(locacion=locacion)
+    service = DashboardServiceAsync(db)
+    return await service.calcular_comparacion_semanal(locacion=locacion)
+
+@router.get("/comparacion/periodos")
+async def obtener_comparacion_periodos(
+    desde: date = Query(..., description="Inicio del período (YYYY-MM-DD)"),
+    hasta: date = Query(..., description="Fin del período, inclusive"),
+    desde_anterior: date = Query(None, description="Inicio del período a comparar"),
+    hasta_anterior: date = Query(None, description="Fin del período a comparar, inclusive"),
+    locacion: str = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Compara dos períodos de días cualesquiera (mismos diferenciales que /comparacion/semanal).
+    Sin período anterior se usa el de igual largo inmediatamente antes.
+    Se responde sumando los snapshots diarios por locación.
+    
+    ### Ejemplo:
+    - `/api/v1/dashboard/comparacion/periodos?desde=2025-03-01&hasta=2025-03-31` - Marzo vs febrero (31 días antes)
+    """
+    if desde > hasta or (desde_anterior and hasta_anterior and desde_anterior > hasta_anterior):
+        raise HTTPException(status_code=400, detail="El inicio de un período no puede ser posterior a su fin")
+    if (desde_anterior is None) != (hasta_anterior is None):
+        raise HTTPException(status_code=400, detail="Indicar desde_anterior y hasta_anterior juntos")
+    service = DashboardServiceAsync(db)
+    return await service.calcular_comparacion_periodos(desde, hasta, desde_anterior, hasta_anterior,
+                                                       locacion=locacion)
 
 @router.get("/horas/top")
-def obtener_top_horas(
+async def obtener_top_horas(
     top: int = Query(5, ge=1, le=24, description="Número de horas a mostrar"),
     locacion: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Top N horas del día con más muestras tomadas
     """
-    service = DashboardService(db)
-    return service.obtener_muestras_por_hora(top=top, locacion=locacion)
+    service = DashboardServiceAsync(db)
+    return await service.obtener_muestras_por_hora(top=top, locacion=locacion)
 
 @router.get("/dias/incidentes")
-def obtener_dias_incidentes(
+async def obtener_dias_incidentes(
     top: int = Query(5, ge=1, le=30, description="Número de días a mostrar"),
     locacion: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Top N días con más incidentes (pizzas FAIL)
     Incluye hora_critica: la hora (0-23) con más fallos ese día
     """
-    service = DashboardService(db)
-    return service.obtener_dias_con_mas_incidentes(top=top, locacion=locacion)
+    service = DashboardServiceAsync(db)
+    return await service.obtener_dias_con_mas_incidentes(top=top, locacion=locacion)
 
 
 @router.get("/top-inspecciones")
-def obtener_top_inspecciones_semana(
+async def obtener_top_inspecciones_semana(
     top: int = Query(10, ge=1, le=50, description="Número de inspecciones a mostrar"),
     locacion: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Top N inspecciones de la última semana de datos, ordenadas por puntaje (desc).
     Toma la semana basada en la última fecha registrada en la BD.
     """
-    service = DashboardService(db)
-    return service.obtener_top_inspecciones_semana(top=top, locacion=locacion)
+    service = DashboardServiceAsync(db)
+    return await service.obtener_top_inspecciones_semana(top=top, locacion=locacion)
+
+@router.get("/bandas")
+async def obtener_distribucion_bandas(
+    locacion: str = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Inspecciones por banda de puntaje (excelente / aceptable / riesgo / critico)
+    y los umbrales vigentes, para que el frontend no repita cortes propios.
+    """
+    service = DashboardServiceAsync(db)
+    return await service.obtener_distribucion_bandas(locacion=locacion)
 
 
 # ==========================================
 # CHECK 6: ENDPOINT DE TENDENCIAS HISTÓRICAS
 # ==========================================
 @router.get("/tendencias", response_model=TendenciaHistoricaResponse)
-def obtener_tendencias_historicas(
+async def obtener_tendencias_historicas(
     group_by: Literal["week", "month"] = Query("week", description="Agrupar por 'week' o 'month'"),
     periodos: int = Query(12, ge=1, le=52, description="Número de períodos a incluir"),
     locacion: str = Query(None, description="Filtrar por locación"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     CHECK 6: Tendencias históricas para gráficos de líneas.
@@ -139,8 +177,8 @@ def obtener_tendencias_historicas(
     }
     ```
     """
-    service = DashboardService(db)
-    return service.obtener_tendencia_historica(
+    service = DashboardServiceAsync(db)
+    return await service.obtener_tendencia_historica(
         group_by=group_by,
         locacion=locacion,
         ultimos_periodos=periodos
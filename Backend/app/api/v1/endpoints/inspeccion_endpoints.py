@@ -1,136 +1,87 @@
-from typing import List, Optional
+from typing import List, Optional, Literal, Union
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, datetime
-import pandas as pd
-import io
 from fastapi.responses import StreamingResponse
-from openpyxl.styles import Border, Side, Alignment, Font, PatternFill
 
-from app.db.session import get_db
+from app.db.session import get_db, get_async_db
 from app.models.inspeccion import Inspeccion
-from app.schemas.inspeccion_schema import InspeccionResponse, InspeccionUpdate
-from app.services.quality_service import QualityService
-from app.services.scoring_logic import calcular_puntaje
+from app.schemas.inspeccion_schema import (
+    InspeccionResponse, InspeccionPaginaResponse, InspeccionUpdate,
+    InspeccionCorreccionLote, InspeccionCorreccionLoteResponse,
+)
+from app.core.model_loader import inferencia_habilitada
+from app.services.scoring_logic import calcular_puntaje, datos_desde_inspeccion
 from app.services.inspeccion_service import InspeccionService
+from app.services.resumen_diario_service import ResumenDiarioService
 
 router = APIRouter()
 
 # ==========================================
 # 1. CARGA MASIVA (BATCH UPLOAD)
 # ==========================================
+# 'def' (no async): FastAPI la corre en el threadpool. La carga de modelos, las descargas
+# e inferencia son bloqueantes y en el event loop congelarían dashboards y auth
 @router.post("/batch-upload")
-async def cargar_csv_inspecciones(
+def cargar_csv_inspecciones(
     file: UploadFile = File(...),
     locacion: str = Form(...), # <--- AQUÍ RECIBIMOS LA LOCACIÓN DEL FRONT
     db: Session = Depends(get_db)
 ):
     # 1. Validación
+    if not inferencia_habilitada():
+        raise HTTPException(status_code=503, detail="Este worker no hace inferencia (API_MODO=lectura)")
     if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Solo archivos CSV o Excel")
 
-    # 2. Lectura
-    contents = await file.read()
+    # 2. Lectura por bloques + parseo vectorizado de cada bloque
+    # No se hace file.read(): se lee del archivo temporal de la subida de a poco,
+    # y cada registro pasa al servicio apenas se parsea
+    # pandas/openpyxl se importan al usarse: no pesan en el arranque de workers de solo lectura
+    from app.services import carga_parser
+    reporte = carga_parser.ReporteParseo()
     try:
-        if file.filename.endswith('.csv'):
-            df_raw = pd.read_csv(io.BytesIO(contents), header=None)  
-        else:
-            df_raw = pd.read_excel(io.BytesIO(contents), header=None)
-    except Exception as e:
-        print(f"Error lectura: {e}")
-        raise HTTPException(status_code=400, detail="Archivo corrupto")
-
-    # 3. Header Discovery (Buscar dónde empieza)
-    header_row_index = -1
-    for i, row in df_raw.head(20).iterrows():
-        row_str = row.astype(str).str.lower().tolist()
-        if any("link" in s for s in row_str): # Buscamos "Photo Link" o similar
-            header_row_index = i
-            break
-    
-    if header_row_index == -1:
-        raise HTTPException(status_code=400, detail="No encontré cabeceras (Photo Link)")
+        registros = carga_parser.iterar_registros(file.file, file.filename, reporte)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 4. Limpieza y Asignación de columnas
-    df_raw.columns = df_raw.iloc[header_row_index]
-    df = df_raw.iloc[header_row_index + 1 :].reset_index(drop=True)
-    
-    # Identificar columna Link y Columna Fecha
-    col_link = next((c for c in df.columns if "link" in str(c).lower()), None)
-    col_fecha = next((c for c in df.columns if "fecha" in str(c).lower() or "date" in str(c).lower()), None)
-    # CHECK 5: Identificar columna de Hora separada
-    col_hora = next((c for c in df.columns if "hora" in str(c).lower() or "time" in str(c).lower()), None)
-
-    if not col_link:
-        raise HTTPException(status_code=400, detail="No encontré columna de Links")
-
-    # 5. PREPARAR DATOS PARA EL SERVICIO
-    # En lugar de mandar solo links, mandamos una lista de diccionarios con fecha
-    datos_procesar = []
-    
-    for _, row in df.iterrows():
-        link = str(row[col_link]).strip()
-        if not link.startswith("http"): continue
-        
-        # Intentar parsear fecha, si no existe o falla, usa HOY
-        fecha_obj = datetime.now()
-        if col_fecha and pd.notna(row[col_fecha]):
-            try:
-                # Pandas es inteligente parseando fechas
-                fecha_obj = pd.to_datetime(row[col_fecha]).to_pydatetime()
-            except:
-                pass # Si falla el parseo, se queda con la fecha de hoy
-        
-        # CHECK 5: Concatenar hora si existe columna separada
-        if col_hora and pd.notna(row[col_hora]):
-            try:
-                hora_str = str(row[col_hora]).strip()
-                # Parsear diferentes formatos de hora: "12:30", "12:30:00", "1230"
-                if ":" in hora_str:
-                    partes = hora_str.split(":")
-                    hora = int(partes[0])
-                    minuto = int(partes[1]) if len(partes) > 1 else 0
-                    segundo = int(partes[2]) if len(partes) > 2 else 0
-                else:
-                    # Formato sin separador (ej: "1230")
-                    hora = int(hora_str[:2]) if len(hora_str) >= 2 else 0
-                    minuto = int(hora_str[2:4]) if len(hora_str) >= 4 else 0
-                    segundo = 0
-                
-                # Combinar fecha + hora
-                fecha_obj = fecha_obj.replace(hour=hora, minute=minuto, second=segundo)
-            except Exception as e:
-                print(f"⚠️ No se pudo parsear hora '{row[col_hora]}': {e}")
-                # Mantiene la fecha sin hora específica
-        
-        datos_procesar.append({
-            "link": link,
-            "fecha": fecha_obj
-        })
-
-    # 6. INVOCAR AL SERVICIO
+    # 3. INVOCAR AL SERVICIO
+    # Import diferido: torch/cv2/ultralytics solo se cargan en workers que procesan imágenes
+    from app.services.quality_service import QualityService
     servicio = QualityService(db)
-    # OJO: Tienes que actualizar tu quality_service para que acepte este nuevo formato
-    # (Ver instrucciones abajo)
-    resultados = servicio.procesar_lista_con_metadata(datos_procesar, locacion)
+    resultado = servicio.procesar_lista_con_metadata(registros, locacion)
 
     return {
         "status": "OK",
-        "total_procesados": len(resultados),
-        "detalle": resultados
+        "total_procesados": resultado["procesados"],
+        "total_errores": resultado["errores"],
+        # Solo las primeras filas (ver MAX_DETALLE_RESULTADOS); el resto se cuenta
+        "detalle": resultado["detalle"],
+        "detalle_omitido": resultado["detalle_omitido"],
+        "reporte_parseo": reporte.to_dict()
     }
 
 
 # ==========================================
 # 2. LISTADO Y FILTROS (GET)
 # ==========================================
-@router.get("/", response_model=List[InspeccionResponse])
-def leer_inspecciones(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 50,
+# Tope de filas por página (limit=0 rompía el cursor; negativos llegaban a .limit())
+MAX_LIMITE_PAGINA = 1000
+
+@router.get("/", response_model=Union[List[InspeccionResponse], InspeccionPaginaResponse])
+async def leer_inspecciones(
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_LIMITE_PAGINA),
+    # Paginación por cursor: si se envía 'cursor' (o paginacion=cursor) se usa keyset
+    # y la respuesta es {items, next_cursor}. Sin eso, se mantiene offset (lista plana).
+    paginacion: Literal["offset", "cursor"] = "offset",
+    cursor: Optional[str] = None,
     # Filtros
     id: Optional[str] = None,
+    # Búsqueda por id: "prefijo" (por defecto) y "exacto" usan el índice; "parcial" es LIKE
+    id_modo: Literal["exacto", "prefijo", "parcial"] = "prefijo",
     locacion: Optional[str] = None,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
@@ -139,40 +90,44 @@ def leer_inspecciones(
     sort_by: Optional[str] = "id",
     sort_order: Optional[str] = "desc"
 ):
-    # 1. USAMOS EL SERVICIO
-    query = InspeccionService.aplicar_filtros(
-        db=db,
-        id=id,
-        locacion=locacion,
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin,
-        veredicto=veredicto
-    )
+    # La consulta (ORM sync) corre sobre la conexión async con run_sync
+    def _consultar(sesion: Session):
+        # 1. USAMOS EL SERVICIO
+        query = InspeccionService.aplicar_filtros(
+            db=sesion,
+            id=id,
+            locacion=locacion,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            veredicto=veredicto,
+            id_modo=id_modo
+        )
 
-    # 2. APLICAMOS ORDENAMIENTO (Esto suele ser específico del endpoint)
-    # Validamos que la columna exista para evitar inyecciones o errores
-    if hasattr(Inspeccion, sort_by):
-        order_column = getattr(Inspeccion, sort_by)
-    else:
-        order_column = Inspeccion.id
-
-    if sort_order == "asc":
-        query = query.order_by(order_column.asc())
-    else:
-        query = query.order_by(order_column.desc())
-    
-    # 3. PAGINACIÓN Y EJECUCIÓN
-    registros = query.offset(skip).limit(limit).all()
-    
-    return registros
+        # 2. PAGINACIÓN POR CURSOR (no recorre las filas saltadas)
+        if cursor or paginacion == "cursor":
+            registros, next_cursor = InspeccionService.paginar_por_cursor(
+                query, limit=limit, cursor=cursor, sort_by=sort_by, sort_order=sort_order
+            )
+            return InspeccionPaginaResponse(items=registros, next_cursor=next_cursor)
+
+        # 3. ORDENAMIENTO + OFFSET (compatibilidad con el front actual)
+        # El servicio valida que la columna exista para evitar inyecciones o errores
+        query = InspeccionService.ordenar(query, sort_by, sort_order)
+        return query.offset(skip).limit(limit).all()
+
+    try:
+        return await db.run_sync(_consultar)
+    except ValueError as e:
+        # Cursor inválido o de otro ordenamiento
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # ==========================================
 # 3. DETALLE ÚNICO (GET)
 # ==========================================
 @router.get("/{id}", response_model=InspeccionResponse)
-def leer_inspeccion_detalle(id: int, db: Session = Depends(get_db)):
-    inspeccion = db.query(Inspeccion).filter(Inspeccion.id == id).first()
+async def leer_inspeccion_detalle(id: int, db: AsyncSession = Depends(get_async_db)):
+    inspeccion = await db.get(Inspeccion, id)
     if not inspeccion:
         raise HTTPException(status_code=404, detail="Inspección no encontrada")
     return inspeccion
@@ -181,6 +136,26 @@ def leer_inspeccion_detalle(id: int, db: Session = Depends(get_db)):
 # ==========================================
 # 4. CORRECCIÓN HUMANA (PATCH)
 # ==========================================
+# Tope de correcciones por request: una sesión de revisión entra de sobra
+MAX_CORRECCIONES_LOTE = 1000
+
+# Declarada antes de /{id}: si no, "bulk" se intenta leer como id
+@router.patch("/bulk", response_model=InspeccionCorreccionLoteResponse)
+def corregir_inspecciones_lote(
+    lote: InspeccionCorreccionLote,
+    db: Session = Depends(get_db)
+):
+    """
+    Varias correcciones en una transacción: [{"id": 12, "horneado_clase": "alto"}, ...].
+    Responde un resultado por ítem (mismo orden); los que fallan no impiden guardar el resto.
+    """
+    if not lote.correcciones:
+        raise HTTPException(status_code=400, detail="No hay correcciones")
+    if len(lote.correcciones) > MAX_CORRECCIONES_LOTE:
+        raise HTTPException(status_code=413,
+                            detail=f"Máximo {MAX_CORRECCIONES_LOTE} correcciones por solicitud")
+    return InspeccionService.corregir_lote(db, lote.correcciones)
+
 @router.patch("/{id}", response_model=InspeccionResponse)
 def corregir_inspeccion(
     id: int,
@@ -203,14 +178,7 @@ def corregir_inspeccion(
         setattr(inspeccion, key, value)
 
     # RE-SCORING
-    datos_para_scoring = {
-        "tiene_burbujas": inspeccion.tiene_burbujas,
-        "bordes_sucios": inspeccion.bordes_sucios, 
-        "tiene_grasa": inspeccion.tiene_grasa,
-        "horneado": inspeccion.horneado_clase,
-        "distribucion": inspeccion.distribucion_clase,
-        "bordes_limpios": not inspeccion.bordes_sucios 
-    }
+    datos_para_scoring = datos_desde_inspeccion(inspeccion)
     
     nuevos_scores = calcular_puntaje(datos_para_scoring)
     
@@ -221,8 +189,12 @@ def corregir_inspeccion(
     inspeccion.score_distribucion = nuevos_scores['distribucion']
     inspeccion.puntaje_total = nuevos_scores['total']
     inspeccion.veredicto = nuevos_scores['veredicto']
+    inspeccion.banda = nuevos_scores['banda']
+    inspeccion.version_reglas = nuevos_scores['version_reglas']
     
     db.commit()
+    # Si el día ya estaba cerrado, su snapshot diario cambia con la corrección
+    ResumenDiarioService.actualizar_dias(db, {(inspeccion.locacion, inspeccion.fecha)})
     db.refresh(inspeccion)
     return inspeccion
 
@@ -240,122 +212,66 @@ def obtener_opciones_filtro(db: Session = Depends(get_db)):
     return {"locaciones": sorted(lista_locaciones)}
 
 # ==========================================
-# 6. EXPORTAR A EXCEL 
+# 6. EXPORTAR A EXCEL / CSV (STREAMING)
 # ==========================================
+# La generación vive en export_service: recorre la BD por bloques y envía
+# los bytes a medida que se producen, con memoria constante.
 
-@router.get("/exportar/excel")
-def exportar_inspecciones_excel(
-    # Recibimos los mismos filtros que usas en el GET normal
+def filtros_exportacion(
     id: Optional[str] = None,
+    id_modo: Literal["exacto", "prefijo", "parcial"] = "prefijo",
     locacion: Optional[str] = None,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
     veredicto: Optional[str] = None,
-    limit: int = 999999, # Límite alto para exportación
-    db: Session = Depends(get_db),
-):
-    # 1. REUTILIZAMOS LA LÓGICA
-    query = InspeccionService.aplicar_filtros(
-        db=db,
-        id=id,
-        locacion=locacion,
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin,
-        veredicto=veredicto
-    )
-    
-    # 2. Ordenar y obtener datos
-    resultados = query.order_by(Inspeccion.fecha_hora.desc()).limit(limit).all()
-    
-    # 2. Convertir a DataFrame de Pandas (Para manipular fácil)
-    data = []
-    for ins in resultados:
-        data.append({
-            "ID": ins.id,
-            "Fecha": ins.fecha_hora, # Aquí podrías ajustar Timezone si quisieras
-            "Sucursal": ins.locacion,
-            "Puntaje": ins.puntaje_total,
-            "Veredicto": "PASS" if ins.puntaje_total >= 80 else "FAIL",
-            "Burbujas": "Sí" if ins.tiene_burbujas else "No",
-            "Bordes Sucios": "Sí" if ins.bordes_sucios else "No",
-            "Horneado": ins.horneado_clase,
-            "Distribución": ins.distribucion_clase,
-            "Grasa": "Sí" if ins.tiene_grasa else "No",
-            "Link Imagen": ins.aws_link
-        })
-        
-    df = pd.DataFrame(data)
-    
-    # 3. Generar el archivo en memoria (BytesIO)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Inspecciones')
-        
-        # Obtener la hoja activa para aplicar estilos
-        workbook = writer.book
-        worksheet = writer.sheets['Inspecciones']
-        
-        # Estilo de borde
-        thin_border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        # Estilo para encabezados
-        header_fill = PatternFill(start_color='AFC7A5', end_color='1F2937', fill_type='solid')
-        header_font = Font(bold=True, color='000000', size=11)
-        
-        # Aplicar estilo a encabezados
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Aplicar bordes y alineación a todas las celdas de datos
-        for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row, min_col=1, max_col=worksheet.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(vertical='center')
-        
-        # Auto-ajustar ancho de columnas con lógica mejorada
-        for idx, column in enumerate(worksheet.columns, 1):
-            max_length = 0
-            column_letter = column[0].column_letter
-            column_name = column[0].value  # Nombre del encabezado
-            
-            for cell in column:
-                try:
-                    if cell.value:
-                        # Calcular longitud considerando el contenido
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                except:
-                    pass
-            
-            # Lógica especial para columna "Link Imagen" (última columna)
-            if column_name == "Link Imagen":
-                # Aplicar wrap_text (ajuste de texto) a todas las celdas de esta columna
-                for cell in column:
-                    if cell.row > 1:  # Saltar encabezado
-                        cell.alignment = Alignment(vertical='center', wrap_text=True)
-                # Ancho fijo para links (suficiente para mostrar bien con wrap)
-                worksheet.column_dimensions[column_letter].width = 40
-                # Ajustar altura de filas automáticamente
-                for row_idx in range(2, worksheet.max_row + 1):
-                    worksheet.row_dimensions[row_idx].height = None  # Auto
-            else:
-                # Para otras columnas, ajustar al contenido con límite razonable
-                adjusted_width = min(max_length + 3, 40)  # Máximo 40 caracteres
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-    
-    output.seek(0)
-    
-    # 4. Devolver como descarga
+) -> dict:
+    """Los mismos filtros del GET normal, compartidos por todos los formatos de exportación."""
+    return dict(id=id, id_modo=id_modo, locacion=locacion,
+                fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, veredicto=veredicto)
+
+
+def _descarga(generador, extension: str, media_type: str) -> StreamingResponse:
     headers = {
-        'Content-Disposition': f'attachment; filename="reporte_gritsee_{datetime.now().strftime("%Y%m%d")}.xlsx"'
+        'Content-Disposition': f'attachment; filename="reporte_gritsee_{datetime.now().strftime("%Y%m%d")}.{extension}"'
     }
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(generador, headers=headers, media_type=media_type)
+
+
+@router.get("/exportar/excel")
+def exportar_inspecciones_excel(
+    filtros: dict = Depends(filtros_exportacion),
+    limit: Optional[int] = Query(None, ge=1), # Sin límite por defecto: el streaming no carga todo en memoria
+):
+    from app.services import export_service  # pyarrow/openpyxl: import diferido
+    return _descarga(
+        export_service.generar_excel(filtros, limit), "xlsx",
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+@router.get("/exportar/csv")
+def exportar_inspecciones_csv(
+    filtros: dict = Depends(filtros_exportacion),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    from app.services import export_service  # pyarrow/openpyxl: import diferido
+    return _descarga(export_service.generar_csv(filtros, limit), "csv", 'text/csv; charset=utf-8')
+
+
+# Formatos columnares para el equipo de datos: tipos reales y 10-50x más livianos que xlsx
+@router.get("/exportar/parquet")
+def exportar_inspecciones_parquet(
+    filtros: dict = Depends(filtros_exportacion),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    from app.services import export_service  # pyarrow/openpyxl: import diferido
+    return _descarga(export_service.generar_parquet(filtros, limit), "parquet", 'application/vnd.apache.parquet')
+
+
+@router.get("/exportar/arrow")
+def exportar_inspecciones_arrow(
+    filtros: dict = Depends(filtros_exportacion),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    from app.services import export_service  # pyarrow/openpyxl: import diferido
+    return _descarga(export_service.generar_arrow(filtros, limit), "arrows", 'application/vnd.apache.arrow.stream')
@@ -0,0 +1,68 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.core.model_loader import model_manager, inferencia_habilitada, RESNETS
+from app.core.security import get_current_user, UsuarioAutenticado
+from app.services.sombra_service import EvaluadorSombra, evaluador_sombra
+
+router = APIRouter()
+
+
+# ==========================================
+# ESTADO DE LOS MODELOS
+# ==========================================
+@router.get("/estado")
+def estado_modelos(current_user: UsuarioAutenticado = Depends(get_current_user)):
+    """Versión en uso de cada modelo y resultado de la última recarga (de este worker)."""
+    return {
+        "cargados": model_manager.cargados,
+        "listo": model_manager.listo,
+        "calentamiento": model_manager.calentamiento,
+        "version_modelos": model_manager.version_modelos,
+        "versiones": model_manager.versiones,
+        "formato_pesos": model_manager.formato_pesos,
+        "recarga": model_manager.estado_recarga,
+        "sombra": {
+            "candidatos": {nombre: model_manager.actual.sombra.versiones[nombre]
+                           for nombre in model_manager.actual.candidatos()},
+            **evaluador_sombra.estado(),
+        },
+    }
+
+
+# ==========================================
+# RECARGA EN CALIENTE
+# ==========================================
+@router.post("/recargar", status_code=status.HTTP_202_ACCEPTED)
+def recargar_modelos(current_user: UsuarioAutenticado = Depends(get_current_user)):
+    """
+    Carga los modelos indicados por los manifiestos actuales en segundo plano, los
+    calienta y los pone en uso sin reiniciar. Consultar /estado para ver el resultado.
+    Cada worker tiene sus modelos: con varios workers usar la señal
+    (kill -USR2 a cada PID de worker) para recargarlos todos.
+    """
+    if not inferencia_habilitada():
+        raise HTTPException(status_code=503, detail="Este worker no hace inferencia (API_MODO=lectura)")
+    if not model_manager.recargar_en_segundo_plano():
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    return {"status": "recargando", "version_actual": model_manager.version_modelos}
+
+
+# ==========================================
+# EVALUACIÓN EN SOMBRA
+# ==========================================
+@router.get("/sombra")
+def resumen_sombra(
+    cabeza: Optional[str] = Query(None, description=f"Una de: {', '.join(RESNETS)}"),
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(get_current_user),
+):
+    """
+    Por candidato: muestras, tasa de desacuerdo con producción y latencia media de
+    ambos modelos. Junta lo registrado por todos los workers.
+    """
+    if cabeza is not None and cabeza not in RESNETS:
+        raise HTTPException(status_code=400, detail=f"Cabeza desconocida: {cabeza}")
+    return EvaluadorSombra.resumen(db, cabeza)
@@ -1,93 +1,681 @@
-import torch
-from ultralytics import YOLO
-from torchvision import models
-import torch.nn as nn
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
 from pathlib import Path
 
+from app.models.catalogos import DistribucionClase, HorneadoClase
+
+# torch / torchvision / ultralytics se importan dentro de los métodos: un worker que solo
+# sirve dashboards o auth (o un script como create_user.py) arranca sin cargarlos.
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent # Raíz
 MODEL_DIR = BASE_DIR / "modelos"
 
-class ModelManager:
-    def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Dispositivo seleccionado para modelos: {self.device}")
+# --- MODOS DE ARRANQUE ---
+# API_MODO=completo -> dashboards, auth e inferencia (batch-upload)
+# API_MODO=lectura  -> sin inferencia: nunca importa librerías de ML
+API_MODO = os.getenv("API_MODO", "completo").lower()
+# Cuándo cargar los modelos en modo completo:
+#   fondo      -> hilo en segundo plano al arrancar (el puerto queda escuchando de inmediato)
+#   primer_uso -> al llegar la primera imagen
+#   inicio     -> bloqueando el arranque (comportamiento anterior)
+#   precarga   -> al importar app.main; con gunicorn --preload eso ocurre en el master
+#                 antes del fork y todos los workers comparten los mismos pesos
+CARGA_MODELOS = os.getenv("CARGA_MODELOS", "fondo").lower()
+# Hilos de torch por worker (0 = núcleos / WEB_CONCURRENCY) para no sobre-suscribir la CPU
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0"))
+# Pasadas sintéticas por modelo al arrancar (la primera paga asignaciones y fusión de YOLO)
+CALENTAMIENTO_PASADAS = int(os.getenv("CALENTAMIENTO_PASADAS", "3"))
+# auto -> usa el .safetensors convertido si existe (mmap, sin copia); pth -> siempre torch.load
+FORMATO_PESOS = os.getenv("FORMATO_PESOS", "auto").lower()
+
+# --- MANIFIESTOS DE MODELOS ---
+# Cada modelo tiene un manifest.json en su carpeta: versión, archivo y sha256 de cada
+# variante (pth / safetensors / pt), orden de clases y tamaño de entrada.
+# Se generan con generar_manifiestos.py. Sin manifiesto se cae al glob de siempre.
+NOMBRE_MANIFIESTO = "manifest.json"
+# Checksums ya verificados (ruta -> tamaño, mtime, sha256): no se re-hashea en cada arranque
+CACHE_CHECKSUMS = MODEL_DIR / ".checksums_verificados.json"
+
+# --- EVALUACIÓN EN SOMBRA ---
+# Modelo candidato de una cabeza: <carpeta del modelo>/candidato/ con su propio manifest.json
+# (generar_manifiestos.py <cabeza> --candidato). Solo se carga si su tasa es > 0.
+CARPETA_CANDIDATO = "candidato"
+
+# nombre -> carpeta (relativa a MODEL_DIR), orden de clases y tamaño de entrada por defecto
+# (los valores de entrenamiento; el manifiesto los reemplaza)
+MODELOS = {
+    "yolo": {"carpeta": "runs/detect/modelo_pizza_v1", "clases": ["pizza"], "tamano_entrada": 640,
+             "archivo_sin_manifiesto": "weights/best.pt"},
+    # Horneado: etiquetas del catálogo en orden alfabético (así fueron entrenadas)
+    "resnet_horneado": {"carpeta": "resnet_horneado", "tamano_entrada": 224,
+                        "clases": sorted(HorneadoClase.etiquetas())},
+    # Burbujas: carpetas [no, si] -> índice 1 = tiene burbujas
+    "resnet_burbujas": {"carpeta": "resnet_burbujas", "clases": ["no", "si"], "tamano_entrada": 224},
+    # Bordes: carpetas [limpio, sucio] -> índice 1 = sucio
+    "resnet_bordes": {"carpeta": "resnet_bordes", "clases": ["limpio", "sucio"], "tamano_entrada": 224},
+    # Grasa: carpetas [no, si] -> índice 1 = tiene grasa
+    "resnet_grasa": {"carpeta": "resnet_grasa", "clases": ["no", "si"], "tamano_entrada": 224},
+    # Distribución: etiquetas del catálogo en orden alfabético (así fueron entrenadas)
+    "resnet_distribucion": {"carpeta": "resnet_distribucion", "tamano_entrada": 224,
+                            "clases": sorted(DistribucionClase.etiquetas())},
+}
 
-        # Inicializar variables vacías
+# Tipos del encabezado safetensors -> nombre del dtype en torch
+_DTYPES_SAFETENSORS = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def inferencia_habilitada() -> bool:
+    return API_MODO != "lectura"
+
+
+# Cabezas ResNet en el orden en que se cargan
+RESNETS = ["resnet_horneado", "resnet_burbujas", "resnet_bordes", "resnet_grasa", "resnet_distribucion"]
+
+
+def _leer_muestreo(texto: str) -> dict:
+    """'resnet_distribucion=0.1,resnet_grasa=0.05' -> {cabeza: fracción de imágenes}"""
+    muestreo = {}
+    for par in filter(None, (p.strip() for p in texto.split(","))):
+        nombre, _, tasa = par.partition("=")
+        nombre = nombre.strip()
+        if nombre not in RESNETS:
+            print(f"⚠️ SOMBRA_MUESTREO: cabeza desconocida '{nombre}' (se ignora)")
+            continue
+        try:
+            muestreo[nombre] = min(max(float(tasa), 0.0), 1.0)
+        except ValueError:
+            print(f"⚠️ SOMBRA_MUESTREO: tasa inválida para {nombre}: '{tasa}'")
+    return muestreo
+
+
+# Fracción de imágenes que además pasa por el candidato de cada cabeza (tope de CPU extra)
+SOMBRA_MUESTREO = _leer_muestreo(os.getenv("SOMBRA_MUESTREO", ""))
+
+
+class ModelosCargados:
+    """
+    Un conjunto completo de modelos ya cargados (YOLO + ResNets) con sus manifiestos.
+    No se modifica después de construirse: una recarga arma un conjunto nuevo y lo
+    intercambia entero, así que quien tomó una referencia sigue usando el suyo.
+    """
+    def __init__(self):
         self.yolo = None
         self.resnet_horneado = None
         self.resnet_distribucion = None
         self.resnet_bordes = None
         self.resnet_burbujas = None
         self.resnet_grasa = None
-        # Deteccion de GPU o CPU
 
-    # se usa self para referirse a la instancia actual de la clase
-    def load_models(self):
+        self.formato_pesos = {}   # carpeta -> "safetensors" | "pth"
+        self.manifiestos = {}     # nombre -> manifiesto leído (o los valores por defecto)
+        self.versiones = {}       # nombre -> {"version", "archivo", "sha256", "huella"} de lo cargado
+        self.version_modelos = None  # Versión del conjunto completo (se guarda en cada Inspeccion)
+        self.tiempo_carga = None  # segundos que tomó cargarlo
+        self.calentamiento = {}   # nombre -> {"primera_ms", "estable_ms"} del calentamiento
+        self.sombra = None        # ModelosCargados con los candidatos (solo cabezas en SOMBRA_MUESTREO)
+
+    def clases(self, nombre: str) -> list:
+        """Orden de salida del modelo (índice -> etiqueta)."""
+        return self.manifiestos.get(nombre, MODELOS[nombre])["clases"]
+
+    def tamano_entrada(self, nombre: str) -> int:
+        return self.manifiestos.get(nombre, MODELOS[nombre])["tamano_entrada"]
+
+    def redes(self) -> list:
+        """Módulos de torch cargados (las ResNet y la red interna de YOLO)."""
+        redes = [getattr(self, nombre) for nombre in RESNETS]
+        if self.yolo is not None:
+            redes.append(self.yolo.model)
+        return [r for r in redes if r is not None]
+
+    def candidatos(self) -> list:
+        """Cabezas con un modelo candidato cargado para evaluar en sombra."""
+        if self.sombra is None:
+            return []
+        return [nombre for nombre in RESNETS if getattr(self.sombra, nombre) is not None]
+
+    def faltantes(self) -> list:
+        return [nombre for nombre in ["yolo"] + RESNETS if getattr(self, nombre) is None]
+
+    def calcular_version(self):
+        """
+        Hash corto de las versiones cargadas: identifica el conjunto completo de modelos.
+        No depende de la variante usada (pth o safetensors de los mismos pesos).
+        """
+        return version_de_conjunto(self.versiones)
+
+
+class ModelManager:
+    def __init__(self):
+        self._device = None
+
+        # Conjunto en uso. Se reemplaza de una sola vez (asignación atómica) al recargar
+        self.actual = ModelosCargados()
+
+        # Estado de la carga (una sola vez aunque la pidan varios hilos)
+        self._lock = threading.Lock()
+        self._cargados = threading.Event()
+        self._hilo_carga = None
+        # Listo = cargado y calentado (lo que consulta /ready)
+        self._listo = threading.Event()
+        self._lock_calentamiento = threading.Lock()
+
+        # Recarga en caliente (una a la vez)
+        self._lock_recarga = threading.Lock()
+        self.estado_recarga = {"estado": "inactivo"}
+
+    @property
+    def device(self):
+        # Deteccion de GPU o CPU (importa torch recién cuando alguien lo necesita)
+        if self._device is None:
+            import torch
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            print(f"Dispositivo seleccionado para modelos: {self._device}")
+        return self._device
+
+    @property
+    def cargados(self) -> bool:
+        return self._cargados.is_set()
+
+    @property
+    def listo(self) -> bool:
+        return self._listo.is_set()
+
+    # Acceso directo al conjunto en uso (compatibilidad con model_manager.yolo, etc.)
+    def __getattr__(self, nombre):
+        if nombre in ("yolo", *RESNETS, "formato_pesos", "manifiestos", "versiones",
+                      "version_modelos", "tiempo_carga", "calentamiento", "clases", "tamano_entrada"):
+            return getattr(self.__dict__["actual"], nombre)
+        raise AttributeError(nombre)
+
+    def _resolver_pesos(self, conjunto: ModelosCargados, nombre: str, variantes_preferidas: list,
+                        candidato: bool = False):
+        """
+        Archivo de pesos a cargar según el manifiesto (una lectura, sin recorrer la carpeta).
+        Retorna (ruta, variante) o (None, None) si no hay pesos válidos.
+        Con candidato=True se lee <carpeta>/candidato/, que exige manifiesto.
+        """
+        carpeta = MODEL_DIR / MODELOS[nombre]["carpeta"]
+        if candidato:
+            carpeta = carpeta / CARPETA_CANDIDATO
+        manifiesto = leer_manifiesto(carpeta)
+
+        if manifiesto is None and candidato:
+            return None, None
+        if manifiesto is None:
+            # Compatibilidad: modelos sin manifiesto se buscan por nombre de archivo
+            print(f"⚠️ {nombre} sin {NOMBRE_MANIFIESTO}; se elige el archivo por glob")
+            conjunto.manifiestos[nombre] = dict(MODELOS[nombre])
+            fijo = MODELOS[nombre].get("archivo_sin_manifiesto")
+            ruta = (carpeta / fijo if (carpeta / fijo).exists() else None) if fijo else buscar_pesos(nombre)
+            if ruta is None:
+                return None, None
+            # La versión convertida con convertir_safetensors.py tiene el mismo nombre
+            if "safetensors" in variantes_preferidas and ruta.with_suffix(".safetensors").exists():
+                ruta = ruta.with_suffix(".safetensors")
+            conjunto.versiones[nombre] = {
+                "version": "sin_manifiesto", "archivo": ruta.name, "sha256": None, "huella": ruta.stem,
+            }
+            return ruta, ruta.suffix.lstrip(".")
+
+        conjunto.manifiestos[nombre] = {**MODELOS[nombre], **manifiesto}
+        variantes = manifiesto.get("variantes", {})
+        for variante in variantes_preferidas:
+            if variante not in variantes:
+                continue
+            info = variantes[variante]
+            ruta = carpeta / info["archivo"]
+            if not ruta.exists():
+                print(f"⚠️ {nombre}: falta {info['archivo']} (variante {variante})")
+                continue
+            if not checksums.verificar(ruta, info["sha256"]):
+                print(f"❌ {nombre}: sha256 de {info['archivo']} no coincide con el manifiesto")
+                continue
+            # Huella: sha de los pesos originales (.pth/.pt), igual para cualquier variante
+            original = variantes.get("pth") or variantes.get("pt") or info
+            conjunto.versiones[nombre] = {
+                "version": manifiesto.get("version"), "archivo": info["archivo"],
+                "sha256": info["sha256"], "huella": original["sha256"],
+            }
+            return ruta, variante
+        return None, None
+
+    def construir_conjunto(self) -> ModelosCargados:
+        """Carga todos los modelos en un conjunto nuevo (no toca el que está en uso)."""
+        from ultralytics import YOLO
+
+        inicio = time.perf_counter()
+        conjunto = ModelosCargados()
         print(f"Cargando modelos en {self.device}")
 
-        # Cargar YOLO 
-        path_yolo = MODEL_DIR / "runs" / "detect" / "modelo_pizza_v1" / "weights" / "best.pt"
-        if path_yolo.exists():
-            self.yolo = YOLO(str(path_yolo))
+        # Cargar YOLO
+        path_yolo, _ = self._resolver_pesos(conjunto, "yolo", ["pt"])
+        if path_yolo is not None:
+            conjunto.yolo = YOLO(str(path_yolo))
             print("YOLO cargado")
         else:
-            print(f"ERROR: No encontré el modelo YOLO en {path_yolo}")
-
-        #Cargar modelos ResNet
-        # Horneado (5 clases: Correcto, Alto, Bajo, Insuf, Excesivo)
-        self.resnet_horneado = self._load_resnet_custom("resnet_horneado", 5)
-        
-        # Burbujas (2 clases: Si, No)
-        self.resnet_burbujas = self._load_resnet_custom("resnet_burbujas", 2)
-        
-        # Bordes (2 clases: Limpios, Sucios)
-        self.resnet_bordes = self._load_resnet_custom("resnet_bordes", 2)
-        
-        # Grasa (2 clases: Si, No)
-        self.resnet_grasa = self._load_resnet_custom("resnet_grasa", 2)
-        
-        # Distribución ( 5 clases: Correcto, Alto, Bajo, Insuf, Excesivo)
-        self.resnet_distribucion = self._load_resnet_custom("resnet_distribucion", 5)
-    
-    def _load_resnet_custom(self, folder_name, num_classes):
-        # Buscamos el archivo finetuned (el mejor) o best.pth
-        model_path = MODEL_DIR / folder_name
-        
-        # Prioridad: finetuned > best > cualquier otro
-        finetuned = list(model_path.glob("*finetuned*.pth")) + list(model_path.glob("*FINETUNED*.pth"))
-        best = list(model_path.glob("*best*.pth"))
-        all_weights = list(model_path.glob("*.pth"))
-        
-        if finetuned:
-            weight_file = finetuned[0]
-        elif best:
-            weight_file = best[0]
-        elif all_weights:
-            weight_file = all_weights[0]
-        else:
-            print(f"No encontré pesos .pth en {folder_name}")
+            print(f"ERROR: No encontré el modelo YOLO en {MODEL_DIR / MODELOS['yolo']['carpeta']}")
+
+        #Cargar modelos ResNet (número de clases según el manifiesto)
+        # Horneado (5 clases), Burbujas (Si/No), Bordes (Limpios/Sucios), Grasa (Si/No), Distribución (5 clases)
+        for nombre in RESNETS:
+            setattr(conjunto, nombre, self._load_resnet_custom(conjunto, nombre))
+
+        # Los candidatos no cambian version_modelos: nunca deciden el resultado guardado
+        conjunto.sombra = self._construir_sombra(conjunto)
+        conjunto.version_modelos = conjunto.calcular_version()
+        conjunto.tiempo_carga = time.perf_counter() - inicio
+        print(f"⏱️ Modelos cargados en {conjunto.tiempo_carga:.2f}s (versión {conjunto.version_modelos})")
+        return conjunto
+
+    def _construir_sombra(self, conjunto: ModelosCargados):
+        """Candidatos de las cabezas con tasa de muestreo > 0 (None si no hay ninguno)."""
+        activos = [nombre for nombre, tasa in SOMBRA_MUESTREO.items() if tasa > 0]
+        if not activos:
+            return None
+        sombra = ModelosCargados()
+        for nombre in activos:
+            red = self._load_resnet_custom(sombra, nombre, candidato=True)
+            if red is None:
+                continue
+            # Se evalúa con el mismo tensor que producción: otro tamaño de entrada no sirve
+            if sombra.tamano_entrada(nombre) != conjunto.tamano_entrada(nombre):
+                print(f"⚠️ Candidato de {nombre} usa otro tamaño de entrada; no se evalúa en sombra")
+                continue
+            setattr(sombra, nombre, red)
+            print(f"👥 Candidato en sombra: {nombre} v{sombra.versiones[nombre]['version']} "
+                  f"({SOMBRA_MUESTREO[nombre]:.0%} de las imágenes)")
+        return sombra
+
+    # se usa self para referirse a la instancia actual de la clase
+    def load_models(self):
+        self.actual = self.construir_conjunto()
+
+    def asegurar_cargados(self):
+        """Carga los modelos si aún no lo están; si otro hilo los está cargando, espera."""
+        if self._cargados.is_set():
+            return
+        with self._lock:
+            if not self._cargados.is_set():
+                try:
+                    self.load_models()
+                finally:
+                    # Aunque falle algún modelo se marca: QualityService usa defaults
+                    # para los que quedaron en None (igual que antes)
+                    self._cargados.set()
+
+    def asegurar_listo(self):
+        """
+        Carga (si hace falta) y calienta el conjunto en uso. /ready responde OK solo si
+        cargaron todas las cabezas: un worker sin algún modelo no recibe tráfico
+        (una recarga en caliente completa lo habilita después).
+        """
+        self.asegurar_cargados()
+        if self._listo.is_set():
+            return
+        with self._lock_calentamiento:
+            if not self._listo.is_set():
+                try:
+                    self.calentar(self.actual)
+                except Exception as e:
+                    # Sin calentar igual se puede inferir (solo más lento la primera vez)
+                    print(f"⚠️ Calentamiento falló: {e}")
+                faltantes = self.actual.faltantes()
+                if faltantes:
+                    print(f"❌ Worker no listo, faltan modelos: {', '.join(faltantes)}")
+                else:
+                    self._listo.set()
+
+    def cargar_en_segundo_plano(self) -> threading.Thread:
+        """Inicia la carga y el calentamiento en un hilo y retorna de inmediato."""
+        if self._hilo_carga is None:
+            self._hilo_carga = threading.Thread(
+                target=self.asegurar_listo, name="carga-modelos", daemon=True
+            )
+            self._hilo_carga.start()
+        return self._hilo_carga
+
+    def esperar(self, timeout: float = None) -> bool:
+        return self._cargados.wait(timeout)
+
+    # ==========================================
+    # CALENTAMIENTO
+    # ==========================================
+    def calentar(self, conjunto: ModelosCargados, pasadas: int = CALENTAMIENTO_PASADAS) -> dict:
+        """
+        Pasadas sintéticas por YOLO y cada ResNet antes de recibir tráfico: la primera
+        inferencia paga el crecimiento del allocator, la inicialización de kernels y la
+        fusión de capas de YOLO. Registra la latencia de la primera pasada y la estable.
+        """
+        import numpy as np
+        import torch
+
+        cuda = self.device.type == "cuda"
+        tiempos = {}
+
+        def medir(nombre, inferir):
+            muestras = []
+            for _ in range(max(pasadas, 1)):
+                inicio = time.perf_counter()
+                inferir()
+                if cuda:
+                    torch.cuda.synchronize()
+                muestras.append((time.perf_counter() - inicio) * 1000)
+            tiempos[nombre] = {
+                "primera_ms": round(muestras[0], 1),
+                "estable_ms": round(min(muestras[1:] or muestras), 1),
+            }
+
+        inicio_total = time.perf_counter()
+        # Ruido y no ceros: con una imagen vacía YOLO no llega a la etapa de cajas
+        rng = np.random.default_rng(0)
+        if conjunto.yolo is not None:
+            lado = conjunto.tamano_entrada("yolo")
+            imagen = rng.integers(0, 256, (lado, lado, 3), dtype=np.uint8)
+            medir("yolo", lambda: conjunto.yolo(imagen, verbose=False, conf=0.25))
+
+        with torch.no_grad():
+            for nombre in RESNETS:
+                red = getattr(conjunto, nombre)
+                if red is None:
+                    continue
+                lado = conjunto.tamano_entrada(nombre)
+                entrada = torch.rand(1, 3, lado, lado, device=self.device)
+                medir(nombre, lambda: red(entrada))
+            # Candidatos también: si no, la primera comparación de latencia sale inflada
+            for nombre in conjunto.candidatos():
+                lado = conjunto.tamano_entrada(nombre)
+                entrada = torch.rand(1, 3, lado, lado, device=self.device)
+                medir(f"sombra:{nombre}", lambda: getattr(conjunto.sombra, nombre)(entrada))
+
+        conjunto.calentamiento = tiempos
+        resumen = ", ".join(f"{n} {t['primera_ms']:.0f}->{t['estable_ms']:.0f}ms" for n, t in tiempos.items())
+        print(f"🔥 Calentamiento en {time.perf_counter() - inicio_total:.2f}s: {resumen}")
+        return tiempos
+
+    # ==========================================
+    # RECARGA EN CALIENTE
+    # ==========================================
+    def recargar(self) -> dict:
+        """
+        Carga y calienta un conjunto nuevo desde los manifiestos actuales y lo pone en uso.
+        Las requests en curso terminan con el conjunto que ya tenían (QualityService toma
+        la referencia al crearse); el viejo se libera cuando la última lo suelta.
+        Si el conjunto nuevo tiene menos modelos que el actual, no se intercambia.
+        """
+        if not self._lock_recarga.acquire(blocking=False):
+            raise RuntimeError("Ya hay una recarga en curso")
+        anterior = self.actual
+        self.estado_recarga = {"estado": "cargando", "inicio": time.time(),
+                               "version_anterior": anterior.version_modelos}
+        try:
+            nuevo = self.construir_conjunto()
+            perdidos = set(nuevo.faltantes()) - set(anterior.faltantes())
+            if perdidos:
+                raise RuntimeError(f"No se pudieron cargar: {', '.join(sorted(perdidos))}")
+            self.calentar(nuevo)
+
+            # Intercambio atómico: las requests nuevas ya ven el conjunto nuevo
+            self.actual = nuevo
+            self._cargados.set()
+            if not nuevo.faltantes():
+                self._listo.set()
+            self.estado_recarga.update(estado="ok", fin=time.time(), version_nueva=nuevo.version_modelos)
+            print(f"🔄 Modelos recargados: {anterior.version_modelos} -> {nuevo.version_modelos}")
+        except Exception as e:
+            self.estado_recarga.update(estado="error", fin=time.time(), error=str(e))
+            print(f"❌ Recarga cancelada, se mantiene {anterior.version_modelos}: {e}")
+        finally:
+            self._lock_recarga.release()
+
+        # Sin referencias al conjunto viejo en este hilo: se libera al terminar la última request
+        del anterior
+        self._liberar_memoria()
+        return self.estado_recarga
+
+    def recargar_en_segundo_plano(self) -> bool:
+        """Lanza recargar() en un hilo. False si ya había una recarga en curso."""
+        if self._lock_recarga.locked():
+            return False
+        threading.Thread(target=self.recargar, name="recarga-modelos", daemon=True).start()
+        return True
+
+    def _liberar_memoria(self):
+        import gc
+
+        gc.collect()
+        if self._device is not None and self._device.type == "cuda":
+            import torch
+            torch.cuda.empty_cache()
+
+    def precargar(self):
+        """
+        Carga pensada para correr en el master de gunicorn antes del fork.
+        - Los tensores pasan a memoria compartida (share_memory): los workers leen
+          las mismas páginas en vez de tener cada uno su copia.
+        - No se ejecuta inferencia aquí: usar el pool de hilos de torch antes del fork
+          puede colgar a los hijos (OpenMP no sobrevive al fork).
+        - gc.freeze(): el recolector no recorre (ni escribe) los objetos ya creados,
+          así que sus páginas no se duplican por copy-on-write en cada worker.
+        Una recarga en caliente posterior carga el conjunto nuevo en cada worker (no compartido).
+        """
+        import gc
+
+        if self.device.type != "cpu":
+            # Un contexto CUDA creado en el master no sirve en los hijos: cada worker carga lo suyo
+            print("⚠️ Precarga solo aplica a CPU; los modelos se cargarán en cada worker")
+            return
+
+        self.asegurar_cargados()
+        # Las ResNet leídas de .safetensors ya son páginas del archivo mapeado (compartidas
+        # por el page cache); solo las cargadas con torch.load se mueven a memoria compartida
+        mapeadas = {getattr(self.actual, carpeta) for carpeta, formato in self.actual.formato_pesos.items()
+                    if formato == "safetensors"}
+        for red in self.actual.redes():
+            if red not in mapeadas:
+                red.share_memory()
+        gc.collect()
+        gc.freeze()
+        print("🧊 Modelos precargados en memoria compartida (listos para fork)")
+
+    def _load_resnet_custom(self, conjunto: ModelosCargados, folder_name, candidato: bool = False):
+        import torch
+        import torch.nn as nn
+        from torchvision import models
+
+        # safetensors (convertido con convertir_safetensors.py) primero, salvo FORMATO_PESOS=pth
+        preferidas = ["pth"] if FORMATO_PESOS == "pth" else ["safetensors", "pth"]
+        weight_file, variante = self._resolver_pesos(conjunto, folder_name, preferidas, candidato)
+        if weight_file is None:
+            print(f"No encontré pesos válidos en {folder_name}")
             return None
-        
+
+        usar_safetensors = variante == "safetensors"
+        num_classes = len(conjunto.clases(folder_name))
+
         print(f">>>> Cargando: {weight_file.name}")
-        
+
         try:
-            # Reconstruir arquitectura
-            model = models.resnet50(weights=None)
-            model.fc = nn.Linear(model.fc.in_features, num_classes)
-            
-            # Cargar pesos
-            state_dict = torch.load(weight_file, map_location=self.device)
-            model.load_state_dict(state_dict)
+            if usar_safetensors:
+                # Arquitectura en 'meta' (sin memoria) y los parámetros apuntan directo
+                # a los tensores mapeados: ni pickle ni segunda copia de los pesos
+                with torch.device("meta"):
+                    model = models.resnet50(weights=None)
+                    model.fc = nn.Linear(model.fc.in_features, num_classes)
+                model.load_state_dict(cargar_safetensors_mmap(weight_file), assign=True)
+            else:
+                # Reconstruir arquitectura
+                model = models.resnet50(weights=None)
+                model.fc = nn.Linear(model.fc.in_features, num_classes)
+
+                # Cargar pesos
+                state_dict = torch.load(weight_file, map_location=self.device)
+                model.load_state_dict(state_dict)
             model.to(self.device)
             model.eval() # Modo evaluación (apaga dropout, etc)
-            
+
+            conjunto.formato_pesos[folder_name] = "safetensors" if usar_safetensors else "pth"
             print(f">>>> {folder_name} cargado ({num_classes} clases)")
             return model
         except Exception as e:
             print(f"Error cargando {folder_name}: {e}")
             return None
-        
-# Ejecuta la línea a penas se cargue el servidor 
-model_manager = ModelManager()
 
-model_manager.load_models()
\ No newline at end of file
+
+def version_de_conjunto(versiones: dict):
+    """
+    Hash corto de {nombre: {"version", "huella", ...}}. Lo usa también el backfill
+    para nombrar conjuntos mixtos (filas viejas con una sola cabeza re-inferida).
+    """
+    if not versiones:
+        return None
+    huella = json.dumps(
+        {nombre: [v["version"], v["huella"]] for nombre, v in versiones.items()}, sort_keys=True
+    ).encode()
+    return hashlib.sha256(huella).hexdigest()[:12]
+
+
+def leer_manifiesto(carpeta: Path):
+    ruta = carpeta / NOMBRE_MANIFIESTO
+    if not ruta.exists():
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sha256_archivo(ruta: Path) -> str:
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        while bloque := f.read(1024 * 1024):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+class CacheChecksums:
+    """
+    Recuerda qué archivos ya se verificaron (por tamaño + mtime): hashear cinco
+    ResNet50 en cada arranque cuesta más que cargarlas. Si el archivo cambia, se re-verifica.
+    """
+    def __init__(self, ruta: Path = CACHE_CHECKSUMS):
+        self.ruta = ruta
+        self._entradas = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        if self._entradas is None:
+            try:
+                self._entradas = json.loads(self.ruta.read_text())
+            except (OSError, ValueError):
+                self._entradas = {}
+
+    def verificar(self, archivo: Path, sha_esperado: str) -> bool:
+        estado = archivo.stat()
+        clave = str(archivo.resolve())
+        with self._lock:
+            self._cargar()
+            entrada = self._entradas.get(clave)
+            if entrada and entrada["tamano"] == estado.st_size and entrada["mtime_ns"] == estado.st_mtime_ns:
+                return entrada["sha256"] == sha_esperado
+
+        sha = sha256_archivo(archivo)
+        with self._lock:
+            self._entradas[clave] = {"tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns, "sha256": sha}
+            try:
+                self.ruta.write_text(json.dumps(self._entradas, indent=1))
+            except OSError:
+                pass  # Carpeta de solo lectura: se verifica de nuevo en el próximo arranque
+        return sha == sha_esperado
+
+
+checksums = CacheChecksums()
+
+
+def buscar_pesos(folder_name):
+    """
+    Archivo .pth de una carpeta de modelo por nombre (modelos sin manifiesto).
+    Prioridad: finetuned > best > cualquier otro.
+    """
+    model_path = MODEL_DIR / MODELOS.get(folder_name, {}).get("carpeta", folder_name)
+
+    finetuned = list(model_path.glob("*finetuned*.pth")) + list(model_path.glob("*FINETUNED*.pth"))
+    best = list(model_path.glob("*best*.pth"))
+    all_weights = list(model_path.glob("*.pth"))
+
+    if finetuned:
+        return finetuned[0]
+    if best:
+        return best[0]
+    if all_weights:
+        return all_weights[0]
+    return None
+
+
+def cargar_safetensors_mmap(path) -> dict:
+    """
+    Lee un .safetensors sin copiar los datos: el archivo se mapea en memoria y cada
+    tensor es una vista sobre su rango de bytes. El SO trae las páginas recién cuando
+    se usan y las comparte (page cache) entre todos los procesos que abren el mismo archivo.
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        largo_encabezado = int.from_bytes(f.read(8), "little")
+        encabezado = json.loads(f.read(largo_encabezado))
+        # ACCESS_COPY: páginas compartidas mientras nadie escriba (torch exige buffer escribible)
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    inicio_datos = 8 + largo_encabezado
+    tensores = {}
+    for nombre, info in encabezado.items():
+        if nombre == "__metadata__":
+            continue
+        dtype = getattr(torch, _DTYPES_SAFETENSORS[info["dtype"]])
+        desde, hasta = info["data_offsets"]
+        if hasta == desde:
+            tensores[nombre] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        plano = torch.frombuffer(mapa, dtype=dtype, count=(hasta - desde) // dtype.itemsize,
+                                 offset=inicio_datos + desde)
+        tensores[nombre] = plano.view(info["shape"])
+    return tensores
+
+
+def listo_para_trafico() -> bool:
+    """
+    Lo que responde /ready. Sin inferencia no hay nada que esperar; con
+    CARGA_MODELOS=primer_uso se eligió explícitamente no cargar antes del primer uso.
+    """
+    if not inferencia_habilitada() or CARGA_MODELOS == "primer_uso":
+        return True
+    return model_manager.listo
+
+
+def configurar_hilos_torch(workers: int = None):
+    """
+    Reparte los núcleos entre workers: con N workers y torch usando todos los núcleos
+    en cada uno, los hilos compiten entre sí y la inferencia se vuelve más lenta.
+    Llamar en cada worker (post_fork de gunicorn / arranque de uvicorn).
+    """
+    import torch
+
+    workers = workers or int(os.getenv("WEB_CONCURRENCY", "1"))
+    hilos = TORCH_THREADS or max(1, (os.cpu_count() or 1) // max(workers, 1))
+    torch.set_num_threads(hilos)
+    try:
+        # Solo se puede fijar antes de cualquier trabajo paralelo en el proceso
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    print(f"🧵 torch: {hilos} hilos por worker ({workers} workers)")
+    return hilos
+
+
+# Instancia única; los modelos se cargan según CARGA_MODELOS (ver main.py)
+model_manager = ModelManager()
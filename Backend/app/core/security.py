@@ -1,16 +1,49 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status, Request
+from sqlalchemy import event
+
+from app.db.session import SessionLocal
+from app.models.user import User
 
 # CONFIGURACIÓN (Idealmente usa variables de entorno)
 SECRET_KEY = "CLAVE_SUPER_SECRETA_CAMBIAME_EN_PRODUCCION"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 5256000  # 10 años
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Caché de usuarios autenticados (por proceso)
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))      # segundos antes de re-verificar en la BD
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "1000"))    # tokens distintos en memoria
+AUTH_REVOCADOS_MAX = int(os.getenv("AUTH_REVOCADOS_MAX", "10000"))  # logouts recordados por proceso
+
+# Costo de bcrypt (2^rounds iteraciones): cada +1 duplica el tiempo por login.
+# Elegirlo con benchmark_login.py contra el SLO de login del hardware de producción.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hilos dedicados a bcrypt: tope de CPU que los logins pueden quitarle al resto de la API
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+# Logins esperando turno; más allá se responde 503 en vez de acumular latencia
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", "64"))
+
+# min/max_rounds: sin ellos passlib no marca como desactualizado un hash de otro costo y
+# verify_and_update nunca devuelve el hash nuevo (ni al subir ni al bajar BCRYPT_ROUNDS)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -21,63 +54,271 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ==========================================
+# HASHING FUERA DEL EVENT LOOP
+# ==========================================
+# bcrypt ocupa 100-300 ms de CPU: ejecutado dentro de un 'async def' congela todas las
+# requests del worker. Se manda a un pool chico propio (no al threadpool de FastAPI,
+# que atiende los endpoints sync) y se mide cuánto espera cada tarea en la cola.
+class MetricasHash:
+    """Tiempos de espera en cola y de ejecución de las últimas tareas de hashing."""
+    def __init__(self, ventana: int = 500):
+        self._espera = deque(maxlen=ventana)
+        self._ejecucion = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.rechazadas = 0
+        self.pendientes = 0  # Solo lo modifica el event loop
+
+    def registrar(self, espera: float, ejecucion: float):
+        with self._lock:
+            self._espera.append(espera)
+            self._ejecucion.append(ejecucion)
+            self.total += 1
+
+    @staticmethod
+    def _percentiles(muestras: list) -> dict:
+        if not muestras:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordenadas = sorted(muestras)
+        def p(q):
+            return round(ordenadas[min(int(q * len(ordenadas)), len(ordenadas) - 1)] * 1000, 1)
+        return {"p50_ms": p(0.50), "p95_ms": p(0.95), "max_ms": round(ordenadas[-1] * 1000, 1)}
+
+    def resumen(self) -> dict:
+        with self._lock:
+            espera, ejecucion = list(self._espera), list(self._ejecucion)
+        return {
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "workers": HASH_WORKERS,
+            "total": self.total,
+            "rechazadas": self.rechazadas,
+            "pendientes": self.pendientes,
+            "espera_cola": self._percentiles(espera),
+            "ejecucion": self._percentiles(ejecucion),
+        }
+
+
+metricas_hash = MetricasHash()
+_ejecutor_hash = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def _ejecutar_hash(funcion, *args):
+    if metricas_hash.pendientes >= HASH_MAX_PENDIENTES:
+        metricas_hash.rechazadas += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiados inicios de sesión simultáneos, intenta de nuevo",
+            headers={"Retry-After": "1"},
+        )
+
+    encolado = time.perf_counter()
+
+    def tarea():
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            metricas_hash.registrar(inicio - encolado, time.perf_counter() - inicio)
+
+    metricas_hash.pendientes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_ejecutor_hash, tarea)
+    finally:
+        metricas_hash.pendientes -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    (válida, hash_nuevo). hash_nuevo viene cuando el hash guardado usa otro costo
+    que BCRYPT_ROUNDS: guardarlo migra al usuario al costo actual en su próximo login.
+    """
+    return await _ejecutar_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _ejecutar_hash(pwd_context.hash, password)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti: identificador único del token (clave de la caché y de la revocación en logout)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
-    """Decodifica el token y retorna el username (sub) o None si es inválido."""
+def decode_token_payload(token: str) -> Optional[dict]:
+    """Payload del token verificado (firma y expiración) o None si es inválido."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        return username
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
 
-# --- DEPENDENCIA PARA RUTAS PROTEGIDAS ---
-def get_db():
-    from app.db.session import SessionLocal
+def decode_access_token(token: str) -> Optional[str]:
+    """Decodifica el token y retorna el username (sub) o None si es inválido."""
+    payload = decode_token_payload(token)
+    return payload.get("sub") if payload else None
+
+
+def token_id(token: str, payload: dict) -> str:
+    """jti del token; los tokens emitidos antes de tener jti se identifican por su hash."""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+# ==========================================
+# CACHÉ DE USUARIOS VERIFICADOS
+# ==========================================
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    """Copia inmutable del usuario: se comparte entre requests sin tocar la sesión de BD."""
+    id: int
+    username: str
+    is_active: bool
+
+
+class CacheUsuarios:
+    """
+    TTL en memoria: token id -> usuario verificado.
+    Cada worker tiene la suya; el TTL acota cuánto tarda en verse un cambio hecho
+    desde otro proceso. Dentro del proceso, logout y desactivación invalidan al instante.
+    Las revocaciones (logout) también son por worker: otro proceso sigue aceptando el
+    token. Se guardan hasta que el token expira, con un tope de 'maximo_revocados'
+    (al llenarse se olvida la revocación más vieja).
+    """
+    def __init__(self, ttl: int = AUTH_CACHE_TTL, maximo: int = AUTH_CACHE_MAX,
+                 maximo_revocados: int = AUTH_REVOCADOS_MAX):
+        self.ttl = ttl
+        self.maximo = maximo
+        self.maximo_revocados = maximo_revocados
+        self._entradas = {}   # jti -> (vence_en, UsuarioAutenticado)
+        self._revocados = {}  # jti -> exp del token (no hace falta recordarlo más allá)
+        self._lock = threading.Lock()
+
+    def obtener(self, jti: str) -> Optional[UsuarioAutenticado]:
+        with self._lock:
+            entrada = self._entradas.get(jti)
+            if not entrada:
+                return None
+            vence_en, usuario = entrada
+            if vence_en < time.monotonic():
+                del self._entradas[jti]
+                return None
+            return usuario
+
+    def guardar(self, jti: str, usuario: UsuarioAutenticado):
+        with self._lock:
+            if len(self._entradas) >= self.maximo and jti not in self._entradas:
+                # dict mantiene el orden de inserción: se descarta la entrada más vieja
+                self._entradas.pop(next(iter(self._entradas)))
+            self._entradas[jti] = (time.monotonic() + self.ttl, usuario)
+
+    def revocar(self, jti: str, exp: Optional[float] = None):
+        """Logout: el token deja de ser aceptado por este proceso."""
+        with self._lock:
+            self._entradas.pop(jti, None)
+            # Los tokens ya expirados los rechaza la firma: no hace falta recordarlos
+            ahora = time.time()
+            for vencido in [j for j, vence in self._revocados.items() if vence < ahora]:
+                del self._revocados[vencido]
+            if len(self._revocados) >= self.maximo_revocados and jti not in self._revocados:
+                self._revocados.pop(next(iter(self._revocados)))
+            self._revocados[jti] = exp or float("inf")
+
+    def esta_revocado(self, jti: str) -> bool:
+        with self._lock:
+            if jti not in self._revocados:
+                return False
+            if self._revocados[jti] < time.time():
+                # El token ya expiró: la firma lo rechaza por sí sola
+                del self._revocados[jti]
+                return False
+            return True
+
+    def invalidar_usuario(self, username: str):
+        """Desactivación / cambio de contraseña: se olvidan todos los tokens del usuario."""
+        with self._lock:
+            for jti in [j for j, (_, u) in self._entradas.items() if u.username == username]:
+                del self._entradas[jti]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_usuarios = CacheUsuarios()
+
+
+@event.listens_for(User, "after_update")
+def _invalidar_usuario_modificado(mapper, connection, target):
+    # Cualquier UPDATE sobre el usuario (is_active, contraseña) obliga a re-verificar
+    cache_usuarios.invalidar_usuario(target.username)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidar_usuario_eliminado(mapper, connection, target):
+    cache_usuarios.invalidar_usuario(target.username)
+
+
+def _buscar_usuario(username: str) -> Optional[UsuarioAutenticado]:
     db = SessionLocal()
     try:
-        yield db
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            return None
+        return UsuarioAutenticado(id=user.id, username=user.username, is_active=bool(user.is_active))
     finally:
         db.close()
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+# --- DEPENDENCIA PARA RUTAS PROTEGIDAS ---
+def get_current_user(request: Request) -> UsuarioAutenticado:
     """
     Lee el token desde la cookie 'access_token' y retorna el usuario.
     Usar como dependencia en rutas protegidas.
+    Solo consulta la BD si el token no está en la caché (o su entrada venció).
     """
-    from app.models.user import User
-    
     token = request.cookies.get("access_token")
-    
+
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No autenticado",
         )
-    
-    username = decode_access_token(token)
-    
+
+    payload = decode_token_payload(token)
+    username = payload.get("sub") if payload else None
+
     if not username:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
         )
-    
-    user = db.query(User).filter(User.username == username).first()
-    
-    if not user:
+
+    jti = token_id(token, payload)
+    if cache_usuarios.esta_revocado(jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión cerrada",
+        )
+
+    user = cache_usuarios.obtener(jti)
+    if user is None:
+        user = _buscar_usuario(username)
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado",
+            )
+        cache_usuarios.guardar(jti, user)
+
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado",
+            detail="Usuario desactivado",
         )
-    
-    return user
\ No newline at end of file
+
+    return user
@@ -0,0 +1,150 @@
+from sqlalchemy import inspect, text, update, insert, select, func, extract, case, null, String, Table, MetaData
+from sqlalchemy.engine import Engine
+
+from app.db.session import Base
+from app.models.catalogos import ClaseCodificada, ALIAS_ETIQUETAS
+
+# ==========================================
+# MIGRACIONES LIGERAS (SIN ALEMBIC)
+# ==========================================
+# Base.metadata.create_all() solo crea tablas nuevas: no agrega columnas
+# ni índices a tablas que ya existen. Estas funciones son idempotentes y se
+# ejecutan al arrancar, así una production.db vieja queda al día sola.
+
+
+def _agregar_columna_si_falta(conn, tabla, columna) -> bool:
+    """ALTER TABLE ADD COLUMN si la columna no existe. Retorna True si la agregó."""
+    existentes = {c["name"] for c in inspect(conn).get_columns(tabla.name)}
+    if columna.name in existentes:
+        return False
+
+    tipo = columna.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}'))
+    print(f"🛠️ Columna agregada: {tabla.name}.{columna.name}")
+    return True
+
+
+def _crear_indices_faltantes(conn, tabla):
+    """Crea los índices declarados en el modelo que todavía no existen en la BD."""
+    for indice in tabla.indexes:
+        indice.create(bind=conn, checkfirst=True)
+
+
+def _backfill_fecha_hora(conn):
+    """Rellena las columnas derivadas fecha/hora de las filas anteriores a su creación."""
+    from app.models.inspeccion import Inspeccion
+
+    resultado = conn.execute(
+        update(Inspeccion.__table__)
+        .where(Inspeccion.fecha.is_(None), Inspeccion.fecha_hora.isnot(None))
+        .values(
+            fecha=func.date(Inspeccion.fecha_hora),
+            hora=extract('hour', Inspeccion.fecha_hora),
+        )
+    )
+    if resultado.rowcount:
+        print(f"🛠️ Backfill fecha/hora: {resultado.rowcount} filas")
+
+
+def _backfill_banda(conn):
+    """Banda de las filas anteriores a la columna, con los cortes de las reglas vigentes."""
+    from app.models.inspeccion import Inspeccion
+    from app.services.scoring_logic import obtener_reglas
+
+    tabla = Inspeccion.__table__
+    resultado = conn.execute(
+        update(tabla)
+        .where(tabla.c.banda.is_(None), tabla.c.puntaje_total.isnot(None))
+        .values(banda=obtener_reglas().expresion_banda(tabla.c.puntaje_total))
+    )
+    if resultado.rowcount:
+        print(f"🛠️ Backfill banda: {resultado.rowcount} filas")
+
+
+def _expresion_codigo(columna_vieja, tipo: ClaseCodificada):
+    """CASE que traduce la etiqueta de texto vieja a su código entero."""
+    texto = func.lower(func.trim(columna_vieja))
+    whens = [(columna_vieja.is_(None), null())]
+    for miembro in tipo.catalogo:
+        whens.append((texto == miembro.etiqueta.lower(), int(miembro)))
+    for alias, canonica in ALIAS_ETIQUETAS.items():
+        miembro = tipo.catalogo.desde_etiqueta(canonica)
+        if miembro is not None:
+            whens.append((texto == alias, int(miembro)))
+    # Etiquetas desconocidas -> NULL: no se inventa una clase (se reportan antes de copiar)
+    return case(*whens, else_=null())
+
+
+def _reportar_desconocidas(conn, vieja, columnas) -> None:
+    """Imprime, por columna, las etiquetas que no son del catálogo y cuántas filas tienen."""
+    for columna in columnas:
+        viejo = vieja.c[columna.name]
+        conteos = conn.execute(
+            select(viejo, func.count()).where(viejo.isnot(None)).group_by(viejo)
+        ).all()
+        desconocidas = {valor: n for valor, n in conteos
+                        if columna.type.catalogo.desde_etiqueta(valor) is None}
+        if desconocidas:
+            detalle = ", ".join(f"'{valor}': {n}" for valor, n in sorted(desconocidas.items()))
+            print(f"⚠️ {columna.name}: etiquetas desconocidas quedan en NULL ({detalle})")
+
+
+def _recodificar_clases(conn, tabla):
+    """
+    Convierte las columnas de catálogo guardadas como texto a SMALLINT.
+    SQLite no permite ALTER COLUMN, así que se reconstruye la tabla:
+    renombrar -> crear con el esquema nuevo -> copiar recodificando -> borrar la vieja.
+    """
+    columnas_enum = [c for c in tabla.columns if isinstance(c.type, ClaseCodificada)]
+    tipos_bd = {c["name"]: c["type"] for c in inspect(conn).get_columns(tabla.name)}
+    pendientes = [c for c in columnas_enum if isinstance(tipos_bd.get(c.name), String)]
+    if not pendientes:
+        return
+
+    nombres_pendientes = {c.name for c in pendientes}
+    nombre_viejo = f"{tabla.name}_old"
+    # Los índices viajan con la tabla renombrada y chocarían con los nuevos
+    for indice in inspect(conn).get_indexes(tabla.name):
+        conn.execute(text(f'DROP INDEX IF EXISTS {indice["name"]}'))
+    conn.execute(text(f'ALTER TABLE {tabla.name} RENAME TO {nombre_viejo}'))
+    tabla.create(bind=conn)
+
+    vieja = Table(nombre_viejo, MetaData(), autoload_with=conn)
+    _reportar_desconocidas(conn, vieja, pendientes)
+    destino, origen = [], []
+    for columna in tabla.columns:
+        if columna.name not in vieja.c:
+            continue
+        destino.append(columna.name)
+        if columna.name in nombres_pendientes:
+            origen.append(_expresion_codigo(vieja.c[columna.name], columna.type))
+        else:
+            origen.append(vieja.c[columna.name])
+
+    resultado = conn.execute(insert(tabla).from_select(destino, select(*origen)))
+    conn.execute(text(f'DROP TABLE {nombre_viejo}'))
+    print(f"🛠️ Clases recodificadas a enteros ({', '.join(sorted(nombres_pendientes))}): "
+          f"{resultado.rowcount} filas")
+
+
+def aplicar_migraciones(engine: Engine):
+    """Lleva el esquema de una BD existente al estado de los modelos."""
+    from app.models.inspeccion import Inspeccion
+
+    tabla = Inspeccion.__table__
+
+    with engine.begin() as conn:
+        # 1. Columnas nuevas
+        for nombre in ("fecha", "hora", "version_modelos", "version_reglas", "banda"):
+            _agregar_columna_si_falta(conn, tabla, tabla.c[nombre])
+
+        # 2. Datos derivados de filas viejas
+        _backfill_fecha_hora(conn)
+
+        # 3. Clases de texto -> SMALLINT
+        _recodificar_clases(conn, tabla)
+        _backfill_banda(conn)
+
+        # 4. Índices (incluye los compuestos de __table_args__)
+        for t in Base.metadata.sorted_tables:
+            _crear_indices_faltantes(conn, t)
@@ -1,23 +1,71 @@
+import os
+import signal
+import asyncio
+import time
+ARRANQUE = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import engine, Base
+from fastapi.responses import JSONResponse
+from app.db.session import engine, async_engine, Base, optimizar_bd
+from app.db.migrations import aplicar_migraciones
 from app.models import inspeccion  
 from app.models import user 
-from app.api.v1.endpoints import inspeccion_endpoints, dashboard_endpoints, auth_endpoints 
+from app.models import modelo_version
+from app.models import evaluacion_sombra
+from app.models import resumen_diario
+from app.api.v1.endpoints import inspeccion_endpoints, dashboard_endpoints, auth_endpoints, modelos_endpoints
+from app.services.resumen_diario_service import bucle_cierre_diario
 from contextlib import asynccontextmanager
-from app.core.model_loader import model_manager
+from app.core.model_loader import (
+    model_manager, inferencia_habilitada, listo_para_trafico, configurar_hilos_torch,
+    API_MODO, CARGA_MODELOS
+)
 
 # --- CREACIÓN DE TABLAS ---
 # Al importar 'user' arriba, SQLAlchemy ya sabe que debe crear la tabla 'users'
 Base.metadata.create_all(bind=engine)
+# Columnas/índices nuevos sobre tablas que ya existían
+aplicar_migraciones(engine)
+
+# --- PRECARGA DE MODELOS ---
+# Con gunicorn --preload este import corre una sola vez en el master: los pesos se
+# cargan antes del fork y los workers los comparten (ver gunicorn.conf.py)
+if inferencia_habilitada() and CARGA_MODELOS == "precarga":
+    model_manager.precargar()
 
 # --- CICLO DE VIDA ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Iniciando servidor y cargando modelos de IA")
-    model_manager.load_models() 
+    print(f"Iniciando servidor (API_MODO={API_MODO}, CARGA_MODELOS={CARGA_MODELOS})")
+    optimizar_bd()
+    if inferencia_habilitada():
+        # Cada worker usa su parte de los núcleos (en gunicorn ya lo hizo post_fork)
+        if not os.getenv("GUNICORN_WORKER"):
+            configurar_hilos_torch()
+        if CARGA_MODELOS == "inicio":
+            model_manager.asegurar_listo()
+        elif CARGA_MODELOS in ("fondo", "precarga"):
+            # El servidor empieza a atender (dashboards/auth) mientras cargan y se calientan
+            # los modelos; /ready responde 503 hasta que terminen.
+            # En 'precarga' ya vienen cargados del master: aquí solo se calientan (post fork)
+            model_manager.cargar_en_segundo_plano()
+        # 'primer_uso': QualityService los carga al llegar la primera imagen (sin calentar)
+
+        # kill -USR2 <pid del worker>: recarga en caliente (igual que POST /api/v1/modelos/recargar)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, model_manager.recargar_en_segundo_plano)
+        except (NotImplementedError, RuntimeError, AttributeError):
+            pass  # Windows o loop fuera del hilo principal: queda solo el endpoint
+    # Snapshots diarios de métricas: cierra lo pendiente ahora y luego cada medianoche
+    cierre_diario = asyncio.create_task(bucle_cierre_diario())
+    print(f"⏱️ Servidor listo en {time.perf_counter() - ARRANQUE:.2f}s")
     yield
     print("Apagando servidor")
+    cierre_diario.cancel()
+    optimizar_bd()
+    # Cierra las conexiones del pool async dentro del event loop que las abrió
+    await async_engine.dispose()
 
 # --- CONFIGURACIÓN DE LA API ---
 app = FastAPI(
@@ -54,7 +102,31 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "db_connected": True}
+    return {
+        "status": "ok",
+        "db_connected": True,
+        "modo": API_MODO,
+        "modelos_cargados": model_manager.cargados,
+    }
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness para el balanceador: 503 hasta que los modelos estén cargados y calientes,
+    así ningún worker frío recibe tráfico. /health sigue siendo solo liveness.
+    """
+    cuerpo = {
+        "ready": listo_para_trafico(),
+        "modo": API_MODO,
+        "version_modelos": model_manager.version_modelos,
+        "calentamiento": model_manager.calentamiento,
+        # Cabezas que no cargaron (el worker no se marca listo mientras falte alguna)
+        "modelos_faltantes": model_manager.actual.faltantes()
+        if inferencia_habilitada() and model_manager.cargados else [],
+    }
+    if not cuerpo["ready"]:
+        return JSONResponse(status_code=503, content=cuerpo)
+    return cuerpo
 
 # --- ROUTERS DE LA API ---
 
@@ -77,4 +149,11 @@ app.include_router(
     auth_endpoints.router,
     prefix="/api/v1/auth", 
     tags=["Auth"]
-)
\ No newline at end of file
+)
+
+# 4. Router de Modelos (estado y recarga en caliente)
+app.include_router(
+    modelos_endpoints.router,
+    prefix="/api/v1/modelos",
+    tags=["Modelos"]
+)
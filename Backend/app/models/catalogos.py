@@ -0,0 +1,116 @@
+import enum
+from sqlalchemy.types import TypeDecorator, SmallInteger
+
+# ==========================================
+# CATÁLOGOS DE CLASES (ENTEROS PEQUEÑOS)
+# ==========================================
+# Única fuente de verdad para las etiquetas de distribución, horneado, veredicto y banda.
+# En la BD se guardan como SMALLINT; hacia afuera (API, scoring, Excel) se
+# siguen usando las etiquetas de texto canónicas ("correcto", "PASS", ...).
+
+# Variantes que llegaron a la BD histórica y equivalen a una etiqueta canónica
+ALIAS_ETIQUETAS = {
+    "correcta": "correcto",
+}
+
+
+class _Catalogo(enum.IntEnum):
+    """Base para los catálogos: conversión etiqueta <-> código."""
+
+    @property
+    def etiqueta(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def etiquetas(cls) -> list[str]:
+        return [m.etiqueta for m in cls]
+
+    @classmethod
+    def desde_etiqueta(cls, valor, defecto=None):
+        """
+        Acepta un miembro, un código entero o una etiqueta (sin importar
+        mayúsculas/espacios). Retorna 'defecto' si no hay coincidencia.
+        """
+        if valor is None:
+            return defecto
+        if isinstance(valor, cls):
+            return valor
+        if isinstance(valor, int):
+            try:
+                return cls(valor)
+            except ValueError:
+                return defecto
+
+        texto = str(valor).strip().lower()
+        texto = ALIAS_ETIQUETAS.get(texto, texto)
+        for miembro in cls:
+            if miembro.etiqueta.lower() == texto:
+                return miembro
+        return defecto
+
+    @classmethod
+    def normalizar(cls, valor) -> str:
+        """Etiqueta canónica o ValueError (para validar entradas de la API)."""
+        miembro = cls.desde_etiqueta(valor)
+        if miembro is None:
+            raise ValueError(f"Valor inválido '{valor}'. Opciones: {', '.join(cls.etiquetas())}")
+        return miembro.etiqueta
+
+
+class DistribucionClase(_Catalogo):
+    CORRECTO = 0
+    ACEPTABLE = 1
+    MEDIA = 2
+    MALA = 3
+    DEFICIENTE = 4
+
+
+class HorneadoClase(_Catalogo):
+    CORRECTO = 0
+    ALTO = 1
+    BAJO = 2
+    INSUFICIENTE = 3
+    EXCESIVO = 4
+
+
+class Veredicto(_Catalogo):
+    FAIL = 0
+    PASS = 1
+
+    @property
+    def etiqueta(self) -> str:
+        return self.name  # PASS / FAIL en mayúsculas
+
+
+class BandaPuntaje(_Catalogo):
+    """Tramo de puntaje_total; los cortes de cada tramo los fija reglas_puntaje.json"""
+    CRITICO = 0
+    RIESGO = 1
+    ACEPTABLE = 2
+    EXCELENTE = 3
+
+
+# --- TIPO DE COLUMNA ---
+class ClaseCodificada(TypeDecorator):
+    """
+    Guarda un catálogo como SMALLINT y lo expone como etiqueta de texto.
+    Las comparaciones en SQL (col == "PASS", col == Veredicto.PASS) se
+    traducen a comparaciones de enteros, sin func.lower() por fila.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, catalogo, defecto, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.catalogo = catalogo
+        self.defecto = defecto
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(self.catalogo.desde_etiqueta(value, self.defecto))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.catalogo(value).etiqueta
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.session import Base
+
+
+class EvaluacionSombra(Base):
+    """
+    Una imagen evaluada por el modelo candidato de una cabeza además del de producción.
+    No afecta a la inspección: sirve para decidir si el candidato se promueve.
+    """
+    __tablename__ = "evaluaciones_sombra"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inspeccion_id = Column(Integer, ForeignKey("inspecciones.id", ondelete="CASCADE"), index=True)
+    fecha = Column(DateTime, default=datetime.now, index=True)
+
+    cabeza = Column(String(32), nullable=False)            # p. ej. "resnet_distribucion"
+    version_produccion = Column(String(64))
+    version_candidato = Column(String(64), nullable=False)
+
+    # Etiquetas crudas de cada modelo (orden de clases de su manifiesto)
+    etiqueta_produccion = Column(String(32))
+    etiqueta_candidato = Column(String(32))
+    coincide = Column(Boolean, nullable=False)
+
+    latencia_produccion_ms = Column(Float)
+    latencia_candidato_ms = Column(Float)
+
+    __table_args__ = (
+        # Resumen por candidato (GET /api/v1/modelos/sombra)
+        Index('idx_sombra_cabeza_version', 'cabeza', 'version_candidato'),
+    )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Index, event
 from datetime import datetime
 from app.db.session import Base
+from app.models.catalogos import ClaseCodificada, DistribucionClase, HorneadoClase, Veredicto, BandaPuntaje
 
 class Inspeccion(Base):
     __tablename__ = "inspecciones"
@@ -8,6 +9,10 @@ class Inspeccion(Base):
     # --- 1. IDENTIFICACIÓN ---
     id = Column(Integer, primary_key=True, index=True)
     fecha_hora = Column(DateTime, default=datetime.now, index=True) # Índice para ordenar por fecha
+    # Columnas derivadas de fecha_hora (se mantienen solas, ver listener abajo)
+    # Evitan func.date()/extract('hour') en el dashboard, que obligan a escanear la tabla
+    fecha = Column(Date, index=True)  # Día calendario
+    hora = Column(Integer)            # Hora del día (0-23)
     locacion = Column(String, index=True) # Local 
     aws_link = Column(String) # Link de la foto/video
     # se usa index=True porque se puede filtrar por locacion 
@@ -20,11 +25,19 @@ class Inspeccion(Base):
     # ResNet Bordes (Limpios/Sucios) - OJO: True = Sucios (Incidente)
     bordes_sucios = Column(Boolean, default=True)
     
-    # OpenCV Distribución (Correcta, Aceptable, media, mala, deficiente)
-    distribucion_clase = Column(String, default="Deficiente")
+    # Las clases se guardan como SMALLINT (ver app/models/catalogos.py)
+    # y se leen/escriben como etiqueta de texto canónica
+    # OpenCV Distribución (correcto, aceptable, media, mala, deficiente)
+    distribucion_clase = Column(
+        ClaseCodificada(DistribucionClase, DistribucionClase.DEFICIENTE),
+        default=DistribucionClase.DEFICIENTE.etiqueta
+    )
     
-    # ResNet Horneado (Correcto, Alto, Bajo, Insuficiente, Excesivo)
-    horneado_clase = Column(String, default="Insuficiente")
+    # ResNet Horneado (correcto, alto, bajo, insuficiente, excesivo)
+    horneado_clase = Column(
+        ClaseCodificada(HorneadoClase, HorneadoClase.INSUFICIENTE),
+        default=HorneadoClase.INSUFICIENTE.etiqueta
+    )
     
     # ResNet Grasa (Si/No) - True = Tiene Grasa
     tiene_grasa = Column(Boolean, default=True)
@@ -37,10 +50,39 @@ class Inspeccion(Base):
     score_grasa = Column(Integer, default=0)         # 10 o 0
     
     # --- 4. VEREDICTO FINAL ---
+    # Veredicto y banda se calculan al escribir con las reglas de reglas_puntaje.json:
+    # exportes y dashboards leen estas columnas, no vuelven a aplicar umbrales
     puntaje_total = Column(Integer, default=0, index=True)  # Índice para ordenar por puntaje
-    veredicto = Column(String, default="FAIL")       # PASS / FAIL
+    veredicto = Column(ClaseCodificada(Veredicto, Veredicto.FAIL), default=Veredicto.FAIL.etiqueta, index=True)  # PASS / FAIL
+    banda = Column(ClaseCodificada(BandaPuntaje, BandaPuntaje.CRITICO), index=True)  # excelente / aceptable / riesgo / critico
+
+    # --- 5. TRAZABILIDAD ---
+    # Conjunto de modelos que generó la fila (ver ConjuntoModelos): permite re-procesar
+    # solo lo que clasificó una versión vieja. NULL = filas anteriores al versionado
+    version_modelos = Column(String(32), index=True)
+    # Versión de reglas_puntaje.json con la que se calcularon scores y veredicto
+    # (NULL = reglas originales, anteriores al versionado)
+    version_reglas = Column(String(32), index=True)
     
-    # Índice compuesto para consultas frecuentes (locacion + fecha)
+    # Índices compuestos para consultas frecuentes
     __table_args__ = (
         Index('idx_locacion_fecha', 'locacion', 'fecha_hora'),
-    )
\ No newline at end of file
+        # Dashboard por locación: agrupar por día y por hora
+        Index('idx_locacion_dia_hora', 'locacion', 'fecha', 'hora'),
+        # Dashboard global (sin locación): hora crítica de un día
+        Index('idx_dia_hora', 'fecha', 'hora'),
+    )
+
+
+# --- COLUMNAS DERIVADAS (fecha / hora) ---
+# Se recalculan en cada INSERT/UPDATE para que nunca se desincronicen de fecha_hora
+def _sincronizar_fecha_hora(mapper, connection, target):
+    if target.fecha_hora is None:
+        # El default de la columna se aplica después de este evento, lo adelantamos
+        target.fecha_hora = datetime.now()
+    target.fecha = target.fecha_hora.date()
+    target.hora = target.fecha_hora.hour
+
+
+event.listen(Inspeccion, "before_insert", _sincronizar_fecha_hora)
+event.listen(Inspeccion, "before_update", _sincronizar_fecha_hora)
\ No newline at end of file
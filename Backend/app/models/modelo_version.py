@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from datetime import datetime
+from app.db.session import Base
+
+
+class ConjuntoModelos(Base):
+    """
+    Versión de cada modelo (YOLO + ResNets) para un valor de Inspeccion.version_modelos.
+    Con esto se puede saber qué filas clasificó una versión vieja de una cabeza puntual.
+    """
+    __tablename__ = "conjuntos_modelos"
+
+    version = Column(String(32), primary_key=True)  # Hash corto del conjunto
+    # {"resnet_horneado": {"version": "...", "archivo": "...", "sha256": "..."}, ...}
+    detalle = Column(JSON, nullable=False)
+    creado = Column(DateTime, default=datetime.now)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, UniqueConstraint
+from datetime import datetime
+from app.db.session import Base
+
+
+class ResumenDiario(Base):
+    """
+    Métricas del resumen general de un día ya cerrado en una locación (snapshot).
+    Las comparaciones entre períodos suman estas filas en vez de recorrer inspecciones.
+    Se generan al cierre del día y se recalculan si llegan o cambian inspecciones de ese día.
+    """
+    __tablename__ = "resumenes_diarios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(Date, nullable=False, index=True)
+    locacion = Column(String, nullable=False, default="")  # "" = inspecciones sin locación
+
+    # Conteos sumables (los porcentajes y el promedio se derivan al comparar)
+    total = Column(Integer, nullable=False, default=0)
+    correctas = Column(Integer, nullable=False, default=0)
+    suma_puntaje = Column(Integer, nullable=False, default=0)
+    con_puntaje = Column(Integer, nullable=False, default=0)  # Filas con puntaje_total (denominador del promedio)
+    con_burbujas = Column(Integer, nullable=False, default=0)
+    con_grasa = Column(Integer, nullable=False, default=0)
+    bordes_sucios = Column(Integer, nullable=False, default=0)
+    dist_deficiente = Column(Integer, nullable=False, default=0)
+    dist_mala = Column(Integer, nullable=False, default=0)
+
+    actualizado = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('fecha', 'locacion', name='uq_resumen_fecha_locacion'),
+    )
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
+from app.models.catalogos import DistribucionClase, HorneadoClase
 
 # 1. Esquema Base (Datos comunes)
 # estos son datos comunes porque se usan en Create y Response
@@ -37,13 +38,56 @@ class InspeccionResponse(InspeccionCreate):
     aws_link: Optional[str] = None
     horneado_clase: Optional[str] = None     
     distribucion_clase: Optional[str] = None 
+    banda: Optional[str] = None            # Tramo de puntaje (reglas_puntaje.json)
+    version_modelos: Optional[str] = None  # Conjunto de modelos que la clasificó
+    version_reglas: Optional[str] = None   # Reglas de puntaje con las que se calificó
     
     class Config:
         from_attributes = True # Antes se llamaba orm_mode
 
+# 4. Página para paginación por cursor (keyset)
+class InspeccionPaginaResponse(BaseModel):
+    items: List[InspeccionResponse]
+    next_cursor: Optional[str] = None  # None = no hay más páginas
+
 class InspeccionUpdate(BaseModel):
     tiene_burbujas: Optional[int] = None  # Acepta 0/1
     bordes_sucios: Optional[int] = None   # Acepta 0/1
     tiene_grasa: Optional[int] = None     # Acepta 0/1
     horneado_clase: Optional[str] = None
     distribucion_clase: Optional[str] = None
+
+    # Solo se aceptan etiquetas del catálogo (se normalizan a la forma canónica)
+    @field_validator('horneado_clase')
+    @classmethod
+    def validar_horneado(cls, v):
+        return HorneadoClase.normalizar(v) if v is not None else v
+
+    @field_validator('distribucion_clase')
+    @classmethod
+    def validar_distribucion(cls, v):
+        return DistribucionClase.normalizar(v) if v is not None else v
+
+
+# 5. Corrección masiva (una sesión de revisión)
+# Tope de BIGINT: un id mayor rompería la consulta de todo el lote (OverflowError del driver)
+MAX_ID = 2**63 - 1
+
+class InspeccionCorreccion(InspeccionUpdate):
+    id: int = Field(gt=0, le=MAX_ID)
+
+class InspeccionCorreccionLote(BaseModel):
+    # Cada ítem se valida por separado (InspeccionCorreccion): uno inválido, o que ni
+    # siquiera es un objeto, se informa en su posición sin rechazar el resto
+    correcciones: List[Any]
+
+class ResultadoCorreccion(BaseModel):
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+    inspeccion: Optional[InspeccionResponse] = None
+
+class InspeccionCorreccionLoteResponse(BaseModel):
+    actualizadas: int
+    errores: int
+    resultados: List[ResultadoCorreccion]  # Mismo orden que las correcciones enviadas
@@ -0,0 +1,166 @@
+import os
+import time
+from sqlalchemy import or_, select, update, func
+from sqlalchemy.orm import Session
+from app.models.inspeccion import Inspeccion
+from app.models.modelo_version import ConjuntoModelos
+from app.core.model_loader import version_de_conjunto
+from app.services.quality_service import QualityService, CABEZAS
+from app.services.scoring_logic import calcular_puntaje, datos_desde_inspeccion
+from app.services.resumen_diario_service import ResumenDiarioService
+
+
+class BackfillService:
+    """
+    Re-inferencia de UNA cabeza sobre filas que clasificó una versión anterior de ella.
+    Solo corre YOLO + esa ResNet, recalcula scores/veredicto con el resto de campos
+    tal como están guardados y escribe cada lote con un UPDATE masivo.
+
+    Es reanudable: una fila actualizada pasa a un conjunto cuya cabeza ya es la actual,
+    así que al cortar y volver a correr solo quedan las pendientes.
+    """
+    def __init__(self, db: Session, cabeza: str, lote: int = 50, max_por_segundo: float = None):
+        if cabeza not in CABEZAS:
+            raise ValueError(f"Cabeza desconocida: {cabeza}")
+        self.db = db
+        self.cabeza = cabeza
+        self.columna = CABEZAS[cabeza][0]
+        self.lote = lote
+        # Tope de imágenes por segundo (descargas al bucket + CPU compartida con la API)
+        self.intervalo = 1 / max_por_segundo if max_por_segundo else 0
+        self.quality = QualityService(db)
+        self.version_cabeza = self.quality.modelos.versiones.get(cabeza)
+        if not self.version_cabeza:
+            raise RuntimeError(f"{cabeza} no está cargado: no hay con qué re-inferir")
+        self._conjuntos = {}  # version_modelos vieja -> nueva (con la cabeza actualizada)
+
+    def versiones_desactualizadas(self) -> list:
+        """Conjuntos registrados cuya versión de la cabeza no es la cargada ahora."""
+        huella = self.version_cabeza["huella"]
+        return [
+            c.version for c in self.db.query(ConjuntoModelos).all()
+            if (c.detalle or {}).get(self.cabeza, {}).get("huella") != huella
+        ]
+
+    def _filtro_pendientes(self, versiones: list):
+        # version_modelos NULL: filas anteriores a la trazabilidad (versión desconocida)
+        return [
+            Inspeccion.aws_link.isnot(None),
+            or_(Inspeccion.version_modelos.is_(None), Inspeccion.version_modelos.in_(versiones)),
+        ]
+
+    def contar_pendientes(self, desde_id: int = 0) -> int:
+        filtro = self._filtro_pendientes(self.versiones_desactualizadas())
+        return self.db.query(func.count(Inspeccion.id)).filter(Inspeccion.id > desde_id, *filtro).scalar()
+
+    def _version_nueva(self, version_vieja):
+        """Conjunto de la fila con solo esta cabeza reemplazada; se registra la primera vez."""
+        if version_vieja not in self._conjuntos:
+            conjunto = self.db.get(ConjuntoModelos, version_vieja) if version_vieja else None
+            detalle = dict(conjunto.detalle) if conjunto else {}
+            detalle[self.cabeza] = self.version_cabeza
+            version = version_de_conjunto(detalle)
+            if not self.db.get(ConjuntoModelos, version):
+                self.db.add(ConjuntoModelos(version=version, detalle=detalle))
+                self.db.commit()
+            self._conjuntos[version_vieja] = version
+        return self._conjuntos[version_vieja]
+
+    def _reinferir(self, fila) -> dict:
+        img_path = self.quality._descargar_imagen(fila.aws_link)
+        if not img_path:
+            raise Exception("Falló descarga")
+        try:
+            valor = self.quality.predecir_cabeza(self.cabeza, self.quality._preparar_tensor(img_path))
+        finally:
+            if not self.quality._en_cache(img_path):
+                try: os.remove(img_path)
+                except OSError: pass
+
+        scores = calcular_puntaje(datos_desde_inspeccion(fila, **{self.columna: valor}))
+        return {
+            "id": fila.id,
+            self.columna: valor,
+            "score_burbujas": scores['burbujas'],
+            "score_bordes": scores['bordes'],
+            "score_distribucion": scores['distribucion'],
+            "score_horneado": scores['horneado'],
+            "score_grasa": scores['grasa'],
+            "puntaje_total": scores['total'],
+            "veredicto": scores['veredicto'],
+            "banda": scores['banda'],
+            "version_reglas": scores['version_reglas'],
+            "version_modelos": self._version_nueva(fila.version_modelos),
+        }
+
+    def ejecutar(self, limite: int = None, desde_id: int = 0) -> dict:
+        versiones = self.versiones_desactualizadas()
+        filtro = self._filtro_pendientes(versiones)
+        total = self.contar_pendientes(desde_id)
+        if limite:
+            total = min(total, limite)
+        print(f"🔁 Backfill {self.cabeza} -> v{self.version_cabeza['version']}: "
+              f"{total} filas pendientes ({len(versiones)} conjuntos desactualizados)")
+
+        procesadas, errores, cambios = 0, 0, 0
+        ultimo_id = desde_id
+        inicio = time.perf_counter()
+        proxima = inicio
+
+        while procesadas + errores < total:
+            # Paginación por id (keyset): con errores no se repite la misma fila en bucle
+            tamano = min(self.lote, total - procesadas - errores)
+            filas = self.db.execute(
+                select(Inspeccion.id, Inspeccion.aws_link, Inspeccion.version_modelos,
+                       Inspeccion.tiene_burbujas, Inspeccion.bordes_sucios, Inspeccion.tiene_grasa,
+                       Inspeccion.horneado_clase, Inspeccion.distribucion_clase,
+                       Inspeccion.locacion, Inspeccion.fecha)
+                .where(Inspeccion.id > ultimo_id, *filtro)
+                .order_by(Inspeccion.id)
+                .limit(tamano)
+            ).all()
+            if not filas:
+                break
+
+            actualizaciones = []
+            dias = set()  # (locación, día) con etiquetas cambiadas: snapshots a recalcular
+            for fila in filas:
+                ultimo_id = fila.id
+                espera = proxima - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                proxima = max(proxima, time.perf_counter()) + self.intervalo
+                try:
+                    nueva = self._reinferir(fila)
+                    if nueva[self.columna] != getattr(fila, self.columna):
+                        cambios += 1
+                        dias.add((fila.locacion, fila.fecha))
+                    actualizaciones.append(nueva)
+                except Exception as e:
+                    print(f"⚠️ Error en id={fila.id}: {e}")
+                    errores += 1
+
+            if actualizaciones:
+                # UPDATE masivo por clave primaria: una sentencia por lote
+                self.db.execute(update(Inspeccion), actualizaciones)
+                self.db.commit()
+                ResumenDiarioService.actualizar_dias(self.db, dias)
+                procesadas += len(actualizaciones)
+
+            transcurrido = time.perf_counter() - inicio
+            hechas = procesadas + errores
+            ritmo = hechas / transcurrido if transcurrido else 0
+            eta = (total - hechas) / ritmo if ritmo else 0
+            print(f"📦 {hechas}/{total} ({hechas / total:.0%}) | errores: {errores} | "
+                  f"{ritmo:.1f} img/s | ETA {eta:.0f}s | último id: {ultimo_id}")
+
+        resumen = {
+            "cabeza": self.cabeza,
+            "procesadas": procesadas,
+            "errores": errores,
+            "etiquetas_cambiadas": cambios,
+            "ultimo_id": ultimo_id,
+            "segundos": round(time.perf_counter() - inicio, 1),
+        }
+        print(f"✅ Backfill terminado: {resumen}")
+        return resumen
@@ -0,0 +1,263 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, Optional
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# ==========================================
+# PARSEO VECTORIZADO DEL ARCHIVO DE CARGA
+# ==========================================
+# Todo se hace por columna (operaciones de pandas), sin iterrows() ni try/except por fila.
+
+# Cuántas filas del inicio se revisan buscando la cabecera
+FILAS_BUSQUEDA_CABECERA = 20
+# Filas leídas por bloque (CSV chunksize / filas de Excel read-only)
+FILAS_POR_BLOQUE = 2000
+# Máximo de rechazos detallados en el reporte (el resto solo se cuenta)
+MAX_DETALLE_RECHAZOS = 100
+
+# "12:30", "12:30:00", "9:05" (también dentro de "1900-01-01 12:30:00" que deja Excel)
+_PATRON_HORA_SEPARADA = r'(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?'
+# "1230", "12" (también "1230.0" como lo deja pandas al leer números); solo si no hay ':'
+_PATRON_HORA_COMPACTA = r'^\s*(\d{2})(\d{2})?'
+
+
+@dataclass
+class ColumnasCarga:
+    link: object
+    fecha: Optional[object] = None
+    hora: Optional[object] = None
+
+
+@dataclass
+class ReporteParseo:
+    """Resumen de lo que pasó con cada fila del archivo."""
+    total_filas: int = 0
+    aceptadas: int = 0
+    rechazadas: dict = field(default_factory=dict)       # motivo -> cantidad
+    detalle_rechazos: list = field(default_factory=list)  # [{'fila', 'motivo', 'valor'}]
+    fecha_por_defecto: int = 0  # Filas sin fecha válida (se usó la fecha actual)
+    hora_invalida: int = 0      # Filas con hora que no se pudo interpretar
+
+    def agregar_rechazos(self, filas: pd.Series, valores: pd.Series, motivo: str):
+        if filas.empty:
+            return
+        self.rechazadas[motivo] = self.rechazadas.get(motivo, 0) + len(filas)
+        espacio = MAX_DETALLE_RECHAZOS - len(self.detalle_rechazos)
+        for fila, valor in list(zip(filas, valores))[:max(espacio, 0)]:
+            self.detalle_rechazos.append({"fila": int(fila), "motivo": motivo, "valor": str(valor)[:120]})
+
+    def to_dict(self) -> dict:
+        return {
+            "total_filas": self.total_filas,
+            "aceptadas": self.aceptadas,
+            "rechazadas": self.rechazadas,
+            "detalle_rechazos": self.detalle_rechazos,
+            "fecha_por_defecto": self.fecha_por_defecto,
+            "hora_invalida": self.hora_invalida,
+        }
+
+
+def detectar_cabecera(df_raw: pd.DataFrame) -> int:
+    """Índice de la primera fila (entre las primeras 20) que contiene 'link'. -1 si no hay."""
+    cabeza = df_raw.head(FILAS_BUSQUEDA_CABECERA).fillna("").astype(str)
+    contiene_link = cabeza.apply(lambda col: col.str.lower().str.contains("link", regex=False)).any(axis=1)
+    if not contiene_link.any():
+        return -1
+    return int(contiene_link.values.argmax())
+
+
+def identificar_columnas(cabeceras) -> ColumnasCarga:
+    """Busca las columnas de link, fecha y hora por nombre. ValueError si no hay link."""
+    nombres = [(c, str(c).lower()) for c in cabeceras]
+    col_link = next((c for c, n in nombres if "link" in n), None)
+    col_fecha = next((c for c, n in nombres if "fecha" in n or "date" in n), None)
+    # CHECK 5: Identificar columna de Hora separada
+    col_hora = next((c for c, n in nombres if "hora" in n or "time" in n), None)
+
+    if col_link is None:
+        raise ValueError("No encontré columna de Links")
+    return ColumnasCarga(link=col_link, fecha=col_fecha, hora=col_hora)
+
+
+def _fecha_sin_zona(valor):
+    """Un valor -> Timestamp sin zona (hora local tal como vino escrita) o NaT."""
+    try:
+        fecha = pd.to_datetime(valor, errors="coerce")
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    if pd.isna(fecha):
+        return pd.NaT
+    return fecha.tz_localize(None) if fecha.tzinfo is not None else fecha
+
+
+def _parsear_fechas(serie: pd.Series) -> pd.Series:
+    """
+    Fechas en una sola pasada; cada valor puede venir en un formato distinto.
+    Con zona horaria se guarda la hora local escrita (sin la zona), como al parsear
+    fila por fila. Lo que no se puede interpretar queda NaT (-> fecha por defecto).
+    """
+    try:
+        fechas = pd.to_datetime(serie, errors="coerce", format="mixed")
+        if pd.api.types.is_datetime64_any_dtype(fechas):
+            # Un único offset en todo el bloque: columna con zona, se quita de una vez
+            return fechas.dt.tz_localize(None) if fechas.dt.tz is not None else fechas
+    except (ValueError, TypeError, OverflowError):
+        pass
+    # Offsets distintos (cambio de horario) o mezcla con/sin zona: pandas no arma una
+    # columna datetime; se resuelve valor por valor
+    return serie.map(_fecha_sin_zona).astype("datetime64[ns]")
+
+
+def _parsear_horas(serie: pd.Series) -> pd.Series:
+    """Segundos desde medianoche por fila (NaN si la hora no es interpretable)."""
+    texto = serie.fillna("").astype(str)
+
+    separada = texto.str.extract(_PATRON_HORA_SEPARADA).astype(float)
+    compacta = texto.str.extract(_PATRON_HORA_COMPACTA).astype(float)
+    usa_separada = texto.str.contains(":", regex=False)
+
+    horas = separada[0].where(usa_separada, compacta[0])
+    minutos = separada[1].where(usa_separada, compacta[1]).fillna(0)
+    segundos = separada[2].where(usa_separada, 0).fillna(0)
+
+    valida = horas.between(0, 23) & minutos.between(0, 59) & segundos.between(0, 59)
+    return (horas * 3600 + minutos * 60 + segundos).where(valida)
+
+
+def parsear_bloque(
+    df: pd.DataFrame,
+    columnas: ColumnasCarga,
+    reporte: ReporteParseo,
+    primera_fila: int = 1,
+    ahora: Optional[datetime] = None,
+) -> list[dict]:
+    """
+    Convierte un bloque de filas (ya sin cabecera) en [{'link', 'fecha'}, ...].
+    'primera_fila' es el número de fila en el archivo del primer registro del bloque,
+    para que el reporte de rechazos apunte a la fila real.
+    """
+    ahora = ahora or datetime.now()
+    numeros_fila = pd.Series(range(primera_fila, primera_fila + len(df)), index=df.index)
+    reporte.total_filas += len(df)
+
+    # 1. Links válidos
+    links_raw = df[columnas.link]
+    links = links_raw.fillna("").astype(str).str.strip()
+    vacio = links == ""
+    valido = links.str.startswith("http") & ~vacio
+
+    reporte.agregar_rechazos(numeros_fila[vacio], links_raw[vacio], "link_vacio")
+    invalido = ~valido & ~vacio
+    reporte.agregar_rechazos(numeros_fila[invalido], links_raw[invalido], "link_invalido")
+
+    df = df[valido]
+    links = links[valido]
+    if df.empty:
+        return []
+
+    # 2. Fechas (si falla o no hay columna, se usa la fecha actual como antes)
+    if columnas.fecha is not None:
+        fechas = _parsear_fechas(df[columnas.fecha])
+    else:
+        fechas = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    sin_fecha = fechas.isna()
+    reporte.fecha_por_defecto += int(sin_fecha.sum())
+    fechas = fechas.where(~sin_fecha, pd.Timestamp(ahora))
+
+    # 3. Hora separada: reemplaza la hora de la fecha, conservando los microsegundos
+    if columnas.hora is not None:
+        hora_raw = df[columnas.hora]
+        segundos = _parsear_horas(hora_raw)
+        con_hora = segundos.notna()
+        reporte.hora_invalida += int((hora_raw.notna() & ~con_hora).sum())
+
+        combinadas = (
+            fechas.dt.normalize()
+            + pd.to_timedelta(segundos, unit="s")
+            + pd.to_timedelta(fechas.dt.microsecond, unit="us")
+        )
+        fechas = combinadas.where(con_hora, fechas)
+
+    reporte.aceptadas += len(df)
+    return [
+        {"link": link, "fecha": fecha}
+        for link, fecha in zip(links.tolist(), fechas.dt.to_pydatetime())
+    ]
+
+
+def _bloques_excel(archivo, filas_por_bloque: int) -> Iterator[pd.DataFrame]:
+    """Excel .xlsx en modo read-only: openpyxl entrega fila por fila sin cargar la hoja."""
+    wb = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = []
+        for fila in wb.active.iter_rows(values_only=True):
+            filas.append(fila)
+            if len(filas) >= filas_por_bloque:
+                yield pd.DataFrame(filas)
+                filas = []
+        if filas:
+            yield pd.DataFrame(filas)
+    finally:
+        wb.close()
+
+
+def leer_bloques(archivo, nombre: str, filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[pd.DataFrame]:
+    """Bloques crudos (header=None) del archivo, sin leerlo completo en memoria."""
+    nombre = nombre.lower()
+    if nombre.endswith(".csv"):
+        yield from pd.read_csv(archivo, header=None, chunksize=filas_por_bloque)
+    elif nombre.endswith(".xlsx"):
+        yield from _bloques_excel(archivo, filas_por_bloque)
+    else:
+        # .xls (formato binario viejo): xlrd no permite lectura por partes
+        yield pd.read_excel(archivo, header=None)
+
+
+def iterar_registros(
+    archivo,
+    nombre: str,
+    reporte: ReporteParseo,
+    filas_por_bloque: int = FILAS_POR_BLOQUE,
+) -> Iterator[dict]:
+    """
+    Lee el archivo por bloques y entrega {'link', 'fecha'} a medida que se parsean,
+    para que el procesamiento de las primeras filas arranque antes de terminar de leer.
+
+    El primer bloque se lee y valida aquí mismo (antes de retornar): un archivo corrupto
+    o sin cabeceras lanza ValueError antes de procesar cualquier imagen.
+    """
+    bloques = leer_bloques(archivo, nombre, max(filas_por_bloque, FILAS_BUSQUEDA_CABECERA))
+    try:
+        primero = next(bloques, None)
+    except Exception as e:
+        print(f"Error lectura: {e}")
+        raise ValueError("Archivo corrupto")
+    if primero is None:
+        raise ValueError("Archivo vacío")
+
+    header_row_index = detectar_cabecera(primero)
+    if header_row_index == -1:
+        raise ValueError("No encontré cabeceras (Photo Link)")
+
+    cabeceras = primero.iloc[header_row_index]
+    columnas = identificar_columnas(cabeceras)
+
+    def _generar():
+        # +2: la fila de datos siguiente a la cabecera, numerando desde 1
+        fila = header_row_index + 2
+        bloque = primero.iloc[header_row_index + 1:]
+        while bloque is not None:
+            bloque = bloque.set_axis(cabeceras[:bloque.shape[1]], axis=1)
+            yield from parsear_bloque(bloque, columnas, reporte, primera_fila=fila)
+            fila += len(bloque)
+            try:
+                bloque = next(bloques, None)
+            except Exception as e:
+                # Lo ya leído se procesa; el resto del archivo se reporta como ilegible
+                print(f"Error lectura en fila {fila}: {e}")
+                reporte.rechazadas["archivo_ilegible_desde_fila"] = fila
+                bloque = None
+
+    return _generar()
@@ -1,7 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, Integer, case
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, Integer, case
+from datetime import datetime, date, timedelta, time
 from app.models.inspeccion import Inspeccion
+from app.models.catalogos import DistribucionClase, HorneadoClase, Veredicto, BandaPuntaje
+from app.services.scoring_logic import obtener_reglas
+from app.services.resumen_diario_service import ResumenDiarioService, METRICAS
 from app.schemas.dashboard_schema import (
     ResumenGeneral, 
     ComparacionSemanal, 
@@ -36,20 +40,15 @@ class DashboardService:
         if locacion:
             filters.append(Inspeccion.locacion == locacion)
         
-        # Query agregada - todo en una sola consulta SQL
-        result = self.db.query(
-            func.count(Inspeccion.id).label('total'),
-            func.sum(case((Inspeccion.veredicto == "PASS", 1), else_=0)).label('correctas'),
-            func.avg(Inspeccion.puntaje_total).label('promedio'),
-            func.sum(case((Inspeccion.tiene_burbujas == True, 1), else_=0)).label('con_burbujas'),
-            func.sum(case((Inspeccion.tiene_grasa == True, 1), else_=0)).label('con_grasa'),
-            func.sum(case((Inspeccion.bordes_sucios == True, 1), else_=0)).label('bordes_sucios'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'deficiente', 1), else_=0)).label('dist_deficiente'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'mala', 1), else_=0)).label('dist_mala'),
-        ).filter(*filters).first()
-        
-        total = result.total or 0
-        
+        # Query agregada - todo en una sola consulta SQL (mismos agregados que los snapshots)
+        result = self.db.query(*ResumenDiarioService.agregados()).filter(*filters).first()
+        return self._resumen_desde_conteos({m: int(getattr(result, m) or 0) for m in METRICAS})
+
+    def _resumen_desde_totales(
+        self, total: int, correctas: int, promedio: float, con_burbujas: int, con_grasa: int,
+        bordes_sucios: int, dist_deficiente: int, dist_mala: int
+    ) -> ResumenGeneral:
+        """Arma el ResumenGeneral (porcentajes incluidos) a partir de los conteos"""
         if total == 0:
             return ResumenGeneral(
                 total_muestras=0,
@@ -67,14 +66,7 @@ class DashboardService:
                 porcentaje_distribucion_mala=0.0
             )
         
-        correctas = result.correctas or 0
         incorrectas = total - correctas
-        promedio = result.promedio or 0
-        con_burbujas = result.con_burbujas or 0
-        con_grasa = result.con_grasa or 0
-        bordes_sucios = result.bordes_sucios or 0
-        dist_deficiente = result.dist_deficiente or 0
-        dist_mala = result.dist_mala or 0
         
         return ResumenGeneral(
             total_muestras=total,
@@ -92,18 +84,54 @@ class DashboardService:
             porcentaje_distribucion_mala=round((dist_mala / total) * 100, 2)
         )
     
+    def resumen_por_dias(self, desde: date, hasta: date, locacion: str = None) -> ResumenGeneral:
+        """ResumenGeneral de los días desde..hasta sumando los snapshots diarios"""
+        return self._resumen_desde_conteos(ResumenDiarioService.sumar(self.db, desde, hasta, locacion))
+    
+    def _resumen_desde_conteos(self, t: dict) -> ResumenGeneral:
+        """ResumenGeneral a partir de los conteos de METRICAS (snapshots o consulta en vivo)"""
+        return self._resumen_desde_totales(
+            total=t["total"],
+            correctas=t["correctas"],
+            promedio=t["suma_puntaje"] / t["con_puntaje"] if t["con_puntaje"] else 0,
+            con_burbujas=t["con_burbujas"],
+            con_grasa=t["con_grasa"],
+            bordes_sucios=t["bordes_sucios"],
+            dist_deficiente=t["dist_deficiente"],
+            dist_mala=t["dist_mala"],
+        )
+    
     def calcular_comparacion_semanal(self, locacion: str = None) -> ComparacionSemanal:
-        """Compara métricas de semana actual vs anterior"""
-        ahora = datetime.now()
-        
-        # Semana actual (últimos 7 días)
-        inicio_actual = ahora - timedelta(days=7)
-        resumen_actual = self.calcular_resumen_general(inicio_actual, ahora, locacion)
+        """
+        Compara métricas de semana actual vs anterior.
+        Semanas de días calendario (últimos 7 días incluyendo hoy vs los 7 anteriores):
+        los días cerrados salen de los snapshots diarios, solo hoy se lee de inspecciones.
+        """
+        hoy = date.today()
+        return self.calcular_comparacion_periodos(
+            hoy - timedelta(days=6), hoy,
+            hoy - timedelta(days=13), hoy - timedelta(days=7),
+            locacion
+        )
+    
+    def calcular_comparacion_periodos(
+        self,
+        desde: date,
+        hasta: date,
+        desde_anterior: date = None,
+        hasta_anterior: date = None,
+        locacion: str = None
+    ) -> ComparacionSemanal:
+        """
+        Compara dos períodos cualesquiera de días (inclusive). Sin período anterior,
+        se usa el de igual largo inmediatamente antes.
+        """
+        if desde_anterior is None or hasta_anterior is None:
+            hasta_anterior = desde - timedelta(days=1)
+            desde_anterior = hasta_anterior - (hasta - desde)
         
-        # Semana anterior (días 8-14 hacia atrás)
-        inicio_anterior = ahora - timedelta(days=14)
-        fin_anterior = ahora - timedelta(days=7)
-        resumen_anterior = self.calcular_resumen_general(inicio_anterior, fin_anterior, locacion)
+        resumen_actual = self.resumen_por_dias(desde, hasta, locacion)
+        resumen_anterior = self.resumen_por_dias(desde_anterior, hasta_anterior, locacion)
         
         # Calcular diferenciales
         comparacion = ComparacionSemanal(
@@ -143,17 +171,18 @@ class DashboardService:
     
     def obtener_muestras_por_hora(self, top: int = 5, locacion: str = None) -> list[MuestrasPorHora]:
         """Agrupa muestras por hora del día y devuelve las top N horas con más muestras"""
+        # Usa la columna indexada 'hora' en vez de extract('hour', fecha_hora)
         query = self.db.query(
-            extract('hour', Inspeccion.fecha_hora).label('hora'),
+            Inspeccion.hora.label('hora'),
             func.count(Inspeccion.id).label('total'),
-            func.sum(func.cast(Inspeccion.veredicto == "PASS", Integer)).label('correctas'),
+            func.sum(func.cast(Inspeccion.veredicto == Veredicto.PASS, Integer)).label('correctas'),
             func.avg(Inspeccion.puntaje_total).label('promedio')
-        )
+        ).filter(Inspeccion.hora.isnot(None))
         
         if locacion:
             query = query.filter(Inspeccion.locacion == locacion)
         
-        resultados = query.group_by('hora').order_by(func.count(Inspeccion.id).desc()).limit(top).all()
+        resultados = query.group_by(Inspeccion.hora).order_by(func.count(Inspeccion.id).desc()).limit(top).all()
         
         return [
             MuestrasPorHora(
@@ -168,17 +197,18 @@ class DashboardService:
     
     def obtener_dias_con_mas_incidentes(self, top: int = 5, locacion: str = None) -> list[IncidentesPorDia]:
         """Agrupa por día y devuelve los días con más incidentes (más pizzas FAIL)"""
+        # Usa la columna indexada 'fecha' en vez de func.date(fecha_hora)
         query = self.db.query(
-            func.date(Inspeccion.fecha_hora).label('fecha'),
+            Inspeccion.fecha.label('fecha'),
             func.count(Inspeccion.id).label('total'),
-            func.sum(func.cast(Inspeccion.veredicto == "FAIL", Integer)).label('incidentes')
-        )
+            func.sum(func.cast(Inspeccion.veredicto == Veredicto.FAIL, Integer)).label('incidentes')
+        ).filter(Inspeccion.fecha.isnot(None))
         
         if locacion:
             query = query.filter(Inspeccion.locacion == locacion)
         
-        resultados = query.group_by('fecha').order_by(
-            func.sum(func.cast(Inspeccion.veredicto == "FAIL", Integer)).desc()
+        resultados = query.group_by(Inspeccion.fecha).order_by(
+            func.sum(func.cast(Inspeccion.veredicto == Veredicto.FAIL, Integer)).desc()
         ).limit(top).all()
         
         # CHECK 2: Calcular hora crítica (moda de hora con más fallos) para cada día
@@ -187,7 +217,7 @@ class DashboardService:
             hora_critica = self._obtener_hora_critica_del_dia(r.fecha, locacion)
             dias_con_hora.append(
                 IncidentesPorDia(
-                    fecha=r.fecha,
+                    fecha=datetime.combine(r.fecha, time.min),
                     total_muestras=r.total,
                     total_incidentes=r.incidentes or 0,
                     porcentaje_incidentes=round(((r.incidentes or 0) / r.total) * 100, 2),
@@ -199,18 +229,19 @@ class DashboardService:
     
     def _obtener_hora_critica_del_dia(self, fecha, locacion: str = None) -> int:
         """CHECK 2: Obtiene la hora (0-23) con más fallos para un día específico"""
+        # Igualdad sobre 'fecha' -> usa idx_locacion_dia_hora / idx_dia_hora
         query = self.db.query(
-            extract('hour', Inspeccion.fecha_hora).label('hora'),
+            Inspeccion.hora.label('hora'),
             func.count(Inspeccion.id).label('fallos')
         ).filter(
-            func.date(Inspeccion.fecha_hora) == fecha,
-            Inspeccion.veredicto == "FAIL"
+            Inspeccion.fecha == fecha,
+            Inspeccion.veredicto == Veredicto.FAIL
         )
         
         if locacion:
             query = query.filter(Inspeccion.locacion == locacion)
         
-        resultado = query.group_by('hora').order_by(
+        resultado = query.group_by(Inspeccion.hora).order_by(
             func.count(Inspeccion.id).desc()
         ).first()
         
@@ -295,11 +326,11 @@ class DashboardService:
         
         # Query agregada en SQL
         result = self.db.query(
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'correcto', 1), else_=0)).label('correcto'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'aceptable', 1), else_=0)).label('aceptable'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'media', 1), else_=0)).label('media'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'mala', 1), else_=0)).label('mala'),
-            func.sum(case((func.lower(Inspeccion.distribucion_clase) == 'deficiente', 1), else_=0)).label('deficiente'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.CORRECTO, 1), else_=0)).label('correcto'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.ACEPTABLE, 1), else_=0)).label('aceptable'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.MEDIA, 1), else_=0)).label('media'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.MALA, 1), else_=0)).label('mala'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.DEFICIENTE, 1), else_=0)).label('deficiente'),
         ).filter(*filters).first()
         
         return DistribucionClases(
@@ -319,11 +350,11 @@ class DashboardService:
         
         # Query agregada en SQL
         result = self.db.query(
-            func.sum(case((func.lower(Inspeccion.horneado_clase) == 'correcto', 1), else_=0)).label('correcto'),
-            func.sum(case((func.lower(Inspeccion.horneado_clase) == 'alto', 1), else_=0)).label('alto'),
-            func.sum(case((func.lower(Inspeccion.horneado_clase) == 'bajo', 1), else_=0)).label('bajo'),
-            func.sum(case((func.lower(Inspeccion.horneado_clase) == 'insuficiente', 1), else_=0)).label('insuficiente'),
-            func.sum(case((func.lower(Inspeccion.horneado_clase) == 'excesivo', 1), else_=0)).label('excesivo'),
+            func.sum(case((Inspeccion.horneado_clase == HorneadoClase.CORRECTO, 1), else_=0)).label('correcto'),
+            func.sum(case((Inspeccion.horneado_clase == HorneadoClase.ALTO, 1), else_=0)).label('alto'),
+            func.sum(case((Inspeccion.horneado_clase == HorneadoClase.BAJO, 1), else_=0)).label('bajo'),
+            func.sum(case((Inspeccion.horneado_clase == HorneadoClase.INSUFICIENTE, 1), else_=0)).label('insuficiente'),
+            func.sum(case((Inspeccion.horneado_clase == HorneadoClase.EXCESIVO, 1), else_=0)).label('excesivo'),
         ).filter(*filters).first()
         
         return HorneadoClases(
@@ -339,7 +370,7 @@ class DashboardService:
         Devuelve las top N inspecciones de la última semana de datos,
         ordenadas por puntaje_total descendente.
         La semana se calcula basada en la última fecha en la BD.
-        Mejores: puntaje >= 70, Peores: puntaje < 70
+        Mejores: veredicto PASS, Peores: veredicto FAIL (el guardado, mismo umbral que el scoring)
         """
         # Obtener la fecha más reciente de los datos
         query_fecha = self.db.query(func.max(Inspeccion.fecha_hora))
@@ -362,14 +393,14 @@ class DashboardService:
         if locacion:
             base_query = base_query.filter(Inspeccion.locacion == locacion)
         
-        # Top mejores: puntaje >= 70, ordenadas desc
+        # Top mejores: PASS, ordenadas desc
         mejores = base_query.filter(
-            Inspeccion.puntaje_total >= 70
+            Inspeccion.veredicto == Veredicto.PASS
         ).order_by(Inspeccion.puntaje_total.desc()).limit(top).all()
         
-        # Top peores: puntaje < 70, ordenadas asc
+        # Top peores: FAIL, ordenadas asc
         peores = base_query.filter(
-            Inspeccion.puntaje_total < 70
+            Inspeccion.veredicto == Veredicto.FAIL
         ).order_by(Inspeccion.puntaje_total.asc()).limit(top).all()
         
         # Función helper para convertir a dict
@@ -380,13 +411,31 @@ class DashboardService:
                 "puntaje_total": i.puntaje_total,
                 "fecha_hora": i.fecha_hora.isoformat() if i.fecha_hora else None,
                 "locacion": i.locacion,
-                "veredicto": i.veredicto
+                "veredicto": i.veredicto,
+                "banda": i.banda
             }
         
         return {
             "mejores": [to_dict(i) for i in mejores],
             "peores": [to_dict(i) for i in peores]
         }
+
+    def obtener_distribucion_bandas(self, locacion: str = None) -> dict:
+        """
+        Cantidad de inspecciones por banda (columna guardada, sin re-aplicar cortes)
+        junto con los cortes y el umbral de las reglas vigentes.
+        """
+        query = self.db.query(Inspeccion.banda, func.count(Inspeccion.id))
+        if locacion:
+            query = query.filter(Inspeccion.locacion == locacion)
+        conteos = dict(query.group_by(Inspeccion.banda).all())
+
+        return {
+            "reglas": obtener_reglas().resumen(),
+            "bandas": {banda.etiqueta: conteos.get(banda.etiqueta, 0)
+                       for banda in sorted(BandaPuntaje, reverse=True)},
+            "sin_banda": conteos.get(None, 0),
+        }
     
     # ==========================================
     # CHECK 6: TENDENCIAS HISTÓRICAS
@@ -410,7 +459,7 @@ class DashboardService:
             TendenciaHistoricaResponse con lista de PeriodoTendencia
         """
         ahora = datetime.now()
-        periodos_resultado = []
+        periodos = []  # (inicio, fin, etiqueta) en orden cronológico
         
         if group_by == "week":
             # Iterar últimas N semanas
@@ -421,14 +470,12 @@ class DashboardService:
                 inicio_semana = fecha_ref - timedelta(days=fecha_ref.weekday())
                 inicio_semana = inicio_semana.replace(hour=0, minute=0, second=0, microsecond=0)
                 fin_semana = inicio_semana + timedelta(days=6, hours=23, minutes=59, seconds=59)
-                
-                # Obtener datos de esa semana
-                periodo_data = self._calcular_periodo(inicio_semana, fin_semana, locacion)
-                if periodo_data:
-                    periodo_data.periodo = f"Sem {inicio_semana.isocalendar()[1]}"
-                    periodos_resultado.append(periodo_data)
+                periodos.append((inicio_semana, fin_semana, f"Sem {inicio_semana.isocalendar()[1]}"))
         
         elif group_by == "month":
+            # Nombre del mes en español
+            meses_es = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+                       "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
             # Iterar últimos N meses
             for i in range(ultimos_periodos - 1, -1, -1):
                 # Calcular mes objetivo
@@ -447,61 +494,133 @@ class DashboardService:
                     fin_mes = datetime(año_actual + 1, 1, 1) - timedelta(seconds=1)
                 else:
                     fin_mes = datetime(año_actual, mes_actual + 1, 1) - timedelta(seconds=1)
-                
-                # Obtener datos de ese mes
-                periodo_data = self._calcular_periodo(inicio_mes, fin_mes, locacion)
-                if periodo_data:
-                    # Nombre del mes en español
-                    meses_es = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
-                               "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
-                    periodo_data.periodo = meses_es[mes_actual - 1]
-                    periodos_resultado.append(periodo_data)
+                periodos.append((inicio_mes, fin_mes, meses_es[mes_actual - 1]))
+        
+        # Una sola consulta agrupada para todos los períodos (antes: una por período, trayendo filas)
+        periodos_resultado = []
+        if periodos:
+            metricas = self._metricas_por_periodo(group_by, periodos[0][0], periodos[-1][1], locacion)
+            for inicio, fin, etiqueta in periodos:
+                fila = metricas.get(inicio.date())
+                if fila:  # Sin datos en el período -> no se incluye
+                    periodos_resultado.append(self._periodo_desde_fila(fila, etiqueta, inicio, fin))
         
         return TendenciaHistoricaResponse(
             agrupacion=group_by,
             periodos=periodos_resultado
         )
     
-    def _calcular_periodo(
+    def _bucket_fecha(self, unidad: str):
+        """
+        Inicio del período (lunes de la semana o día 1 del mes) de cada inspección,
+        según el motor: date_trunc en PostgreSQL, funciones de fecha en SQLite.
+        """
+        if self.db.get_bind().dialect.name == "sqlite":
+            if unidad == "week":
+                # strftime('%w'): domingo=0 -> días desde el lunes = (w + 6) % 7
+                dias_desde_lunes = (func.cast(func.strftime('%w', Inspeccion.fecha), Integer) + 6) % 7
+                return func.date(Inspeccion.fecha, func.printf('-%d days', dias_desde_lunes))
+            return func.strftime('%Y-%m-01', Inspeccion.fecha)
+        return func.date(func.date_trunc(unidad, Inspeccion.fecha))
+    
+    def _metricas_por_periodo(
         self, 
+        unidad: str, 
         fecha_inicio: datetime, 
         fecha_fin: datetime, 
         locacion: str = None
-    ) -> PeriodoTendencia:
-        """Calcula las métricas agregadas para un período específico"""
-        query = self.db.query(Inspeccion).filter(
-            Inspeccion.fecha_hora >= fecha_inicio,
-            Inspeccion.fecha_hora <= fecha_fin
+    ) -> dict:
+        """Agregados por semana/mes en SQL. Retorna {fecha de inicio del período: fila}."""
+        bucket = self._bucket_fecha(unidad).label('bucket')
+        query = self.db.query(bucket, *ResumenDiarioService.agregados()).filter(
+            # 'fecha' (día) es indexada junto con locación
+            Inspeccion.fecha >= fecha_inicio.date(),
+            Inspeccion.fecha <= fecha_fin.date()
         )
         
         if locacion:
             query = query.filter(Inspeccion.locacion == locacion)
         
-        inspecciones = query.all()
-        total = len(inspecciones)
-        
-        if total == 0:
-            return None  # No hay datos para este período
-        
-        # Calcular métricas
-        correctas = sum(1 for i in inspecciones if i.veredicto == "PASS")
-        suma_puntajes = sum(i.puntaje_total for i in inspecciones)
-        con_burbujas = sum(1 for i in inspecciones if i.tiene_burbujas)
-        con_grasa = sum(1 for i in inspecciones if i.tiene_grasa)
-        bordes_sucios = sum(1 for i in inspecciones if i.bordes_sucios)
-        dist_deficiente = sum(1 for i in inspecciones if i.distribucion_clase.lower() == "deficiente")
-        dist_mala = sum(1 for i in inspecciones if i.distribucion_clase.lower() == "mala")
-        
+        metricas = {}
+        for r in query.group_by(bucket).all():
+            b = r.bucket
+            # SQLite devuelve texto 'YYYY-MM-DD'; PostgreSQL un date
+            if isinstance(b, datetime):
+                b = b.date()
+            elif isinstance(b, str):
+                b = date.fromisoformat(b[:10])
+            metricas[b] = r
+        return metricas
+    
+    def _periodo_desde_fila(self, r, etiqueta: str, fecha_inicio: datetime, fecha_fin: datetime) -> PeriodoTendencia:
+        """Convierte una fila agregada en un punto de la línea de tendencia"""
+        total = r.total
         return PeriodoTendencia(
-            periodo="",  # Se asigna después
+            periodo=etiqueta,
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
             total_muestras=total,
-            promedio_puntaje=round(suma_puntajes / total, 2),
-            porcentaje_correctas=round((correctas / total) * 100, 2),
-            porcentaje_burbujas=round((con_burbujas / total) * 100, 2),
-            porcentaje_grasa=round((con_grasa / total) * 100, 2),
-            porcentaje_bordes_sucios=round((bordes_sucios / total) * 100, 2),
-            porcentaje_dist_deficiente=round((dist_deficiente / total) * 100, 2),
-            porcentaje_dist_mala=round((dist_mala / total) * 100, 2)
+            promedio_puntaje=round(float(r.suma_puntaje or 0) / r.con_puntaje, 2) if r.con_puntaje else 0.0,
+            porcentaje_correctas=round(((r.correctas or 0) / total) * 100, 2),
+            porcentaje_burbujas=round(((r.con_burbujas or 0) / total) * 100, 2),
+            porcentaje_grasa=round(((r.con_grasa or 0) / total) * 100, 2),
+            porcentaje_bordes_sucios=round(((r.bordes_sucios or 0) / total) * 100, 2),
+            porcentaje_dist_deficiente=round(((r.dist_deficiente or 0) / total) * 100, 2),
+            porcentaje_dist_mala=round(((r.dist_mala or 0) / total) * 100, 2)
+        )
+
+
+# ==========================================
+# VERSIÓN ASYNC (AsyncSession)
+# ==========================================
+class DashboardServiceAsync:
+    """
+    Misma API que DashboardService, pero sobre una AsyncSession.
+    Cada método corre la lógica existente con run_sync: las consultas viajan por el
+    driver async (aiosqlite/asyncpg) sin ocupar un hilo del threadpool mientras esperan.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _ejecutar(self, metodo: str, *args, **kwargs):
+        return await self.db.run_sync(
+            lambda sesion: getattr(DashboardService(sesion), metodo)(*args, **kwargs)
         )
+
+    async def calcular_resumen_general(self, fecha_inicio: datetime = None, fecha_fin: datetime = None,
+                                       locacion: str = None) -> ResumenGeneral:
+        return await self._ejecutar("calcular_resumen_general", fecha_inicio, fecha_fin, locacion)
+
+    async def calcular_comparacion_semanal(self, locacion: str = None) -> ComparacionSemanal:
+        return await self._ejecutar("calcular_comparacion_semanal", locacion=locacion)
+
+    async def calcular_comparacion_periodos(self, desde: date, hasta: date, desde_anterior: date = None,
+                                            hasta_anterior: date = None, locacion: str = None) -> ComparacionSemanal:
+        return await self._ejecutar("calcular_comparacion_periodos", desde, hasta,
+                                    desde_anterior, hasta_anterior, locacion=locacion)
+
+    async def obtener_muestras_por_hora(self, top: int = 5, locacion: str = None) -> list[MuestrasPorHora]:
+        return await self._ejecutar("obtener_muestras_por_hora", top=top, locacion=locacion)
+
+    async def obtener_dias_con_mas_incidentes(self, top: int = 5, locacion: str = None) -> list[IncidentesPorDia]:
+        return await self._ejecutar("obtener_dias_con_mas_incidentes", top=top, locacion=locacion)
+
+    async def generar_dashboard_completo(self, locacion: str = None) -> DashboardResponse:
+        return await self._ejecutar("generar_dashboard_completo", locacion=locacion)
+
+    async def obtener_distribucion_clases(self, locacion: str = None) -> DistribucionClases:
+        return await self._ejecutar("obtener_distribucion_clases", locacion=locacion)
+
+    async def obtener_horneado_clases(self, locacion: str = None) -> HorneadoClases:
+        return await self._ejecutar("obtener_horneado_clases", locacion=locacion)
+
+    async def obtener_top_inspecciones_semana(self, top: int = 10, locacion: str = None) -> dict:
+        return await self._ejecutar("obtener_top_inspecciones_semana", top=top, locacion=locacion)
+
+    async def obtener_distribucion_bandas(self, locacion: str = None) -> dict:
+        return await self._ejecutar("obtener_distribucion_bandas", locacion=locacion)
+
+    async def obtener_tendencia_historica(self, group_by: str = "week", locacion: str = None,
+                                          ultimos_periodos: int = 12) -> TendenciaHistoricaResponse:
+        return await self._ejecutar("obtener_tendencia_historica", group_by=group_by,
+                                    locacion=locacion, ultimos_periodos=ultimos_periodos)
@@ -0,0 +1,267 @@
+import csv
+import io
+import os
+import tempfile
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Side, Alignment, Font, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from app.db.session import SessionLocal
+from app.models.inspeccion import Inspeccion
+from app.services.inspeccion_service import InspeccionService
+
+# Filas que se traen de la BD por vuelta (memoria constante sin importar el total)
+CHUNK_FILAS = 1000
+# Filas por lote Arrow/Parquet (cada lote es un row group: muy chicos penalizan la lectura)
+CHUNK_FILAS_ARROW = 20000
+# Tamaño de cada bloque de bytes enviado al cliente
+CHUNK_BYTES = 64 * 1024
+
+
+def _si_no(valor) -> str:
+    return "Sí" if valor else "No"
+
+
+# --- DEFINICIÓN DE COLUMNAS ---
+# (encabezado, ancho fijo en Excel, columna de la BD, formateador)
+# Los anchos se precalculan: recorrer cada celda para auto-ajustar obliga a tener todo en memoria
+COLUMNAS_EXPORT = [
+    ("ID", 10, Inspeccion.id, None),
+    ("Fecha", 22, Inspeccion.fecha_hora, None),
+    ("Sucursal", 20, Inspeccion.locacion, None),
+    ("Puntaje", 10, Inspeccion.puntaje_total, None),
+    # Veredicto y banda guardados al calificar (mismas reglas que el scoring y el dashboard)
+    ("Veredicto", 12, Inspeccion.veredicto, None),
+    ("Banda", 12, Inspeccion.banda, None),
+    ("Burbujas", 11, Inspeccion.tiene_burbujas, _si_no),
+    ("Bordes Sucios", 16, Inspeccion.bordes_sucios, _si_no),
+    ("Horneado", 15, Inspeccion.horneado_clase, None),
+    ("Distribución", 15, Inspeccion.distribucion_clase, None),
+    ("Grasa", 9, Inspeccion.tiene_grasa, _si_no),
+    ("Link Imagen", 40, Inspeccion.aws_link, None),
+]
+
+
+def _iterar_bloques(
+    filtros: dict, columnas: list, orden: list, limit: Optional[int], chunk: int = CHUNK_FILAS
+) -> Iterator[list]:
+    """
+    Recorre la query filtrada en bloques de 'chunk' tuplas crudas (yield_per).
+    Abre su propia sesión: el generador vive más que la request que lo creó.
+    """
+    db = SessionLocal()
+    try:
+        query = InspeccionService.aplicar_filtros(db=db, **filtros)
+        # Solo las columnas exportadas, sin construir objetos ORM completos
+        query = query.with_entities(*columnas).order_by(*orden)
+        if limit:
+            query = query.limit(limit)
+
+        # stream_results: cursor del lado del servidor en PostgreSQL (no trae todo al cliente)
+        resultado = db.execute(
+            query.statement, execution_options={"yield_per": chunk, "stream_results": True}
+        )
+        for bloque in resultado.partitions():
+            yield bloque
+    finally:
+        db.close()
+
+
+def _iterar_filas(filtros: dict, limit: Optional[int]) -> Iterator[list]:
+    """Filas formateadas para Excel/CSV, más recientes primero."""
+    columnas = [c[2] for c in COLUMNAS_EXPORT]
+    orden = [Inspeccion.fecha_hora.desc(), Inspeccion.id.desc()]
+    for bloque in _iterar_bloques(filtros, columnas, orden, limit):
+        for fila in bloque:
+            yield [
+                formato(valor) if formato else valor
+                for valor, (_, _, _, formato) in zip(fila, COLUMNAS_EXPORT)
+            ]
+
+
+# ==========================================
+# CSV (streaming real, fila a fila)
+# ==========================================
+def generar_csv(filtros: dict, limit: Optional[int] = None) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM para que Excel abra bien los acentos
+    buffer.write("\ufeff")
+    writer.writerow([c[0] for c in COLUMNAS_EXPORT])
+
+    for fila in _iterar_filas(filtros, limit):
+        writer.writerow(fila)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# ==========================================
+# EXCEL (workbook write-only)
+# ==========================================
+def _estilos_excel() -> dict:
+    """Estilos con nombre: se registran una vez en el libro en vez de copiarse en cada celda."""
+    borde = Side(style='thin', color='000000')
+    thin_border = Border(left=borde, right=borde, top=borde, bottom=borde)
+
+    encabezado = NamedStyle(name="encabezado")
+    encabezado.fill = PatternFill(start_color='AFC7A5', end_color='1F2937', fill_type='solid')
+    encabezado.font = Font(bold=True, color='000000', size=11)
+    encabezado.border = thin_border
+    encabezado.alignment = Alignment(horizontal='center', vertical='center')
+
+    dato = NamedStyle(name="dato")
+    dato.border = thin_border
+    dato.alignment = Alignment(vertical='center')
+
+    fecha = NamedStyle(name="dato_fecha", number_format='yyyy-mm-dd hh:mm:ss')
+    fecha.border = thin_border
+    fecha.alignment = Alignment(vertical='center')
+
+    link = NamedStyle(name="dato_link")
+    link.border = thin_border
+    link.alignment = Alignment(vertical='center', wrap_text=True)
+
+    return {"encabezado": encabezado, "dato": dato, "Fecha": fecha, "Link Imagen": link}
+
+
+def generar_excel(filtros: dict, limit: Optional[int] = None) -> Iterator[bytes]:
+    """
+    En modo write_only openpyxl vuelca cada fila a disco al agregarla, así que la
+    memoria no depende del número de filas. Un .xlsx es un zip que solo queda
+    válido al cerrarse: se arma en un archivo temporal y se envía por bloques.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Inspecciones")
+
+    estilos = _estilos_excel()
+    for estilo in estilos.values():
+        wb.add_named_style(estilo)
+
+    # Anchos fijos (deben definirse antes de escribir filas en write_only)
+    for idx, (_, ancho, _, _) in enumerate(COLUMNAS_EXPORT, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = ancho
+
+    def celda(valor, estilo):
+        c = WriteOnlyCell(ws, value=valor)
+        c.style = estilo.name
+        return c
+
+    ws.append([celda(c[0], estilos["encabezado"]) for c in COLUMNAS_EXPORT])
+    estilos_columna = [estilos.get(c[0], estilos["dato"]) for c in COLUMNAS_EXPORT]
+
+    for fila in _iterar_filas(filtros, limit):
+        ws.append([celda(v, e) for v, e in zip(fila, estilos_columna)])
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, "rb") as f:
+            while bloque := f.read(CHUNK_BYTES):
+                yield bloque
+    finally:
+        try: os.remove(path)
+        except OSError: pass
+
+
+# ==========================================
+# PARQUET / ARROW IPC (columnar, para analítica)
+# ==========================================
+# Tipos reales por columna (nada de "Sí"/"No" ni fechas como texto)
+ESQUEMA_ARROW = pa.schema([
+    ("id", pa.int64()),
+    ("fecha_hora", pa.timestamp("us")),
+    ("fecha", pa.date32()),
+    ("hora", pa.int8()),
+    ("locacion", pa.string()),
+    ("aws_link", pa.string()),
+    ("tiene_burbujas", pa.bool_()),
+    ("bordes_sucios", pa.bool_()),
+    ("distribucion_clase", pa.string()),
+    ("horneado_clase", pa.string()),
+    ("tiene_grasa", pa.bool_()),
+    ("score_burbujas", pa.int16()),
+    ("score_bordes", pa.int16()),
+    ("score_distribucion", pa.int16()),
+    ("score_horneado", pa.int16()),
+    ("score_grasa", pa.int16()),
+    ("puntaje_total", pa.int16()),
+    ("veredicto", pa.string()),
+    ("banda", pa.string()),
+    ("version_modelos", pa.string()),
+    ("version_reglas", pa.string()),
+])
+
+
+class _SalidaPorBloques(io.RawIOBase):
+    """
+    Archivo de solo escritura en memoria que se vacía después de cada lote.
+    Los writers de Arrow escriben secuencialmente, así que lo ya escrito
+    se puede enviar al cliente sin esperar el final del archivo.
+    """
+    def __init__(self):
+        self._buffer = bytearray()
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._posicion += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posicion
+
+    def drenar(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _iterar_lotes_arrow(filtros: dict, limit: Optional[int]) -> Iterator[pa.RecordBatch]:
+    columnas = [getattr(Inspeccion, campo.name) for campo in ESQUEMA_ARROW]
+    orden = [Inspeccion.id.asc()]
+    for bloque in _iterar_bloques(filtros, columnas, orden, limit, chunk=CHUNK_FILAS_ARROW):
+        valores = list(zip(*bloque))
+        yield pa.record_batch(
+            [pa.array(col, type=campo.type) for col, campo in zip(valores, ESQUEMA_ARROW)],
+            schema=ESQUEMA_ARROW,
+        )
+
+
+def generar_parquet(filtros: dict, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Parquet por lotes: cada bloque de CHUNK_FILAS_ARROW filas es un row group que se envía al escribirse."""
+    salida = _SalidaPorBloques()
+    with pq.ParquetWriter(pa.PythonFile(salida, mode="w"), ESQUEMA_ARROW, compression="zstd") as writer:
+        for lote in _iterar_lotes_arrow(filtros, limit):
+            writer.write_batch(lote)
+            if data := salida.drenar():
+                yield data
+    # El footer se escribe al cerrar el writer
+    if data := salida.drenar():
+        yield data
+
+
+def generar_arrow(filtros: dict, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Arrow IPC (formato stream): se lee con pyarrow.ipc.open_stream o DuckDB."""
+    salida = _SalidaPorBloques()
+    with pa.ipc.new_stream(pa.PythonFile(salida, mode="w"), ESQUEMA_ARROW) as writer:
+        for lote in _iterar_lotes_arrow(filtros, limit):
+            writer.write_batch(lote)
+            if data := salida.drenar():
+                yield data
+    if data := salida.drenar():
+        yield data
@@ -1,6 +1,14 @@
+import base64
+import json
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, cast, false, func, literal, update, Date, DateTime, String
 from sqlalchemy.orm import Session
 from app.models.inspeccion import Inspeccion
-from datetime import datetime
+from app.models.catalogos import Veredicto
+from app.schemas.inspeccion_schema import InspeccionCorreccion, MAX_ID
+from app.services.scoring_logic import COLUMNAS_ENTRADA, columnas_puntaje, obtener_reglas
+from app.services.resumen_diario_service import ResumenDiarioService
+from datetime import datetime, date
 from typing import Optional
 
 class InspeccionService:
@@ -13,19 +21,20 @@ class InspeccionService:
         fecha_fin: Optional[datetime] = None,
         veredicto: Optional[str] = None,
         min_score: Optional[int] = None,
-        max_score: Optional[int] = None
+        max_score: Optional[int] = None,
+        id_modo: str = "prefijo"
     ):
         """
         Genera la query base con todos los filtros aplicados.
         Devuelve el objeto 'query' de SQLAlchemy sin ejecutar (.all() o .count()).
+        id_modo: "exacto", "prefijo" (por defecto) o "parcial" (LIKE, escanea la tabla).
         """
         # 1. Query Base
         query = db.query(Inspeccion)
         
         # 2. Aplicar filtros si existen
         if id:
-            # Filtrar por ID (búsqueda parcial)
-            query = query.filter(Inspeccion.id.like(f"%{id}%"))
+            query = query.filter(InspeccionService.filtro_id(db, id, id_modo))
         
         if locacion:
             query = query.filter(Inspeccion.locacion == locacion)
@@ -35,10 +44,9 @@ class InspeccionService:
         
         # Filtro por veredicto (PASS/FAIL)
         if veredicto:
-            if veredicto.upper() == "PASS":
-                query = query.filter(Inspeccion.veredicto == "PASS")
-            elif veredicto.upper() == "FAIL":
-                query = query.filter(Inspeccion.veredicto == "FAIL")
+            veredicto_enum = Veredicto.desde_etiqueta(veredicto)
+            if veredicto_enum is not None:
+                query = query.filter(Inspeccion.veredicto == veredicto_enum)
             
         if min_score is not None:
             query = query.filter(Inspeccion.puntaje_total >= min_score)
@@ -46,4 +54,255 @@ class InspeccionService:
         if max_score is not None:
             query = query.filter(Inspeccion.puntaje_total <= max_score)
             
-        return query
\ No newline at end of file
+        return query
+
+    # ==========================================
+    # BÚSQUEDA POR ID
+    # ==========================================
+    @staticmethod
+    def rangos_prefijo(prefijo: int, max_id: int) -> list[tuple[int, int]]:
+        """
+        Expande un prefijo numérico a rangos de ids: 12 -> [12,12], [120,129], [1200,1299], ...
+        hasta superar el id máximo. Cada rango es un BETWEEN sobre la llave primaria.
+        """
+        rangos = []
+        ancho = 1
+        while prefijo * ancho <= max_id:
+            rangos.append((prefijo * ancho, prefijo * ancho + ancho - 1))
+            ancho *= 10
+        return rangos
+
+    @staticmethod
+    def filtro_id(db: Session, texto: str, modo: str = "prefijo"):
+        """
+        Condición para buscar por id.
+        - exacto:  id = N
+        - prefijo: N, N0-N9, N00-N99... (rangos sobre el índice de la PK)
+        - parcial: LIKE '%N%' (opt-in: convierte el id a texto y recorre toda la tabla)
+        """
+        texto = texto.strip().lstrip("#")
+
+        if modo == "parcial":
+            return cast(Inspeccion.id, String).like(f"%{texto}%")
+
+        # Solo dígitos ASCII: isdigit() acepta '²' o '①', que luego rompen int()
+        if not (texto.isascii() and texto.isdigit()):
+            return false()  # Un id no numérico nunca coincide
+        numero = int(texto)
+
+        if modo == "exacto" or numero == 0:
+            return Inspeccion.id == numero
+
+        # El máximo de la PK se resuelve leyendo el final del índice, sin escanear
+        max_id = db.query(func.max(Inspeccion.id)).scalar() or 0
+        rangos = InspeccionService.rangos_prefijo(numero, max_id)
+        if not rangos:
+            return false()
+        return or_(*[Inspeccion.id.between(desde, hasta) for desde, hasta in rangos])
+
+    # ==========================================
+    # ORDENAMIENTO Y PAGINACIÓN POR CURSOR (KEYSET)
+    # ==========================================
+    @staticmethod
+    def columna_orden(sort_by: Optional[str]):
+        """Columna real de la tabla para ordenar (id si no existe)."""
+        if sort_by and sort_by in Inspeccion.__table__.columns:
+            return getattr(Inspeccion, sort_by)
+        return Inspeccion.id
+
+    @staticmethod
+    def ordenar(query, sort_by: Optional[str] = "id", sort_order: Optional[str] = "desc"):
+        """
+        Ordena por (columna, id). El id desempata filas con el mismo valor para
+        que el orden sea total y el cursor nunca salte ni repita registros.
+        NULLs primero en asc y al final en desc (igual en SQLite y PostgreSQL).
+        """
+        columna = InspeccionService.columna_orden(sort_by)
+        if sort_order == "asc":
+            orden = [columna.asc().nulls_first()]
+            if columna is not Inspeccion.id:
+                orden.append(Inspeccion.id.asc())
+        else:
+            orden = [columna.desc().nulls_last()]
+            if columna is not Inspeccion.id:
+                orden.append(Inspeccion.id.desc())
+        return query.order_by(*orden)
+
+    @staticmethod
+    def _codificar_cursor(sort_by: str, sort_order: str, valor, id_: int) -> str:
+        if isinstance(valor, (datetime, date)):
+            valor = valor.isoformat()
+        payload = {"s": sort_by, "o": sort_order, "v": valor, "id": id_}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decodificar_cursor(cursor: str, columna, sort_by: str, sort_order: str):
+        """Retorna (valor, id) del último registro visto. ValueError si el cursor no sirve."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            valor, id_ = payload["v"], int(payload["id"])
+        except Exception:
+            raise ValueError("Cursor inválido")
+
+        # Un cursor solo vale para el mismo ordenamiento con el que se generó
+        if payload.get("s") != sort_by or payload.get("o") != sort_order:
+            raise ValueError("El cursor no corresponde al ordenamiento solicitado")
+
+        if valor is not None:
+            if isinstance(columna.type, DateTime):
+                valor = datetime.fromisoformat(valor)
+            elif isinstance(columna.type, Date):
+                valor = date.fromisoformat(valor)
+        return valor, id_
+
+    @staticmethod
+    def _filtro_despues_de(columna, valor, id_: int, sort_order: str):
+        """Condición WHERE para las filas que van después de (valor, id) en el orden dado."""
+        if columna is Inspeccion.id:
+            return Inspeccion.id > id_ if sort_order == "asc" else Inspeccion.id < id_
+
+        # Parámetro tipado: permite '>'/'<' también sobre columnas booleanas
+        if valor is not None:
+            valor = literal(valor, type_=columna.type)
+
+        if sort_order == "asc":
+            # NULLs van primero
+            if valor is None:
+                return or_(
+                    and_(columna.is_(None), Inspeccion.id > id_),
+                    columna.isnot(None),
+                )
+            return or_(columna > valor, and_(columna == valor, Inspeccion.id > id_))
+
+        # desc: NULLs van al final
+        if valor is None:
+            return and_(columna.is_(None), Inspeccion.id < id_)
+        return or_(
+            columna < valor,
+            and_(columna == valor, Inspeccion.id < id_),
+            columna.is_(None),
+        )
+
+    @staticmethod
+    def paginar_por_cursor(
+        query,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort_by: Optional[str] = "id",
+        sort_order: Optional[str] = "desc",
+    ):
+        """
+        Paginación keyset sobre (columna de orden, id).
+        A diferencia de offset(), el costo no crece con la profundidad de la página:
+        la BD salta directo al último registro visto usando el índice.
+        Retorna (registros, next_cursor); next_cursor es None en la última página.
+        """
+        columna = InspeccionService.columna_orden(sort_by)
+        sort_by = columna.key
+        sort_order = "asc" if sort_order == "asc" else "desc"
+
+        if cursor:
+            valor, id_ = InspeccionService._decodificar_cursor(cursor, columna, sort_by, sort_order)
+            query = query.filter(InspeccionService._filtro_despues_de(columna, valor, id_, sort_order))
+
+        # Pedimos uno extra para saber si hay otra página sin hacer un COUNT
+        registros = InspeccionService.ordenar(query, sort_by, sort_order).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(registros) > limit:
+            registros = registros[:limit]
+            ultimo = registros[-1]
+            next_cursor = InspeccionService._codificar_cursor(
+                sort_by, sort_order, getattr(ultimo, sort_by), ultimo.id
+            )
+        return registros, next_cursor
+
+    # ==========================================
+    # CORRECCIÓN MASIVA (SESIÓN DE REVISIÓN)
+    # ==========================================
+    @staticmethod
+    def _mensaje_validacion(error: ValidationError) -> str:
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+    @staticmethod
+    def corregir_lote(db: Session, correcciones: list) -> dict:
+        """
+        Aplica muchas correcciones humanas en una sola transacción:
+        una consulta trae todas las filas, el re-scoring es una pasada vectorizada
+        (ReglasPuntaje.calcular_lote) y se escribe con un UPDATE masivo + un commit.
+        Ítems inválidos, repetidos o inexistentes se informan en su posición sin
+        frenar al resto (el cliente reenvía solo esos).
+        """
+        resultados = [None] * len(correcciones)
+        validas = {}  # id -> (posición, cambios)
+
+        # 1. Validación ítem por ítem
+        for pos, item in enumerate(correcciones):
+            if not isinstance(item, dict):
+                resultados[pos] = {"id": None, "ok": False, "error": "La corrección debe ser un objeto"}
+                continue
+            # Solo se devuelve un id entero (el esquema de respuesta no admite otro tipo)
+            id_item = item.get("id")
+            if not isinstance(id_item, int) or isinstance(id_item, bool) or not 0 < id_item <= MAX_ID:
+                id_item = None
+            try:
+                correccion = InspeccionCorreccion.model_validate(item)
+            except ValidationError as e:
+                resultados[pos] = {"id": id_item, "ok": False,
+                                   "error": InspeccionService._mensaje_validacion(e)}
+                continue
+
+            cambios = correccion.model_dump(exclude_unset=True, exclude={"id"})
+            # Convertir 0/1 a bool (igual que el PATCH individual)
+            for campo in ('tiene_burbujas', 'bordes_sucios', 'tiene_grasa'):
+                if campo in cambios and isinstance(cambios[campo], int):
+                    cambios[campo] = bool(cambios[campo])
+
+            if not cambios:
+                resultados[pos] = {"id": correccion.id, "ok": False, "error": "Sin campos para corregir"}
+            elif correccion.id in validas:
+                resultados[pos] = {"id": correccion.id, "ok": False, "error": "id repetido en el lote"}
+            else:
+                validas[correccion.id] = (pos, cambios)
+
+        # 2. Una sola consulta para todas las filas (solo las columnas de entrada del scoring)
+        filas = {}
+        if validas:
+            columnas = [Inspeccion.id, Inspeccion.locacion, Inspeccion.fecha] \
+                + [getattr(Inspeccion, c) for c in COLUMNAS_ENTRADA]
+            filas = {f.id: f for f in db.query(*columnas).filter(Inspeccion.id.in_(validas)).all()}
+        for id_, (pos, _) in list(validas.items()):
+            if id_ not in filas:
+                resultados[pos] = {"id": id_, "ok": False, "error": "Inspección no encontrada"}
+                del validas[id_]
+
+        # 3. Re-scoring vectorizado + UPDATE masivo por clave primaria
+        if validas:
+            ids = list(validas)
+            entradas = [
+                {c: validas[id_][1].get(c, getattr(filas[id_], c)) for c in COLUMNAS_ENTRADA}
+                for id_ in ids
+            ]
+            puntajes = obtener_reglas().calcular_lote(entradas)
+            # Todas las filas con las mismas columnas (la entrada ya mezclada): el UPDATE
+            # masivo se agrupa por juego de claves y así sale en un solo executemany
+            db.execute(update(Inspeccion), [
+                {"id": id_, **entrada, **columnas_puntaje(p)} for id_, entrada, p in zip(ids, entradas, puntajes)
+            ])
+            db.commit()
+            # Snapshots diarios: una vez por request con todos los días tocados
+            ResumenDiarioService.actualizar_dias(db, {(filas[id_].locacion, filas[id_].fecha) for id_ in ids})
+
+            # Filas ya actualizadas para la respuesta (una consulta)
+            for inspeccion in db.query(Inspeccion).filter(Inspeccion.id.in_(ids)).populate_existing():
+                pos = validas[inspeccion.id][0]
+                resultados[pos] = {"id": inspeccion.id, "ok": True, "inspeccion": inspeccion}
+
+        actualizadas = len(validas)
+        return {
+            "actualizadas": actualizadas,
+            "errores": len(correcciones) - actualizadas,
+            "resultados": resultados,
+        }
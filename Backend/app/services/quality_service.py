@@ -2,36 +2,86 @@ import requests
 import cv2
 import numpy as np
 import tempfile
+import hashlib
 import os
+import time
 import torch
 from PIL import Image
 from torchvision import transforms
 from sqlalchemy.orm import Session
 from app.models.inspeccion import Inspeccion
+from app.models.modelo_version import ConjuntoModelos
 from app.core.model_loader import model_manager
 from app.services.scoring_logic import calcular_puntaje
+from app.services.sombra_service import evaluador_sombra
+from app.services.resumen_diario_service import ResumenDiarioService
+
+# El orden de salida de cada ResNet (índice -> clase) viene del manifiesto del modelo
+# (self.modelos.clases); los valores de entrenamiento están en model_loader.MODELOS
+
+# Cabeza -> (columna de Inspeccion, etiqueta que significa True o None si se guarda la clase)
+CABEZAS = {
+    "resnet_horneado": ("horneado_clase", None),
+    "resnet_burbujas": ("tiene_burbujas", "si"),      # carpetas [no, si]
+    "resnet_bordes": ("bordes_sucios", "sucio"),      # carpetas [limpio, sucio]
+    "resnet_grasa": ("tiene_grasa", "si"),            # carpetas [no, si]
+    "resnet_distribucion": ("distribucion_clase", None),
+}
+
+# Carpeta opcional para guardar las imágenes descargadas (clave: sha256 del link).
+# Sin definir, cada imagen se descarga a un temporal y se borra al terminar.
+IMAGENES_CACHE_DIR = os.getenv("IMAGENES_CACHE_DIR")
+
+# Máximo de resultados por fila que se devuelven (el resto solo se cuenta): la memoria
+# de una carga no crece con la cantidad de filas
+MAX_DETALLE_RESULTADOS = 100
 
 class QualityService:
     def __init__(self, db: Session):
         self.db = db
+        # Con CARGA_MODELOS=primer_uso la primera request carga los modelos;
+        # con 'fondo' espera a que termine la carga en curso
+        model_manager.asegurar_cargados()
         self.device = model_manager.device
+        # Referencia fija al conjunto de modelos: si hay una recarga en caliente a mitad
+        # de la carga masiva, esta termina con los modelos con los que empezó
+        self.modelos = model_manager.actual
+        self.version_modelos = self.modelos.version_modelos
+        self._registrar_conjunto_modelos()
         
         # Transformación estándar para ResNet (La misma del entrenamiento)
+        # El tamaño sale del manifiesto (todas las cabezas usan el mismo)
+        tamano = self.modelos.tamano_entrada("resnet_horneado")
         self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
+            transforms.Resize((tamano, tamano)),
             transforms.ToTensor(),
             transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
         ])
 
+    def _registrar_conjunto_modelos(self):
+        """Guarda qué versión de cada modelo corresponde a version_modelos (una vez por conjunto)."""
+        if not self.version_modelos or self.db.get(ConjuntoModelos, self.version_modelos):
+            return
+        try:
+            self.db.add(ConjuntoModelos(version=self.version_modelos, detalle=self.modelos.versiones))
+            self.db.commit()
+        except Exception:
+            # Otro worker lo registró al mismo tiempo
+            self.db.rollback()
+
     def procesar_lista_con_metadata(self, lista_datos, locacion_manual):
         """
-        Procesa lista de dicts: [{'link': '...', 'fecha': datetime}, ...]
+        Procesa lista (o cualquier iterable, p. ej. un generador por bloques) de
+        dicts: [{'link': '...', 'fecha': datetime}, ...]
+        Retorna contadores y el detalle de las primeras MAX_DETALLE_RESULTADOS filas.
         """
         resultados = []
         errores = 0
         procesados = 0
+        dias = set()  # (locación, día) con inspecciones nuevas: snapshots a recalcular
         
-        print(f"🚀 Iniciando procesamiento de {len(lista_datos)} imágenes para {locacion_manual}...")
+        total = f"{len(lista_datos)} " if hasattr(lista_datos, "__len__") else ""
+        print(f"🚀 Iniciando procesamiento de {total}imágenes para {locacion_manual}...")
 
         for index, item in enumerate(lista_datos):
             link = item['link']
@@ -46,7 +96,9 @@ class QualityService:
 
             try:
                 # --- PASO 2: ANÁLISIS ---
-                datos_ia = self._analizar_imagen(img_path)
+                img_tensor = self._preparar_tensor(img_path)
+                produccion = {}  # cabeza -> (etiqueta, ms): referencia para la evaluación en sombra
+                datos_ia = self._predecir_cabezas(img_tensor, produccion)
                 
                 # --- PASO 3: SCORING ---
                 scores = calcular_puntaje(datos_ia)
@@ -71,18 +123,28 @@ class QualityService:
                     score_grasa=scores['grasa'],
                     
                     puntaje_total=scores['total'],
-                    veredicto=scores['veredicto']
+                    veredicto=scores['veredicto'],
+                    banda=scores['banda'],
+                    version_modelos=self.version_modelos,
+                    version_reglas=scores['version_reglas']
                 )
                 
                 self.db.add(nueva_inspeccion)
                 self.db.commit()
+
+                # --- PASO 5: SOMBRA (muestreo, en otro hilo) ---
+                evaluador_sombra.programar(self.modelos, img_tensor, produccion,
+                                           self.etiqueta_cabeza, nueva_inspeccion.id)
                 
                 procesados += 1
-                resultados.append({
-                    "id": index + 1,
-                    "veredicto": scores['veredicto'],
-                    "score": scores['total']
-                })
+                if fecha:
+                    dias.add((locacion_manual, fecha.date()))
+                if len(resultados) < MAX_DETALLE_RESULTADOS:
+                    resultados.append({
+                        "id": index + 1,
+                        "veredicto": scores['veredicto'],
+                        "score": scores['total']
+                    })
                 print(f"✅ [{index+1}] {locacion_manual} - {scores['total']}pts")
 
             except Exception as e:
@@ -91,18 +153,45 @@ class QualityService:
                 self.db.rollback()
             
             finally:
-                if os.path.exists(img_path):
+                if os.path.exists(img_path) and not self._en_cache(img_path):
                     try: os.remove(img_path)
                     except: pass
         
-        return resultados
+        # Cargas tardías (días ya cerrados): un recálculo por día al final, no por imagen
+        ResumenDiarioService.actualizar_dias(self.db, dias)
+        return {
+            "procesados": procesados,
+            "errores": errores,
+            "detalle": resultados,
+            "detalle_omitido": procesados - len(resultados),
+        }
+
+    @staticmethod
+    def _ruta_cache(url):
+        return os.path.join(IMAGENES_CACHE_DIR, hashlib.sha256(url.encode()).hexdigest() + ".jpg")
+
+    @staticmethod
+    def _en_cache(img_path):
+        return bool(IMAGENES_CACHE_DIR) and os.path.dirname(img_path) == os.path.normpath(IMAGENES_CACHE_DIR)
 
     def _descargar_imagen(self, url):
-        """Descarga segura con Timeouts"""
+        """Descarga segura con Timeouts (o la copia de IMAGENES_CACHE_DIR si ya está)"""
+        if IMAGENES_CACHE_DIR:
+            ruta = self._ruta_cache(url)
+            if os.path.exists(ruta):
+                return ruta
         try:
             # Timeout de 5s para conexión, 10s para lectura
             response = requests.get(url, stream=True, timeout=(5, 10))
             if response.status_code == 200:
+                if IMAGENES_CACHE_DIR:
+                    # Escritura atómica: otro proceso nunca lee una imagen a medias
+                    os.makedirs(IMAGENES_CACHE_DIR, exist_ok=True)
+                    temp = tempfile.NamedTemporaryFile(delete=False, dir=IMAGENES_CACHE_DIR, suffix=".tmp")
+                    temp.write(response.content)
+                    temp.close()
+                    os.replace(temp.name, ruta)
+                    return ruta
                 temp = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
                 temp.write(response.content)
                 temp.close()
@@ -111,16 +200,16 @@ class QualityService:
             return None
         return None
 
-    def _analizar_imagen(self, img_path):
-        """Pipeline de Visión Artificial"""
+    def _preparar_tensor(self, img_path):
+        """Recorte YOLO + transformación: entrada común de todas las ResNet"""
         img_cv2 = cv2.imread(img_path)
         if img_cv2 is None: raise Exception("Imagen corrupta/no leíble")
 
         # A. YOLO CROP (Recortar la pizza)
         crop = img_cv2
-        if model_manager.yolo:
+        if self.modelos.yolo:
             # Confianza baja (0.25) para asegurar que detecte algo
-            results = model_manager.yolo(img_cv2, verbose=False, conf=0.25) 
+            results = self.modelos.yolo(img_cv2, verbose=False, conf=0.25) 
             if results[0].boxes:
                 box = sorted(results[0].boxes, key=lambda x: x.conf[0], reverse=True)[0]
                 x1, y1, x2, y2 = map(int, box.xyxy[0])
@@ -133,26 +222,37 @@ class QualityService:
         # B. PREPARAR TENSOR
         crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
         pil_img = Image.fromarray(crop_rgb)
-        img_tensor = self.transform(pil_img).unsqueeze(0).to(self.device)
+        return self.transform(pil_img).unsqueeze(0).to(self.device)
+
+    def etiqueta_cabeza(self, nombre, img_tensor, modelos=None):
+        """Clase cruda que predice una cabeza (de self.modelos o de otro conjunto, p. ej. candidatos)"""
+        modelos = modelos or self.modelos
+        return self._predict_resnet(getattr(modelos, nombre), img_tensor, modelos.clases(nombre))
+
+    def predecir_cabeza(self, nombre, img_tensor, detalle=None):
+        """
+        Valor de la columna de Inspeccion que corresponde a una sola cabeza.
+        Si se pasa 'detalle', anota ahí (etiqueta cruda, ms) de la cabeza.
+        """
+        _, positiva = CABEZAS[nombre]
+        inicio = time.perf_counter()
+        etiqueta = self.etiqueta_cabeza(nombre, img_tensor)
+        if detalle is not None:
+            detalle[nombre] = (etiqueta, (time.perf_counter() - inicio) * 1000)
+        return etiqueta if positiva is None else etiqueta == positiva
+
+    def _analizar_imagen(self, img_path):
+        """Pipeline de Visión Artificial"""
+        return self._predecir_cabezas(self._preparar_tensor(img_path))
 
+    def _predecir_cabezas(self, img_tensor, detalle=None):
         # C. PREDECIR
         predicciones = {
-            # Horneado: clases en orden alfabético como fueron entrenadas
-            "horneado": self._predict_resnet(model_manager.resnet_horneado, img_tensor, 
-                                             ['alto', 'bajo', 'correcto', 'excesivo', 'insuficiente']),
-            
-            # Burbujas: carpetas [no, si] -> índice 1 = tiene burbujas
-            "tiene_burbujas": self._predict_resnet_bool(model_manager.resnet_burbujas, img_tensor),
-            
-            # Bordes: carpetas [limpio, sucio] -> índice 1 = sucio
-            "bordes_sucios": self._predict_bordes_sucios(model_manager.resnet_bordes, img_tensor),
-            
-            # Grasa: carpetas [no, si] -> índice 1 = tiene grasa
-            "tiene_grasa": self._predict_resnet_bool(model_manager.resnet_grasa, img_tensor),
-            
-            # Distribución: clases en orden alfabético como fueron entrenadas
-            "distribucion": self._predict_resnet(model_manager.resnet_distribucion, img_tensor,
-                                                ['aceptable', 'correcto', 'deficiente', 'mala', 'media']),
+            "horneado": self.predecir_cabeza("resnet_horneado", img_tensor, detalle),
+            "tiene_burbujas": self.predecir_cabeza("resnet_burbujas", img_tensor, detalle),
+            "bordes_sucios": self.predecir_cabeza("resnet_bordes", img_tensor, detalle),
+            "tiene_grasa": self.predecir_cabeza("resnet_grasa", img_tensor, detalle),
+            "distribucion": self.predecir_cabeza("resnet_distribucion", img_tensor, detalle),
         }
         
         # Campo auxiliar para el scoring (inverso de bordes_sucios)
@@ -177,35 +277,3 @@ class QualityService:
             confidence, preds = torch.max(probs, 1)
             result = class_names[preds.item()]
             return result
-
-    def _predict_resnet_bool(self, model, tensor):
-        """
-        Para modelos binarios con carpetas [no, si] en orden alfabético:
-        - Índice 0 = 'no' -> False
-        - Índice 1 = 'si' -> True
-        """
-        if not model: 
-            print(f"Modelo bool no cargado")
-            return False
-        with torch.no_grad():
-            outputs = model(tensor)
-            probs = torch.nn.functional.softmax(outputs, dim=1)
-            confidence, preds = torch.max(probs, 1)
-            result = preds.item() == 1
-            return result
-    
-    def _predict_bordes_sucios(self, model, tensor):
-        """
-        Para modelo de bordes con carpetas [limpio, sucio]:
-        - Índice 0 = 'limpio' -> False (no sucio)
-        - Índice 1 = 'sucio' -> True
-        """
-        if not model: 
-            print(f"Modelo bordes no cargado")
-            return False
-        with torch.no_grad():
-            outputs = model(tensor)
-            probs = torch.nn.functional.softmax(outputs, dim=1)
-            confidence, preds = torch.max(probs, 1)
-            result = preds.item() == 1
-            return result
\ No newline at end of file
@@ -0,0 +1,157 @@
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Integer, func, or_, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from app.models.inspeccion import Inspeccion
+from app.models.catalogos import Veredicto
+from app.services.scoring_logic import COLUMNAS_ENTRADA, COMPONENTES, ReglasPuntaje
+from app.services.resumen_diario_service import ResumenDiarioService
+
+
+class RecalculoPuntajesService:
+    """
+    Re-califica filas ya guardadas con una versión de las reglas de puntaje.
+    - simular(): lee las columnas de entrada por bloques y calcula con NumPy; no escribe.
+      Retorna cuántas filas cambiarían de puntaje/veredicto y algunos ejemplos.
+    - aplicar(): un UPDATE con CASE por rango de ids; las filas nunca pasan por Python.
+    Por defecto solo toma filas calificadas con otra versión (reanudable).
+    """
+
+    @staticmethod
+    def _condiciones(
+        reglas: ReglasPuntaje,
+        locacion: Optional[str] = None,
+        fecha_inicio: Optional[datetime] = None,
+        fecha_fin: Optional[datetime] = None,
+        incluir_actualizadas: bool = False,
+    ) -> list:
+        condiciones = []
+        if not incluir_actualizadas:
+            condiciones.append(or_(Inspeccion.version_reglas.is_(None),
+                                   Inspeccion.version_reglas != reglas.version))
+        if locacion:
+            condiciones.append(Inspeccion.locacion == locacion)
+        if fecha_inicio:
+            condiciones.append(Inspeccion.fecha_hora >= fecha_inicio)
+        if fecha_fin:
+            condiciones.append(Inspeccion.fecha_hora <= fecha_fin)
+        return condiciones
+
+    @staticmethod
+    def _a_codigos(columna: str, valores) -> np.ndarray:
+        """Valores crudos de la BD -> códigos de calcular_arrays (NULL = -1; en booleanas, 0)."""
+        if COLUMNAS_ENTRADA[columna][1] is None:
+            return np.fromiter((1 if v else 0 for v in valores), dtype=np.int8, count=len(valores))
+        return np.fromiter((-1 if v is None else v for v in valores), dtype=np.int16, count=len(valores))
+
+    @staticmethod
+    def simular(db: Session, reglas: ReglasPuntaje, lote: int = 50000, ejemplos: int = 20, **filtros) -> dict:
+        condiciones = RecalculoPuntajesService._condiciones(reglas, **filtros)
+        entradas = list(COLUMNAS_ENTRADA)
+        # type_coerce: los catálogos se leen como su código entero, sin pasar a etiqueta
+        columnas = [Inspeccion.id] + [type_coerce(getattr(Inspeccion, c), Integer).label(c) for c in entradas] \
+            + [Inspeccion.puntaje_total, type_coerce(Inspeccion.veredicto, Integer).label("veredicto"),
+               type_coerce(Inspeccion.banda, Integer).label("banda")] \
+            + [getattr(Inspeccion, f"score_{c}") for c in COMPONENTES]
+
+        diff = {
+            "version_reglas": reglas.version,
+            "filas": 0,
+            "cambian_puntaje": 0,
+            "cambian_veredicto": 0,
+            "pass_a_fail": 0,
+            "fail_a_pass": 0,
+            "cambian_banda": 0,
+            "delta_puntaje_total": 0,
+            "cambios_por_componente": {c: 0 for c in COMPONENTES},
+            "ejemplos": [],
+        }
+        inicio = time.perf_counter()
+        ultimo_id = 0
+        while True:
+            filas = db.execute(
+                select(*columnas).where(Inspeccion.id > ultimo_id, *condiciones)
+                .order_by(Inspeccion.id).limit(lote)
+            ).all()
+            if not filas:
+                break
+            ultimo_id = filas[-1].id
+            por_nombre = dict(zip(filas[0]._fields, zip(*filas)))
+
+            nuevos = reglas.calcular_arrays(
+                {c: RecalculoPuntajesService._a_codigos(c, por_nombre[c]) for c in entradas}
+            )
+            total_viejo = np.array([v or 0 for v in por_nombre["puntaje_total"]], dtype=np.int16)
+            veredicto_viejo = np.array([-1 if v is None else v for v in por_nombre["veredicto"]], dtype=np.int8)
+            cambia_total = nuevos["puntaje_total"] != total_viejo
+            cambia_veredicto = nuevos["veredicto"] != veredicto_viejo
+
+            diff["filas"] += len(filas)
+            diff["cambian_puntaje"] += int(cambia_total.sum())
+            diff["cambian_veredicto"] += int(cambia_veredicto.sum())
+            diff["pass_a_fail"] += int((cambia_veredicto & (veredicto_viejo == int(Veredicto.PASS))).sum())
+            diff["fail_a_pass"] += int((cambia_veredicto & (nuevos["veredicto"] == int(Veredicto.PASS))).sum())
+            banda_vieja = np.array([-1 if v is None else v for v in por_nombre["banda"]], dtype=np.int8)
+            diff["cambian_banda"] += int((nuevos["banda"] != banda_vieja).sum())
+            diff["delta_puntaje_total"] += int((nuevos["puntaje_total"].astype(np.int64) - total_viejo).sum())
+            for c in COMPONENTES:
+                viejo = np.array([v or 0 for v in por_nombre[f"score_{c}"]], dtype=np.int16)
+                diff["cambios_por_componente"][c] += int((nuevos[f"score_{c}"] != viejo).sum())
+
+            faltan = ejemplos - len(diff["ejemplos"])
+            for i in np.flatnonzero(cambia_total | cambia_veredicto)[:max(faltan, 0)]:
+                diff["ejemplos"].append({
+                    "id": por_nombre["id"][i],
+                    "puntaje_actual": int(total_viejo[i]),
+                    "puntaje_nuevo": int(nuevos["puntaje_total"][i]),
+                    "veredicto_actual": Veredicto(int(veredicto_viejo[i])).etiqueta if veredicto_viejo[i] >= 0 else None,
+                    "veredicto_nuevo": Veredicto(int(nuevos["veredicto"][i])).etiqueta,
+                })
+
+        diff["delta_promedio"] = round(diff["delta_puntaje_total"] / diff["filas"], 2) if diff["filas"] else 0
+        diff["segundos"] = round(time.perf_counter() - inicio, 2)
+        return diff
+
+    @staticmethod
+    def aplicar(db: Session, reglas: ReglasPuntaje, lote: int = 100000, **filtros) -> dict:
+        condiciones = RecalculoPuntajesService._condiciones(reglas, **filtros)
+        desde, hasta = db.query(func.min(Inspeccion.id), func.max(Inspeccion.id)).filter(*condiciones).one()
+        if desde is None:
+            print(f"✅ Nada que recalcular con reglas {reglas.version}")
+            return {"version_reglas": reglas.version, "actualizadas": 0, "segundos": 0}
+
+        tabla = Inspeccion.__table__
+        valores = reglas.expresiones_sql(tabla)
+        actualizadas = 0
+        inicio = time.perf_counter()
+        # Rangos de ids: transacciones acotadas y, si se corta, las filas ya hechas
+        # quedan con la versión nueva y no se vuelven a tocar
+        for inicio_rango in range(desde, hasta + 1, lote):
+            resultado = db.execute(
+                update(tabla)
+                .where(tabla.c.id >= inicio_rango, tabla.c.id < inicio_rango + lote, *condiciones)
+                .values(**valores)
+            )
+            db.commit()
+            actualizadas += resultado.rowcount
+            avance = min(inicio_rango + lote - desde, hasta - desde + 1) / (hasta - desde + 1)
+            print(f"📦 ids {inicio_rango}-{min(inicio_rango + lote - 1, hasta)} | "
+                  f"{actualizadas} filas | {avance:.0%}")
+
+        # Veredictos y puntajes cambiaron: regenerar los snapshots diarios del mismo rango
+        if actualizadas:
+            fecha_inicio, fecha_fin = filtros.get("fecha_inicio"), filtros.get("fecha_fin")
+            ResumenDiarioService.reconstruir(
+                db,
+                desde=fecha_inicio.date() if fecha_inicio else None,
+                hasta=fecha_fin.date() if fecha_fin else None,
+                locacion=filtros.get("locacion"),
+            )
+
+        segundos = round(time.perf_counter() - inicio, 2)
+        print(f"✅ Reglas {reglas.version} aplicadas a {actualizadas} filas en {segundos}s")
+        return {"version_reglas": reglas.version, "actualizadas": actualizadas, "segundos": segundos}
@@ -0,0 +1,234 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.inspeccion import Inspeccion
+from app.models.resumen_diario import ResumenDiario
+from app.models.catalogos import DistribucionClase, Veredicto
+
+# Minutos después de medianoche en que se cierra el día anterior (deja entrar las
+# inspecciones que llegan con algo de atraso)
+CIERRE_DIARIO_MARGEN_MIN = int(os.getenv("CIERRE_DIARIO_MARGEN_MIN", "10"))
+
+# Conteos que guarda cada snapshot (todos sumables entre días)
+METRICAS = [
+    "total", "correctas", "suma_puntaje", "con_puntaje", "con_burbujas",
+    "con_grasa", "bordes_sucios", "dist_deficiente", "dist_mala",
+]
+
+
+class ResumenDiarioService:
+    """
+    Snapshots diarios por locación de las métricas del resumen general.
+    - cerrar_pendientes(): genera los días cerrados que faltan (al cierre del día).
+    - actualizar_dias(): recalcula los días ya cerrados que recibieron inspecciones
+      nuevas o corregidas (cargas tardías, PATCH).
+    - sumar(): totales de un rango sumando snapshots; solo los días sin cierre (hoy)
+      se leen de inspecciones.
+    El último día con snapshot marca hasta dónde está cerrado.
+    """
+
+    @staticmethod
+    def agregados() -> list:
+        """
+        Conteos de METRICAS como agregados SQL sobre Inspeccion. Los usan los snapshots
+        y las métricas en vivo del dashboard: las dos vías calculan exactamente lo mismo.
+        """
+        return [
+            func.count(Inspeccion.id).label('total'),
+            func.sum(case((Inspeccion.veredicto == Veredicto.PASS, 1), else_=0)).label('correctas'),
+            func.sum(Inspeccion.puntaje_total).label('suma_puntaje'),
+            func.count(Inspeccion.puntaje_total).label('con_puntaje'),
+            func.sum(case((Inspeccion.tiene_burbujas == True, 1), else_=0)).label('con_burbujas'),
+            func.sum(case((Inspeccion.tiene_grasa == True, 1), else_=0)).label('con_grasa'),
+            func.sum(case((Inspeccion.bordes_sucios == True, 1), else_=0)).label('bordes_sucios'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.DEFICIENTE, 1), else_=0)).label('dist_deficiente'),
+            func.sum(case((Inspeccion.distribucion_clase == DistribucionClase.MALA, 1), else_=0)).label('dist_mala'),
+        ]
+
+    @staticmethod
+    def _filtro_locaciones(locaciones) -> list:
+        reales = [l for l in locaciones if l]
+        filtro = Inspeccion.locacion.in_(reales)
+        if "" in locaciones:
+            filtro = or_(filtro, Inspeccion.locacion.is_(None))
+        return [filtro]
+
+    @staticmethod
+    def _calcular(db: Session, *condiciones) -> list:
+        """Una consulta agrupada por (día, locación) -> filas ResumenDiario sin guardar."""
+        locacion = func.coalesce(Inspeccion.locacion, "").label("locacion")
+        filas = db.query(Inspeccion.fecha, locacion, *ResumenDiarioService.agregados()) \
+            .filter(Inspeccion.fecha.isnot(None), *condiciones) \
+            .group_by(Inspeccion.fecha, locacion).all()
+        return [
+            ResumenDiario(fecha=f.fecha, locacion=f.locacion,
+                          **{m: int(getattr(f, m) or 0) for m in METRICAS})
+            for f in filas
+        ]
+
+    @staticmethod
+    def _reemplazar(db: Session, grupos: list, es_cierre: bool = False) -> int:
+        """
+        Borra y recalcula snapshots en una transacción.
+        grupos: [(condiciones sobre Inspeccion, condiciones sobre ResumenDiario)].
+        Si otro worker escribe el mismo (día, locación) en paralelo, el commit choca con
+        la clave única y el rollback deshace también nuestro DELETE: su fila puede no
+        incluir lo que este proceso ya guardó, así que se borra y recalcula una vez más.
+        Solo en el cierre (es_cierre) el choque se ignora: ambos cerraron los mismos días.
+        """
+        for intento in range(2):
+            nuevos = []
+            for calcular, borrar in grupos:
+                nuevos += ResumenDiarioService._calcular(db, *calcular)
+                db.query(ResumenDiario).filter(*borrar).delete(synchronize_session=False)
+            db.add_all(nuevos)
+            try:
+                db.commit()
+                return len(nuevos)
+            except IntegrityError as e:
+                db.rollback()
+                if es_cierre:
+                    return 0
+                if intento:
+                    print(f"⚠️ No se pudo actualizar el resumen diario (conflicto): {e}")
+        return 0
+
+    @staticmethod
+    def ultimo_cierre(db: Session) -> Optional[date]:
+        return db.query(func.max(ResumenDiario.fecha)).scalar()
+
+    # --- CIERRE / RECONSTRUCCIÓN ---
+    @staticmethod
+    def _regenerar(db: Session, desde: Optional[date], hasta: date, locacion: str = None,
+                   es_cierre: bool = False) -> int:
+        if desde and desde > hasta:
+            return 0
+
+        condiciones = [Inspeccion.fecha <= hasta]
+        borrar = [ResumenDiario.fecha <= hasta]
+        if desde:
+            condiciones.append(Inspeccion.fecha >= desde)
+            borrar.append(ResumenDiario.fecha >= desde)
+        if locacion:
+            condiciones.append(Inspeccion.locacion == locacion)
+            borrar.append(ResumenDiario.locacion == locacion)
+
+        return ResumenDiarioService._reemplazar(db, [(condiciones, borrar)], es_cierre)
+
+    @staticmethod
+    def reconstruir(db: Session, desde: date = None, hasta: date = None, locacion: str = None) -> int:
+        """
+        Regenera los snapshots de días ya cerrados (p. ej. tras re-calificar en bloque).
+        No cierra días nuevos: eso lo hace cerrar_pendientes(), sin dejar huecos.
+        """
+        ultimo = ResumenDiarioService.ultimo_cierre(db)
+        if ultimo is None:
+            return 0
+        return ResumenDiarioService._regenerar(db, desde, min(hasta or ultimo, ultimo), locacion)
+
+    @staticmethod
+    def cerrar_pendientes(db: Session) -> int:
+        """Genera los días cerrados posteriores al último snapshot (la primera vez, todo el historial)."""
+        ultimo = ResumenDiarioService.ultimo_cierre(db)
+        ayer = date.today() - timedelta(days=1)
+        if ultimo and ultimo >= ayer:
+            return 0
+        desde = ultimo + timedelta(days=1) if ultimo else None
+        generados = ResumenDiarioService._regenerar(db, desde, ayer, es_cierre=True)
+        if generados:
+            print(f"📅 Cierre diario: {generados} snapshots hasta {ayer}")
+        return generados
+
+    @staticmethod
+    def actualizar_dias(db: Session, dias) -> int:
+        """
+        Recalcula los snapshots de los (locación, día) afectados por una carga o corrección.
+        Se llama una vez por request con todos los días tocados. Los días aún sin cerrar se
+        ignoran: cerrar_pendientes() los genera con todo lo que haya al cierre.
+        """
+        ultimo = ResumenDiarioService.ultimo_cierre(db)
+        if ultimo is None:
+            return 0
+        por_fecha = defaultdict(set)
+        for locacion, fecha in dias:
+            if fecha is not None and fecha <= ultimo:
+                por_fecha[fecha].add(locacion or "")
+        if not por_fecha:
+            return 0
+
+        grupos = [
+            ([Inspeccion.fecha == fecha, *ResumenDiarioService._filtro_locaciones(locaciones)],
+             [ResumenDiario.fecha == fecha, ResumenDiario.locacion.in_(locaciones)])
+            for fecha, locaciones in por_fecha.items()
+        ]
+        try:
+            return ResumenDiarioService._reemplazar(db, grupos)
+        except Exception as e:
+            # Los datos ya están guardados; el snapshot se corrige con cerrar_dias.py
+            print(f"⚠️ No se pudo actualizar el resumen diario: {e}")
+            db.rollback()
+            return 0
+
+    # --- LECTURA ---
+    @staticmethod
+    def sumar(db: Session, desde: date, hasta: date, locacion: str = None) -> dict:
+        """Totales (METRICAS) de los días desde..hasta, inclusive."""
+        totales = dict.fromkeys(METRICAS, 0)
+        ultimo = ResumenDiarioService.ultimo_cierre(db)
+
+        # 1. Días cerrados: unas pocas filas de snapshot
+        if ultimo and desde <= ultimo:
+            query = db.query(*[func.sum(getattr(ResumenDiario, m)).label(m) for m in METRICAS]).filter(
+                ResumenDiario.fecha >= desde, ResumenDiario.fecha <= min(hasta, ultimo)
+            )
+            if locacion:
+                query = query.filter(ResumenDiario.locacion == locacion)
+            fila = query.one()
+            for m in METRICAS:
+                totales[m] += int(getattr(fila, m) or 0)
+
+        # 2. Días sin cierre (hoy, o si el cierre todavía no corrió): directo de inspecciones
+        desde_abierto = max(desde, ultimo + timedelta(days=1)) if ultimo else desde
+        if desde_abierto <= hasta:
+            query = db.query(*ResumenDiarioService.agregados()).filter(
+                Inspeccion.fecha >= desde_abierto, Inspeccion.fecha <= hasta
+            )
+            if locacion:
+                query = query.filter(Inspeccion.locacion == locacion)
+            fila = query.one()
+            for m in METRICAS:
+                totales[m] += int(getattr(fila, m) or 0)
+
+        return totales
+
+
+# ==========================================
+# CIERRE AUTOMÁTICO (lifespan)
+# ==========================================
+def _cerrar_con_sesion_propia():
+    db = SessionLocal()
+    try:
+        ResumenDiarioService.cerrar_pendientes(db)
+    finally:
+        db.close()
+
+
+async def bucle_cierre_diario():
+    """Cierra los días pendientes al arrancar y luego cada día, pasada la medianoche."""
+    while True:
+        try:
+            await asyncio.to_thread(_cerrar_con_sesion_propia)
+        except Exception as e:
+            print(f"⚠️ Cierre diario falló: {e}")
+        ahora = datetime.now()
+        siguiente = datetime.combine(ahora.date() + timedelta(days=1), datetime.min.time()) \
+            + timedelta(minutes=CIERRE_DIARIO_MARGEN_MIN)
+        await asyncio.sleep((siguiente - ahora).total_seconds())
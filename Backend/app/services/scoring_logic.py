@@ -1,63 +1,263 @@
-def calcular_puntaje(datos):
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import case, func
+
+from app.models.catalogos import DistribucionClase, HorneadoClase, Veredicto, BandaPuntaje
+
+# ==========================================
+# REGLAS DE PUNTAJE (VERSIONADAS)
+# ==========================================
+# Los puntos por componente, el umbral de PASS y los cortes de cada banda salen de
+# reglas_puntaje.json: es el único lugar con umbrales (exportes y dashboards leen el
+# veredicto/banda guardados). Cambiar las reglas del Molino es agregar una versión ahí
+# (y marcarla 'vigente'), no editar código.
+# La misma definición se aplica por fila (calcular_puntaje), como UPDATE en SQL
+# (expresiones_sql) o sobre arrays de NumPy (calcular_arrays): los tres dan lo mismo.
+RUTA_REGLAS = Path(os.getenv("REGLAS_PUNTAJE_PATH", Path(__file__).with_name("reglas_puntaje.json")))
+# Fuerza una versión distinta a la 'vigente' del archivo
+REGLAS_VERSION = os.getenv("REGLAS_VERSION")
+
+# Componente -> columna de score en Inspeccion (score_<componente>)
+COMPONENTES = ["burbujas", "bordes", "distribucion", "horneado", "grasa"]
+
+# Columna de Inspeccion -> (clave en el dict de calcular_puntaje, catálogo o None si es booleana)
+COLUMNAS_ENTRADA = {
+    "tiene_burbujas": ("tiene_burbujas", None),
+    "bordes_sucios": ("bordes_sucios", None),
+    "tiene_grasa": ("tiene_grasa", None),
+    "distribucion_clase": ("distribucion", DistribucionClase),
+    "horneado_clase": ("horneado", HorneadoClase),
+}
+
+
+class ReglasPuntaje:
     """
-    Aplica las reglas de negocio del Molino para calificar la pizza.
-    Retorna un diccionario con los puntajes desglosados y el total.
+    Una versión de las reglas: tabla de puntos por valor de cada columna, umbral de PASS
+    y puntaje mínimo de cada banda.
+    Los valores se guardan por código (entero del catálogo, 0/1 para booleanos) para
+    poder usarlos igual en Python, en SQL y en NumPy.
     """
-    puntajes = {
-        "burbujas": 0,
-        "bordes": 0,
-        "distribucion": 0,
-        "horneado": 0,
-        "grasa": 0,
-        "total": 0,
-        "veredicto": "FAIL"
-    }
+    def __init__(self, version: str, definicion: dict):
+        self.version = version
+        self.descripcion = definicion.get("descripcion", "")
+        self.umbral_pass = int(definicion["umbral_pass"])
+        self.componentes = {}  # componente -> (columna, {codigo: puntos}, defecto)
+
+        faltantes = set(COMPONENTES) - set(definicion["componentes"])
+        if faltantes:
+            raise ValueError(f"Reglas {version}: faltan componentes {', '.join(sorted(faltantes))}")
+        for nombre in COMPONENTES:
+            comp = definicion["componentes"][nombre]
+            columna = comp["columna"]
+            if columna not in COLUMNAS_ENTRADA:
+                raise ValueError(f"Reglas {version}: columna desconocida '{columna}' en {nombre}")
+            catalogo = COLUMNAS_ENTRADA[columna][1]
+            tabla = {}
+            for valor, puntos in comp["puntos"].items():
+                if catalogo is None:
+                    tabla[int(valor.lower() == "true")] = int(puntos)
+                else:
+                    miembro = catalogo.desde_etiqueta(valor)
+                    if miembro is None:
+                        raise ValueError(f"Reglas {version}: valor desconocido '{valor}' en {nombre}")
+                    tabla[int(miembro)] = int(puntos)
+            self.componentes[nombre] = (columna, tabla, int(comp.get("defecto", 0)))
+
+        # Bandas de mayor a menor corte; la más baja debe empezar en 0 (cubre todo total)
+        bandas = definicion["bandas"]
+        faltantes = set(BandaPuntaje.etiquetas()) - set(bandas)
+        if faltantes:
+            raise ValueError(f"Reglas {version}: faltan bandas {', '.join(sorted(faltantes))}")
+        self.bandas = sorted(((BandaPuntaje.desde_etiqueta(b), int(desde)) for b, desde in bandas.items()),
+                             key=lambda banda: banda[1], reverse=True)
+        if self.bandas[-1][1] > 0:
+            raise ValueError(f"Reglas {version}: la banda más baja debe empezar en 0")
+
+    @property
+    def puntaje_maximo(self) -> int:
+        return sum(max(tabla.values(), default=0) for _, tabla, _ in self.componentes.values())
+
+    def veredicto(self, total: int) -> str:
+        return (Veredicto.PASS if total >= self.umbral_pass else Veredicto.FAIL).etiqueta
+
+    def banda(self, total: int) -> str:
+        for banda, desde in self.bandas:
+            if total >= desde:
+                return banda.etiqueta
+        return self.bandas[-1][0].etiqueta  # Totales negativos (reglas con penalizaciones)
+
+    # --- POR FILA ---
+    @staticmethod
+    def _codigo(columna, valor):
+        catalogo = COLUMNAS_ENTRADA[columna][1]
+        if catalogo is None:
+            return int(bool(valor))  # None cuenta como False (igual que antes: 'not None')
+        miembro = catalogo.desde_etiqueta(valor)  # Acepta etiqueta o código
+        return None if miembro is None else int(miembro)
+
+    def calcular(self, datos: dict) -> dict:
+        puntajes = {}
+        for nombre, (columna, tabla, defecto) in self.componentes.items():
+            codigo = self._codigo(columna, datos[COLUMNAS_ENTRADA[columna][0]])
+            puntajes[nombre] = tabla.get(codigo, defecto)
+
+        total = sum(puntajes.values())
+        puntajes["total"] = total
+        puntajes["veredicto"] = self.veredicto(total)
+        puntajes["banda"] = self.banda(total)
+        puntajes["version_reglas"] = self.version
+        return puntajes
+
+    # --- SQL (UPDATE sobre toda la tabla, sin traer filas a Python) ---
+    def expresiones_sql(self, tabla) -> dict:
+        """
+        {columna destino: expresión} para update(...).values(**...).
+        'tabla' es Inspeccion.__table__: los valores se comparan como códigos enteros.
+        """
+        valores = {}
+        for nombre, (columna, puntos, defecto) in self.componentes.items():
+            col = tabla.c[columna]
+            if COLUMNAS_ENTRADA[columna][1] is None:
+                col = func.coalesce(col, False)
+                whens = [(col == bool(codigo), pts) for codigo, pts in puntos.items()]
+            else:
+                whens = [(col == codigo, pts) for codigo, pts in puntos.items()]
+            valores[f"score_{nombre}"] = case(*whens, else_=defecto)
+
+        total = sum(valores[f"score_{nombre}"] for nombre in COMPONENTES)
+        valores["puntaje_total"] = total
+        valores["veredicto"] = case((total >= self.umbral_pass, int(Veredicto.PASS)), else_=int(Veredicto.FAIL))
+        valores["banda"] = self.expresion_banda(total)
+        valores["version_reglas"] = self.version
+        return valores
+
+    def expresion_banda(self, total):
+        """CASE que asigna el código de banda a una expresión de puntaje total."""
+        whens = [(total >= desde, int(banda)) for banda, desde in self.bandas[:-1]]
+        return case(*whens, else_=int(self.bandas[-1][0]))
+
+    # --- NUMPY (lotes de columnas ya leídas) ---
+    def calcular_arrays(self, columnas: dict) -> dict:
+        """
+        columnas: {columna de entrada: array de códigos} (booleanos como 0/1, catálogos
+        como su entero, -1 para NULL). Retorna arrays score_*, puntaje_total, veredicto y
+        banda (como códigos).
+        """
+        largo = len(next(iter(columnas.values())))
+        resultado = {}
+        for nombre, (columna, tabla, defecto) in self.componentes.items():
+            codigos = np.asarray(columnas[columna])
+            puntos = np.full(largo, defecto, dtype=np.int16)
+            for codigo, pts in tabla.items():
+                puntos[codigos == codigo] = pts
+            resultado[f"score_{nombre}"] = puntos
 
-    # 1. Burbujas (30 pts si NO hay)
-    if not datos['tiene_burbujas']:
-        puntajes['burbujas'] = 30
-    
-    # 2. Bordes (15 pts si LIMPIOS)
-    if datos['bordes_limpios']: # Ojo: tu variable debe ser 'limpios', no 'sucios'
-        puntajes['bordes'] = 15
-
-    # 3. Distribución (Escala variable)
-    dist = datos['distribucion'].upper() # Asegurar mayúsculas
-    mapa_distribucion = {
-        "CORRECTO": 30,
-        "ACEPTABLE": 20,
-        "MEDIA": 15,
-        "MALA": 5,
-        "DEFICIENTE": 0
+        total = sum(resultado[f"score_{nombre}"] for nombre in COMPONENTES).astype(np.int16)
+        resultado["puntaje_total"] = total
+        resultado["veredicto"] = np.where(total >= self.umbral_pass, int(Veredicto.PASS), int(Veredicto.FAIL))
+        resultado["banda"] = np.select([total >= desde for _, desde in self.bandas[:-1]],
+                                       [int(banda) for banda, _ in self.bandas[:-1]],
+                                       default=int(self.bandas[-1][0]))
+        return resultado
+
+    def calcular_lote(self, filas: list) -> list:
+        """
+        calcular() para muchas filas en una sola pasada de NumPy.
+        filas: dicts con las columnas de entrada de Inspeccion (etiquetas o códigos).
+        """
+        if not filas:
+            return []
+        columnas = {}
+        for columna in COLUMNAS_ENTRADA:
+            codigos = (self._codigo(columna, fila.get(columna)) for fila in filas)
+            columnas[columna] = np.fromiter((-1 if c is None else c for c in codigos),
+                                            dtype=np.int16, count=len(filas))
+        arrays = self.calcular_arrays(columnas)
+
+        resultados = []
+        for i in range(len(filas)):
+            puntajes = {nombre: int(arrays[f"score_{nombre}"][i]) for nombre in COMPONENTES}
+            puntajes["total"] = int(arrays["puntaje_total"][i])
+            puntajes["veredicto"] = Veredicto(int(arrays["veredicto"][i])).etiqueta
+            puntajes["banda"] = BandaPuntaje(int(arrays["banda"][i])).etiqueta
+            puntajes["version_reglas"] = self.version
+            resultados.append(puntajes)
+        return resultados
+
+    def resumen(self) -> dict:
+        return {
+            "version": self.version,
+            "descripcion": self.descripcion,
+            "umbral_pass": self.umbral_pass,
+            "puntaje_maximo": self.puntaje_maximo,
+            "bandas": {banda.etiqueta: desde for banda, desde in self.bandas},
+        }
+
+
+@lru_cache(maxsize=1)
+def _leer_archivo() -> dict:
+    with open(RUTA_REGLAS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def obtener_reglas(version: str = None) -> ReglasPuntaje:
+    """Reglas de una versión del archivo (por defecto, la vigente)."""
+    archivo = _leer_archivo()
+    version = version or REGLAS_VERSION or archivo["vigente"]
+    if version not in archivo["versiones"]:
+        raise ValueError(f"Versión de reglas desconocida: {version}. "
+                         f"Disponibles: {', '.join(archivo['versiones'])}")
+    return ReglasPuntaje(version, archivo["versiones"][version])
+
+
+def versiones_reglas() -> list:
+    return list(_leer_archivo()["versiones"])
+
+
+def datos_desde_inspeccion(inspeccion, **cambios):
+    """
+    Arma la entrada de calcular_puntaje desde una fila ya guardada (objeto ORM o Row).
+    'cambios' pisa campos de la fila (p. ej. la nueva predicción de una cabeza).
+    """
+    campos = {
+        "tiene_burbujas": inspeccion.tiene_burbujas,
+        "bordes_sucios": inspeccion.bordes_sucios,
+        "tiene_grasa": inspeccion.tiene_grasa,
+        "horneado_clase": inspeccion.horneado_clase,
+        "distribucion_clase": inspeccion.distribucion_clase,
     }
-    puntajes['distribucion'] = mapa_distribucion.get(dist, 0) # 0 por defecto si no coincide
-
-    # 4. Horneado (Escala variable)
-    horn = datos['horneado'].upper()
-    mapa_horneado = {
-        "CORRECTO": 15,
-        "ALTO": 5,
-        "BAJO": 5,
-        "INSUFICIENTE": 0,
-        "EXCESIVO": 0
+    campos.update(cambios)
+    return {
+        "tiene_burbujas": campos["tiene_burbujas"],
+        "bordes_sucios": campos["bordes_sucios"],
+        "tiene_grasa": campos["tiene_grasa"],
+        "horneado": campos["horneado_clase"],
+        "distribucion": campos["distribucion_clase"],
+        "bordes_limpios": not campos["bordes_sucios"],
     }
-    puntajes['horneado'] = mapa_horneado.get(horn, 0)
-
-    # 5. Grasa (10 pts si NO hay)
-    if not datos['tiene_grasa']:
-        puntajes['grasa'] = 10
-
-    # TOTAL
-    total = (puntajes['burbujas'] + puntajes['bordes'] + 
-             puntajes['distribucion'] + puntajes['horneado'] + 
-             puntajes['grasa'])
-    
-    puntajes['total'] = total
-
-    # VEREDICTO (>= 75 es PASS)
-    if total >= 75:
-        puntajes['veredicto'] = "PASS"
-    else:
-        puntajes['veredicto'] = "FAIL"
-
-    return puntajes
\ No newline at end of file
+
+
+def columnas_puntaje(puntajes: dict) -> dict:
+    """Resultado de calcular()/calcular_lote() -> valores de las columnas de Inspeccion."""
+    columnas = {f"score_{nombre}": puntajes[nombre] for nombre in COMPONENTES}
+    columnas.update(
+        puntaje_total=puntajes["total"],
+        veredicto=puntajes["veredicto"],
+        banda=puntajes["banda"],
+        version_reglas=puntajes["version_reglas"],
+    )
+    return columnas
+
+
+def calcular_puntaje(datos, reglas: ReglasPuntaje = None):
+    """
+    Aplica las reglas de negocio del Molino para calificar la pizza.
+    Retorna un diccionario con los puntajes desglosados, el total, el veredicto,
+    la banda y la versión de reglas usada (se guarda en Inspeccion.version_reglas).
+    """
+    return (reglas or obtener_reglas()).calcular(datos)
@@ -0,0 +1,130 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.models.evaluacion_sombra import EvaluacionSombra
+from app.core.model_loader import SOMBRA_MUESTREO
+
+# Evaluaciones esperando turno; si el candidato no da abasto se descartan muestras
+# en vez de acumular tensores en memoria
+SOMBRA_MAX_PENDIENTES = int(os.getenv("SOMBRA_MAX_PENDIENTES", "16"))
+
+
+class EvaluadorSombra:
+    """
+    Corre el candidato de una cabeza sobre una muestra de las imágenes ya clasificadas,
+    en un hilo propio: la inspección se guarda con el resultado de producción sin esperarlo.
+    Un solo hilo + la tasa de muestreo por cabeza acotan la CPU extra.
+    """
+    def __init__(self, muestreo: dict = SOMBRA_MUESTREO, max_pendientes: int = SOMBRA_MAX_PENDIENTES):
+        self.muestreo = muestreo
+        self.max_pendientes = max_pendientes
+        self._ejecutor = None
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.evaluadas = 0
+        self.descartadas = 0
+        self.errores = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._ejecutor is None:
+            self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sombra")
+        return self._ejecutor
+
+    def programar(self, modelos, img_tensor, produccion: dict, etiquetar, inspeccion_id: int):
+        """
+        modelos: conjunto con el que se clasificó la imagen (trae sus candidatos).
+        produccion: cabeza -> (etiqueta, ms) de los modelos en uso.
+        etiquetar: función (cabeza, tensor, modelos) -> etiqueta cruda.
+        """
+        for nombre in modelos.candidatos():
+            if nombre not in produccion or random.random() >= self.muestreo.get(nombre, 0):
+                continue
+            with self._lock:
+                if self.pendientes >= self.max_pendientes:
+                    self.descartadas += 1
+                    continue
+                self.pendientes += 1
+            self._pool().submit(self._evaluar, modelos, nombre, img_tensor, produccion[nombre],
+                                etiquetar, inspeccion_id)
+
+    def _evaluar(self, modelos, nombre, img_tensor, produccion, etiquetar, inspeccion_id):
+        etiqueta_prod, ms_prod = produccion
+        db = SessionLocal()
+        try:
+            inicio = time.perf_counter()
+            etiqueta = etiquetar(nombre, img_tensor, modelos.sombra)
+            ms = (time.perf_counter() - inicio) * 1000
+
+            db.add(EvaluacionSombra(
+                inspeccion_id=inspeccion_id,
+                cabeza=nombre,
+                version_produccion=modelos.versiones.get(nombre, {}).get("version"),
+                version_candidato=modelos.sombra.versiones[nombre]["version"],
+                etiqueta_produccion=etiqueta_prod,
+                etiqueta_candidato=etiqueta,
+                coincide=etiqueta == etiqueta_prod,
+                latencia_produccion_ms=round(ms_prod, 2),
+                latencia_candidato_ms=round(ms, 2),
+            ))
+            db.commit()
+            with self._lock:
+                self.evaluadas += 1
+        except Exception as e:
+            print(f"⚠️ Evaluación en sombra de {nombre} falló: {e}")
+            db.rollback()
+            with self._lock:
+                self.errores += 1
+        finally:
+            db.close()
+            with self._lock:
+                self.pendientes -= 1
+
+    def estado(self) -> dict:
+        """Contadores de este worker (desde que arrancó)."""
+        with self._lock:
+            return {
+                "muestreo": self.muestreo,
+                "pendientes": self.pendientes,
+                "evaluadas": self.evaluadas,
+                "descartadas": self.descartadas,
+                "errores": self.errores,
+            }
+
+    @staticmethod
+    def resumen(db: Session, cabeza: str = None) -> list:
+        """Desacuerdo y latencia media por candidato (todas las muestras guardadas)."""
+        query = db.query(
+            EvaluacionSombra.cabeza,
+            EvaluacionSombra.version_candidato,
+            func.count(EvaluacionSombra.id).label("muestras"),
+            func.sum(case((EvaluacionSombra.coincide == False, 1), else_=0)).label("desacuerdos"),
+            func.avg(EvaluacionSombra.latencia_produccion_ms).label("latencia_produccion_ms"),
+            func.avg(EvaluacionSombra.latencia_candidato_ms).label("latencia_candidato_ms"),
+            func.max(EvaluacionSombra.fecha).label("ultima"),
+        )
+        if cabeza:
+            query = query.filter(EvaluacionSombra.cabeza == cabeza)
+        filas = query.group_by(EvaluacionSombra.cabeza, EvaluacionSombra.version_candidato).all()
+
+        return [
+            {
+                "cabeza": f.cabeza,
+                "version_candidato": f.version_candidato,
+                "muestras": f.muestras,
+                "desacuerdos": f.desacuerdos,
+                "tasa_desacuerdo": round(f.desacuerdos / f.muestras, 4) if f.muestras else 0,
+                "latencia_produccion_ms": round(f.latencia_produccion_ms or 0, 2),
+                "latencia_candidato_ms": round(f.latencia_candidato_ms or 0, 2),
+                "delta_latencia_ms": round((f.latencia_candidato_ms or 0) - (f.latencia_produccion_ms or 0), 2),
+                "ultima": f.ultima,
+            }
+            for f in filas
+        ]
+
+
+evaluador_sombra = EvaluadorSombra()
@@ -0,0 +1,49 @@
+"""
+Re-clasifica inspecciones históricas cuando se actualiza el modelo de una cabeza.
+
+Uso:
+    python backfill_modelos.py resnet_distribucion
+    python backfill_modelos.py resnet_distribucion --lote 100 --max-por-segundo 5
+    python backfill_modelos.py resnet_grasa --limite 500 --desde-id 12000
+
+Toma las filas cuyo version_modelos tiene una versión de esa cabeza distinta a la del
+manifiesto actual, vuelve a correr solo YOLO + esa ResNet y actualiza etiqueta, scores
+y veredicto por lotes. Se puede cortar (Ctrl+C) y volver a lanzar: retoma las pendientes.
+Con IMAGENES_CACHE_DIR definido reutiliza las imágenes ya descargadas.
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.core.model_loader import RESNETS, configurar_hilos_torch, model_manager
+from app.services.backfill_service import BackfillService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-inferencia de una cabeza sobre filas históricas")
+    parser.add_argument("cabeza", choices=RESNETS, help="Modelo actualizado")
+    parser.add_argument("--lote", type=int, default=50, help="Filas por UPDATE (default: 50)")
+    parser.add_argument("--max-por-segundo", type=float, help="Tope de imágenes por segundo")
+    parser.add_argument("--limite", type=int, help="Máximo de filas en esta corrida")
+    parser.add_argument("--desde-id", type=int, default=0, help="Empieza después de este id")
+    parser.add_argument("--solo-contar", action="store_true", help="Solo muestra cuántas filas faltan")
+    args = parser.parse_args()
+
+    configurar_hilos_torch(1)
+    model_manager.asegurar_cargados()
+
+    db = SessionLocal()
+    try:
+        servicio = BackfillService(db, args.cabeza, lote=args.lote, max_por_segundo=args.max_por_segundo)
+        if args.solo_contar:
+            print(f"{args.cabeza}: {servicio.contar_pendientes(args.desde_id)} filas pendientes")
+            return
+        servicio.ejecutar(limite=args.limite, desde_id=args.desde_id)
+    except KeyboardInterrupt:
+        # Los lotes ya confirmados quedan; la próxima corrida sigue con el resto
+        print("\n⏸️ Interrumpido: volver a correr el comando para continuar")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
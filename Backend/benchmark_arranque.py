@@ -0,0 +1,88 @@
+"""
+Tiempo de arranque en frío de la API según el modo.
+
+Uso:
+    python benchmark_arranque.py
+    python benchmark_arranque.py --repeticiones 5
+
+Cada medición corre en un proceso nuevo (sin módulos en caché): importa app.main,
+ejecuta el arranque (lifespan) y reporta cuándo el servidor quedó listo para atender,
+si se importó torch/ultralytics, y en modo completo cuándo terminaron de cargar los modelos.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+MODOS = [
+    ("lectura", {"API_MODO": "lectura"}),
+    ("completo/primer_uso", {"API_MODO": "completo", "CARGA_MODELOS": "primer_uso"}),
+    ("completo/fondo", {"API_MODO": "completo", "CARGA_MODELOS": "fondo"}),
+    ("completo/inicio", {"API_MODO": "completo", "CARGA_MODELOS": "inicio"}),
+]
+
+# Lo que corre dentro de cada proceso hijo
+_SONDA = """
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import app.main as m
+t_import = time.perf_counter() - t0
+
+async def arrancar():
+    async with m.app.router.lifespan_context(m.app):
+        t_listo = time.perf_counter() - t0
+        ml = any(mod in sys.modules for mod in ("torch", "ultralytics"))
+        # En modo 'fondo' se mide también cuándo quedan los modelos en memoria
+        t_modelos = None
+        if m.CARGA_MODELOS != "primer_uso" and m.inferencia_habilitada():
+            m.model_manager.esperar()
+            t_modelos = time.perf_counter() - t0
+        return t_listo, ml, t_modelos
+
+t_listo, ml, t_modelos = asyncio.run(arrancar())
+print("RESULTADO " + json.dumps({"import": t_import, "listo": t_listo, "ml": ml, "modelos": t_modelos}))
+"""
+
+
+def medir(entorno: dict) -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-c", _SONDA],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **entorno},
+        capture_output=True,
+        text=True,
+    )
+    for linea in salida.stdout.splitlines():
+        if linea.startswith("RESULTADO "):
+            return json.loads(linea[len("RESULTADO "):])
+    raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr else "sin salida")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío por modo")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'modo':<22} {'import':>9} {'listo':>9} {'modelos':>9}  ML importado")
+    for nombre, entorno in MODOS:
+        try:
+            corridas = [medir(entorno) for _ in range(args.repeticiones)]
+        except RuntimeError as e:
+            print(f"{nombre:<22} error: {e}")
+            continue
+        mediana = lambda campo: statistics.median(c[campo] for c in corridas)
+        modelos = [c["modelos"] for c in corridas if c["modelos"] is not None]
+        print(
+            f"{nombre:<22} {mediana('import'):>8.2f}s {mediana('listo'):>8.2f}s "
+            f"{(f'{statistics.median(modelos):.2f}s' if modelos else '-'):>9}  "
+            f"{'sí' if corridas[0]['ml'] else 'no'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
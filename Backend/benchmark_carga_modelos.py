@@ -0,0 +1,69 @@
+"""
+Benchmark de carga de las ResNet: torch.load (.pth) vs safetensors mapeado en memoria.
+
+Uso:
+    python convertir_safetensors.py       # una vez, para tener los .safetensors
+    python benchmark_carga_modelos.py --repeticiones 3
+
+Cada medición corre en un proceso nuevo y carga las cinco ResNet (sin YOLO).
+Reporta tiempo de carga y pico de memoria (ru_maxrss) del proceso.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+_SONDA = """
+import json, resource, time
+from app.core.model_loader import ModelManager, ModelosCargados, RESNETS
+import torch  # el import de torch no se cuenta en la carga
+
+m = ModelManager()
+m.device
+conjunto = ModelosCargados()
+inicio = time.perf_counter()
+for carpeta in RESNETS:
+    setattr(conjunto, carpeta, m._load_resnet_custom(conjunto, carpeta))
+segundos = time.perf_counter() - inicio
+pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("RESULTADO " + json.dumps({"segundos": segundos, "pico_mb": pico_mb, "formatos": conjunto.formato_pesos}))
+"""
+
+
+def medir(formato: str) -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-c", _SONDA],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "FORMATO_PESOS": formato},
+        capture_output=True,
+        text=True,
+    )
+    for linea in salida.stdout.splitlines():
+        if linea.startswith("RESULTADO "):
+            return json.loads(linea[len("RESULTADO "):])
+    raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr else "sin salida")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga .pth vs .safetensors (mmap)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'formato':<14} {'carga':>9} {'pico RSS':>10}  archivos usados")
+    for formato in ("pth", "auto"):
+        corridas = [medir(formato) for _ in range(args.repeticiones)]
+        usados = sorted(set(corridas[0]["formatos"].values())) or ["ninguno"]
+        print(
+            f"{formato:<14} {statistics.median(c['segundos'] for c in corridas):>8.2f}s "
+            f"{statistics.median(c['pico_mb'] for c in corridas):>8.0f}MB  {', '.join(usados)}"
+        )
+    print("\n'auto' usa .safetensors donde exista; si muestra 'pth', falta correr convertir_safetensors.py.")
+
+
+if __name__ == "__main__":
+    main()
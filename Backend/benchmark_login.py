@@ -0,0 +1,85 @@
+"""
+Benchmark del costo de bcrypt contra el SLO de login.
+
+Uso:
+    python benchmark_login.py
+    python benchmark_login.py --rounds 10 11 12 13 --logins 50 --workers 2 --slo-ms 1000
+
+Por cada costo mide un verify aislado y una ráfaga de logins simultáneos (cambio de
+turno) pasando por un pool de 'workers' hilos, como hace la API. La latencia de la
+ráfaga incluye la espera en cola. Sugiere el costo más alto cuyo p95 cumple el SLO.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+PASSWORD = "gritsee-benchmark"
+
+
+def percentil(muestras: list, q: float) -> float:
+    ordenadas = sorted(muestras)
+    return ordenadas[min(int(q * len(ordenadas)), len(ordenadas) - 1)]
+
+
+def medir(rounds: int, logins: int, workers: int) -> dict:
+    contexto = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hash_guardado = contexto.hash(PASSWORD)
+
+    aislados = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        contexto.verify(PASSWORD, hash_guardado)
+        aislados.append((time.perf_counter() - inicio) * 1000)
+
+    # Ráfaga: todos llegan a la vez; la latencia de cada uno se cuenta desde la llegada
+    llegada = time.perf_counter()
+
+    def login():
+        contexto.verify(PASSWORD, hash_guardado)
+        return (time.perf_counter() - llegada) * 1000
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencias = list(pool.map(lambda _: login(), range(logins)))
+
+    return {
+        "rounds": rounds,
+        "verify_ms": statistics.median(aislados),
+        "rafaga_p50_ms": percentil(latencias, 0.50),
+        "rafaga_p95_ms": percentil(latencias, 0.95),
+        "rafaga_total_ms": max(latencias),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de bcrypt vs SLO de login")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--logins", type=int, default=30, help="Logins simultáneos en la ráfaga")
+    parser.add_argument("--workers", type=int, default=2, help="Igual que HASH_WORKERS en la API")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="p95 máximo aceptable de login")
+    args = parser.parse_args()
+
+    print(f"Ráfaga de {args.logins} logins, {args.workers} workers, SLO p95 <= {args.slo_ms:.0f} ms\n")
+    print(f"{'rounds':>6} {'verify':>10} {'p50':>10} {'p95':>10} {'total':>10}  SLO")
+
+    recomendado = None
+    for rounds in args.rounds:
+        r = medir(rounds, args.logins, args.workers)
+        cumple = r["rafaga_p95_ms"] <= args.slo_ms
+        if cumple:
+            recomendado = rounds
+        print(
+            f"{rounds:>6} {r['verify_ms']:>8.1f}ms {r['rafaga_p50_ms']:>8.1f}ms "
+            f"{r['rafaga_p95_ms']:>8.1f}ms {r['rafaga_total_ms']:>8.1f}ms  {'✅' if cumple else '❌'}"
+        )
+
+    if recomendado is None:
+        print("\nNingún costo cumple el SLO: subir HASH_WORKERS o revisar el SLO.")
+    else:
+        print(f"\nCosto recomendado: BCRYPT_ROUNDS={recomendado}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Memoria real de un despliegue gunicorn (master + workers), para verificar que los
+modelos se comparten: el PSS total debe crecer poco al agregar workers.
+
+Uso (Linux):
+    python benchmark_memoria.py <pid_master_gunicorn>
+
+RSS cuenta cada página compartida en todos los procesos que la usan; PSS la reparte
+entre ellos, así que la suma de PSS es lo que de verdad ocupa el despliegue.
+"""
+import argparse
+from pathlib import Path
+
+
+def memoria_kb(pid: int) -> dict:
+    valores = {}
+    for linea in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        campo, valor = linea.split(":", 1)
+        valores[campo] = int(valor.split()[0])
+    return {"rss": valores.get("Rss", 0), "pss": valores.get("Pss", 0),
+            "compartida": valores.get("Shared_Clean", 0) + valores.get("Shared_Dirty", 0)}
+
+
+def hijos(pid: int) -> list:
+    archivo = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(p) for p in archivo.read_text().split()] if archivo.exists() else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS/PSS de master + workers")
+    parser.add_argument("pid", type=int, help="PID del master de gunicorn")
+    args = parser.parse_args()
+
+    procesos = [("master", args.pid)] + [(f"worker {i}", p) for i, p in enumerate(hijos(args.pid), 1)]
+    total = {"rss": 0, "pss": 0}
+
+    print(f"{'proceso':<10} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'compartida MB':>14}")
+    for nombre, pid in procesos:
+        m = memoria_kb(pid)
+        total["rss"] += m["rss"]
+        total["pss"] += m["pss"]
+        print(f"{nombre:<10} {pid:>8} {m['rss'] / 1024:>9.0f} {m['pss'] / 1024:>9.0f} {m['compartida'] / 1024:>14.0f}")
+
+    print(f"{'TOTAL':<10} {'':>8} {total['rss'] / 1024:>9.0f} {total['pss'] / 1024:>9.0f}")
+    print("\nCon la precarga funcionando, PSS total << RSS total y cada worker nuevo suma poco PSS.")
+
+
+if __name__ == "__main__":
+    main()
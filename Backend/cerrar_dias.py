@@ -0,0 +1,46 @@
+"""
+Genera / regenera los snapshots diarios de métricas por locación (tabla resumenes_diarios).
+
+Uso:
+    python cerrar_dias.py                                        # cierra los días pendientes (hasta ayer)
+    python cerrar_dias.py --desde 2025-01-01 --hasta 2025-01-31  # regenera días ya cerrados
+    python cerrar_dias.py --locacion "Local 1" --desde 2025-01-01
+
+El servidor ya cierra los días solo (al arrancar y pasada cada medianoche) y recalcula
+los días que reciben cargas tardías o correcciones. Este comando sirve para cron en
+despliegues sin servidor corriendo o para regenerar tras editar la BD a mano.
+La primera ejecución genera todo el historial.
+"""
+import argparse
+from datetime import datetime
+
+from app.db.session import SessionLocal, engine, Base
+from app.models import resumen_diario  # Registra la tabla en Base.metadata
+from app.services.resumen_diario_service import ResumenDiarioService
+
+
+def _fecha(texto: str):
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cierra / regenera snapshots diarios de métricas")
+    parser.add_argument("--desde", type=_fecha, help="Regenerar desde esta fecha (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=_fecha, help="Regenerar hasta esta fecha (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--locacion", help="Regenerar solo esta locación")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.desde or args.hasta or args.locacion:
+            regenerados = ResumenDiarioService.reconstruir(db, args.desde, args.hasta, args.locacion)
+            print(f"🔁 {regenerados} snapshots regenerados")
+        cerrados = ResumenDiarioService.cerrar_pendientes(db)
+        print(f"✅ Días cerrados hasta {ResumenDiarioService.ultimo_cierre(db)} ({cerrados} snapshots nuevos)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Convierte los pesos .pth de las ResNet a .safetensors (mismo nombre, al lado del .pth).
+
+Uso:
+    python convertir_safetensors.py                  # todas las carpetas modelos/resnet_*
+    python convertir_safetensors.py resnet_grasa     # solo algunas
+
+ModelManager usa el .safetensors automáticamente si existe (FORMATO_PESOS=auto):
+se mapea en memoria en vez de deserializar un pickle y copiar cada tensor.
+"""
+import argparse
+import json
+
+import torch
+from safetensors.torch import save_file
+
+from app.core.model_loader import (
+    MODEL_DIR, NOMBRE_MANIFIESTO, buscar_pesos, cargar_safetensors_mmap, leer_manifiesto, sha256_archivo,
+)
+
+
+def convertir(carpeta: str) -> bool:
+    directorio = MODEL_DIR / carpeta
+    manifiesto = leer_manifiesto(directorio)
+    # Con manifiesto, se convierte exactamente la variante .pth registrada
+    if manifiesto and "pth" in manifiesto.get("variantes", {}):
+        origen = directorio / manifiesto["variantes"]["pth"]["archivo"]
+    else:
+        origen = buscar_pesos(carpeta)
+    if origen is None or not origen.exists():
+        print(f"⚠️ {carpeta}: sin pesos .pth")
+        return False
+
+    destino = origen.with_suffix(".safetensors")
+    state_dict = torch.load(origen, map_location="cpu")
+    # safetensors exige tensores contiguos y sin memoria compartida entre ellos
+    tensores = {nombre: t.detach().contiguous().clone() for nombre, t in state_dict.items()}
+    save_file(tensores, str(destino), metadata={"origen": origen.name})
+
+    # Verificación: lo que lee el loader mmap debe ser idéntico al original
+    leidos = cargar_safetensors_mmap(destino)
+    iguales = leidos.keys() == tensores.keys() and all(
+        torch.equal(leidos[n], tensores[n]) for n in tensores
+    )
+    if not iguales:
+        destino.unlink()
+        print(f"❌ {carpeta}: la verificación falló, se eliminó {destino.name}")
+        return False
+
+    # El manifiesto registra la variante nueva (misma versión: son los mismos pesos)
+    if manifiesto:
+        manifiesto["variantes"]["safetensors"] = {
+            "archivo": destino.relative_to(directorio).as_posix(), "sha256": sha256_archivo(destino),
+        }
+        (directorio / NOMBRE_MANIFIESTO).write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False))
+
+    print(f"✅ {carpeta}: {origen.name} -> {destino.name} ({destino.stat().st_size / 1e6:.1f} MB)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte pesos .pth a .safetensors")
+    parser.add_argument("carpetas", nargs="*", help="Carpetas dentro de modelos/ (por defecto resnet_*)")
+    args = parser.parse_args()
+
+    carpetas = args.carpetas or sorted(p.name for p in MODEL_DIR.glob("resnet_*") if p.is_dir())
+    convertidas = sum(convertir(c) for c in carpetas)
+    print(f"Listo: {convertidas}/{len(carpetas)} modelos convertidos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Genera el manifest.json de cada modelo a partir de los pesos que hay hoy en modelos/.
+
+Uso:
+    python generar_manifiestos.py                          # modelos sin manifiesto
+    python generar_manifiestos.py resnet_distribucion --version 2025-03-10 --forzar
+    python generar_manifiestos.py resnet_distribucion --candidato --version 2025-04-01
+
+El manifiesto fija qué archivo se carga (sin depender del orden del glob), su sha256,
+el orden de clases y el tamaño de entrada. ModelManager lo lee al arrancar; cambiar la
+versión o el archivo de un modelo cambia Inspeccion.version_modelos de las filas nuevas.
+Con --candidato se genera el de <carpeta>/candidato/ (evaluación en sombra, SOMBRA_MUESTREO).
+"""
+import argparse
+import json
+from datetime import datetime
+
+from app.core.model_loader import (
+    MODEL_DIR, MODELOS, NOMBRE_MANIFIESTO, CARPETA_CANDIDATO, RESNETS,
+    buscar_pesos, leer_manifiesto, sha256_archivo,
+)
+
+
+def _variante(carpeta, ruta) -> dict:
+    return {"archivo": ruta.relative_to(carpeta).as_posix(), "sha256": sha256_archivo(ruta)}
+
+
+def generar(nombre: str, version: str = None, forzar: bool = False, candidato: bool = False) -> bool:
+    definicion = MODELOS[nombre]
+    carpeta = MODEL_DIR / definicion["carpeta"]
+    if candidato:
+        carpeta = carpeta / CARPETA_CANDIDATO
+    if leer_manifiesto(carpeta) is not None and not forzar:
+        print(f"⏭️ {nombre}: ya tiene {NOMBRE_MANIFIESTO} (usar --forzar para regenerarlo)")
+        return False
+
+    fijo = definicion.get("archivo_sin_manifiesto")
+    if fijo:
+        pesos = carpeta / fijo if (carpeta / fijo).exists() else None
+    else:
+        pesos = buscar_pesos(f"{definicion['carpeta']}/{CARPETA_CANDIDATO}" if candidato else nombre)
+    if pesos is None:
+        print(f"⚠️ {nombre}: sin pesos en {carpeta}")
+        return False
+
+    variantes = {pesos.suffix.lstrip("."): _variante(carpeta, pesos)}
+    convertido = pesos.with_suffix(".safetensors")
+    if convertido.exists():
+        variantes["safetensors"] = _variante(carpeta, convertido)
+
+    manifiesto = {
+        "nombre": nombre,
+        # Por defecto, la fecha de los pesos: cambia solo si cambia el archivo
+        "version": version or datetime.fromtimestamp(pesos.stat().st_mtime).strftime("%Y%m%d"),
+        "arquitectura": "yolov8" if nombre == "yolo" else "resnet50",
+        "clases": definicion["clases"],
+        "tamano_entrada": definicion["tamano_entrada"],
+        "variantes": variantes,
+    }
+    (carpeta / NOMBRE_MANIFIESTO).write_text(json.dumps(manifiesto, indent=2, ensure_ascii=False))
+    print(f"✅ {nombre}: versión {manifiesto['version']} ({', '.join(variantes)})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera manifest.json por modelo")
+    parser.add_argument("modelos", nargs="*", help=f"Por defecto, todos: {', '.join(MODELOS)}")
+    parser.add_argument("--version", help="Versión a registrar (por defecto, fecha de los pesos)")
+    parser.add_argument("--forzar", action="store_true", help="Reemplaza manifiestos existentes")
+    parser.add_argument("--candidato", action="store_true",
+                        help=f"Manifiesto del modelo candidato ({CARPETA_CANDIDATO}/, solo ResNets)")
+    args = parser.parse_args()
+
+    validos = RESNETS if args.candidato else MODELOS
+    desconocidos = set(args.modelos) - set(validos)
+    if desconocidos:
+        parser.error(f"Modelos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    for nombre in args.modelos or validos:
+        if args.candidato and not (MODEL_DIR / MODELOS[nombre]["carpeta"] / CARPETA_CANDIDATO).is_dir():
+            continue
+        generar(nombre, args.version, args.forzar, args.candidato)
+
+
+if __name__ == "__main__":
+    main()
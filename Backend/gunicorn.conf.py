@@ -0,0 +1,39 @@
+"""
+Configuración de gunicorn para producción con varios workers.
+
+Uso (desde Backend/):
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Los modelos se cargan una sola vez en el master (preload_app + CARGA_MODELOS=precarga)
+y los workers los heredan por fork compartiendo las mismas páginas de memoria: agregar
+workers casi no suma RSS de modelos. Cada worker usa núcleos / workers hilos de torch.
+"""
+import multiprocessing
+import os
+
+# Debe definirse antes de que gunicorn importe app.main en el master
+os.environ.setdefault("CARGA_MODELOS", "precarga")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(max(2, multiprocessing.cpu_count() // 2))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))  # Cargas masivas largas
+
+# configurar_hilos_torch lo lee para repartir los núcleos
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def post_fork(server, worker):
+    # Marca el proceso como worker de gunicorn: el lifespan no vuelve a fijar los hilos
+    os.environ["GUNICORN_WORKER"] = str(worker.age)
+
+    # El master abrió conexiones del pool sync al importar app.main (create_all,
+    # migraciones). close=False: el worker descarta las heredadas sin cerrarlas (siguen
+    # siendo del master) y abre las suyas al primer uso
+    from app.db.session import engine
+    engine.dispose(close=False)
+
+    from app.core.model_loader import inferencia_habilitada, configurar_hilos_torch
+    if inferencia_habilitada():
+        configurar_hilos_torch(workers)
@@ -0,0 +1,62 @@
+"""
+Re-califica inspecciones guardadas cuando cambian las reglas del Molino.
+
+Uso:
+    python recalcular_puntajes.py                                  # diff con las reglas vigentes (no escribe)
+    python recalcular_puntajes.py --version molino-v2              # diff contra otra versión
+    python recalcular_puntajes.py --version molino-v2 --aplicar    # UPDATE en la BD
+    python recalcular_puntajes.py --locacion "Local 1" --desde 2025-01-01 --aplicar
+
+Las reglas (puntos por componente y umbral de PASS) están versionadas en
+app/services/reglas_puntaje.json. Por defecto solo se toman filas calificadas con
+otra versión: si se corta, volver a correr el comando continúa donde quedó.
+"""
+import argparse
+import json
+from datetime import datetime, time
+
+from app.db.session import SessionLocal
+from app.services.scoring_logic import obtener_reglas, versiones_reglas
+from app.services.recalculo_service import RecalculoPuntajesService
+
+
+def _fecha(texto: str):
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula puntajes y veredictos con reglas versionadas")
+    parser.add_argument("--version", choices=versiones_reglas(), help="Por defecto, la vigente")
+    parser.add_argument("--aplicar", action="store_true", help="Escribe en la BD (sin esto, solo diff)")
+    parser.add_argument("--locacion", help="Solo esta locación")
+    parser.add_argument("--desde", type=_fecha, help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=_fecha, help="Fecha final (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--todas", action="store_true",
+                        help="Incluye filas ya calificadas con esta versión")
+    parser.add_argument("--lote", type=int, help="Filas por bloque (diff) / ids por UPDATE (aplicar)")
+    args = parser.parse_args()
+
+    reglas = obtener_reglas(args.version)
+    filtros = {
+        "locacion": args.locacion,
+        "fecha_inicio": datetime.combine(args.desde, time.min) if args.desde else None,
+        "fecha_fin": datetime.combine(args.hasta, time.max) if args.hasta else None,
+        "incluir_actualizadas": args.todas,
+    }
+    lote = {"lote": args.lote} if args.lote else {}
+    print(f"📏 Reglas {reglas.version}: {reglas.descripcion} (PASS >= {reglas.umbral_pass})")
+
+    db = SessionLocal()
+    try:
+        if args.aplicar:
+            RecalculoPuntajesService.aplicar(db, reglas, **lote, **filtros)
+        else:
+            diff = RecalculoPuntajesService.simular(db, reglas, **lote, **filtros)
+            print(json.dumps(diff, indent=2, ensure_ascii=False, default=str))
+            print("ℹ️ Simulación: no se escribió nada (usar --aplicar)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()